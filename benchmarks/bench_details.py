@@ -0,0 +1,69 @@
+# Benchmark detail-page fetching against the local fixture server
+#
+# Usage: python benchmarks/bench_details.py [n_racquets] [--latency 0.02] [--fail-rate 0.05]
+#
+# Fetches every racquet's detail page sequentially and with a worker pool,
+# then again from the response cache, and checks that the parsed fields
+# match the fixture and that no page was lost to the injected 503s. A final
+# run checks that the rate limiter holds the request rate.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from recommender_fixture import DETAIL_FIELDS, FixtureServer, fixture_details, fixture_page, fixture_racquets
+from scrape_details import DetailFetcher, ResponseCache, scrape_details
+
+WORKERS = [1, 8]
+
+
+def check(details, racquets):
+    assert details['Fetched'].all(), f"{(~details['Fetched']).sum()} pages not fetched"
+    expected = racquets.drop_duplicates(['Brand', 'Model', 'String Pattern'])
+    for row, (_, detail) in zip(expected.to_dict('records'), details.iterrows()):
+        got = {k: detail[k] for k in DETAIL_FIELDS}
+        assert got == fixture_details(row), f"{row['Brand']} {row['Model']}: {got}"
+
+
+def main(n, latency, fail_rate):
+    racquets = fixture_racquets(n)
+    with FixtureServer(fixture_page(racquets), details=racquets, latency=latency, fail_rate=fail_rate) as server:
+        template = server.url + 'detail?brand={brand}&model={model}&pattern={pattern}'
+        print(f'{len(racquets)} racquets, {latency * 1000:.0f} ms latency, {fail_rate:.0%} injected 503s')
+        for workers in WORKERS:
+            fetcher = DetailFetcher(workers, rate=0, backoff=0.05)
+            check(scrape_details(racquets, template, fetcher), racquets)
+            print(f'{workers:>2} workers, no cache:   {fetcher.report()}')
+            fetcher.close()
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for run in ['cold', 'warm']:
+                fetcher = DetailFetcher(max(WORKERS), rate=0, backoff=0.05, cache=ResponseCache(cache_dir))
+                check(scrape_details(racquets, template, fetcher), racquets)
+                print(f'{max(WORKERS):>2} workers, {run} cache: {fetcher.report()}')
+                fetcher.close()
+
+        rate, pages = 50, racquets.iloc[:100]
+        fetcher = DetailFetcher(max(WORKERS), rate=rate, backoff=0.05)
+        start = time.perf_counter()
+        scrape_details(pages, template, fetcher)
+        requests_made = fetcher.stats['requested'] + fetcher.stats['retries']
+        elapsed = time.perf_counter() - start
+        fetcher.close()
+        # n requests at rate r span at least (n - 1) / r seconds
+        assert elapsed >= (requests_made - 1) / rate * 0.95, f'{requests_made} requests in {elapsed:.2f} s'
+        print(f'rate limit {rate}/s: {requests_made} requests in {elapsed:.2f} s ({requests_made / elapsed:.1f}/s)')
+    print('Parsed details match the fixture')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('n', type=int, nargs='?', default=500)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--fail-rate', type=float, default=0.05)
+    args = parser.parse_args()
+    main(args.n, args.latency, args.fail_rate)
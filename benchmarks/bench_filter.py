@@ -0,0 +1,94 @@
+# Benchmark the Discover sidebar filter: chained DataFrame copies vs the
+# indexed FilterIndex engine
+#
+# Usage: python benchmarks/bench_filter.py [n_rows ...]
+#
+# Each rerun applies availability, brand, 13 spec ranges and string pattern
+# filters, as the page does with its default brands/patterns and random
+# slider positions. Both paths must select the same rows.
+import os
+import sys
+import time
+from math import floor, ceil
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+import pandas as pd
+from dataset import read_racquets_csv, DATABASE_PATH, SPEC_COLS
+from filters import FilterIndex
+
+SIZES = [1_244, 100_000, 1_000_000]
+RERUNS = 5
+DEFAULT_BRANDS = ['Head', 'Wilson', 'Yonex', 'Babolat', 'Prince', 'Tecnifibre', 'Dunlop']
+DEFAULT_PATTERNS = ['16x19', '18x20', '16x20']
+
+
+def synthetic_racquets(n, seed=0):
+    base = read_racquets_csv(DATABASE_PATH)
+    if n == len(base):
+        return base
+    rng = np.random.default_rng(seed)
+    return base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+
+
+def random_selection(df, rng):
+    # Slider positions: a random integer sub-range of each spec's full range
+    ranges = {}
+    for s in SPEC_COLS:
+        lo, hi = floor(df[s].min()), ceil(df[s].max())
+        a, b = sorted(rng.uniform(lo, hi, 2))
+        ranges[s] = (lo + floor((a - lo) * 0.3), hi - floor((hi - b) * 0.3))
+    return [True, False], DEFAULT_BRANDS, ranges, DEFAULT_PATTERNS
+
+
+def filter_chain(df, availability, brands, ranges, patterns):
+    # Former page implementation
+    sub_df = df[df['Current'].isin(availability)].copy()
+    sub_df = sub_df[sub_df['Brand'].isin(brands)].copy()
+    for s, (sel_min, sel_max) in ranges.items():
+        floor(sub_df[s].min()), ceil(sub_df[s].max())
+        sub_df = sub_df[(sub_df[s] >= sel_min) & (sub_df[s] <= sel_max)].copy()
+        if len(sub_df) == 0:
+            break
+    return sub_df[sub_df['String Pattern'].isin(patterns)].copy()
+
+
+def filter_indexed(fidx, availability, brands, ranges, patterns):
+    mask = fidx.category_mask('Current', availability)
+    fidx.present_categories('Brand', mask)
+    mask &= fidx.category_mask('Brand', brands)
+    for s, (sel_min, sel_max) in ranges.items():
+        fidx.bounds(s, mask)
+        mask &= fidx.range_mask(s, sel_min, sel_max)
+        if not mask.any():
+            break
+    mask &= fidx.category_mask('String Pattern', patterns)
+    return fidx.materialize(mask)
+
+
+def main(sizes):
+    print(f"{'rows':>9} {'index build ms':>15} {'chain ms':>9} {'indexed ms':>11} {'rows out':>9}")
+    for n in sizes:
+        df = synthetic_racquets(n)
+        start = time.perf_counter()
+        fidx = FilterIndex(df)
+        build = time.perf_counter() - start
+        rng = np.random.default_rng(1)
+        chain, indexed, rows_out = [], [], []
+        for _ in range(RERUNS):
+            selection = random_selection(df, rng)
+            start = time.perf_counter()
+            expected = filter_chain(df, *selection)
+            chain.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            result = filter_indexed(fidx, *selection)
+            indexed.append(time.perf_counter() - start)
+            pd.testing.assert_frame_equal(expected, result)
+            rows_out.append(len(result))
+        print(f"{n:>9} {1000 * build:>15.1f} {1000 * np.median(chain):>9.1f} {1000 * np.median(indexed):>11.1f} {int(np.median(rows_out)):>9}")
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or SIZES)
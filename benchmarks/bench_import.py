@@ -0,0 +1,112 @@
+# Import-time budget for the Streamlit pages
+#
+# Usage: python benchmarks/bench_import.py [--budget SECONDS] [--repeat N] [page ...]
+#
+# Reports two times per page:
+#
+#   startup  the page's top-level imports in a fresh interpreter with
+#            nothing preloaded, from python -X importtime: the real cost of
+#            a cold start, streamlit included
+#   in-app   the same imports with streamlit already imported, as when a
+#            running app reruns or opens the page; median of --repeat fresh
+#            interpreters
+#
+# Exits with status 1 if a page's in-app time exceeds the budget, or if a
+# page imports any module of the HEAVY_PACKAGES at module top instead of
+# lazily. Streamlit imports some of them itself (plotly), so they are
+# dropped from sys.modules before the page runs: whatever the page imports
+# shows up as new in sys.modules.
+import argparse
+import ast
+import glob
+import json
+import os
+import re
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+DEFAULT_BUDGET = 0.25
+HEAVY_PACKAGES = ['matplotlib', 'sklearn', 'scipy', 'plotly', 'bokeh']
+
+RUNNER = '''
+import json, sys, time
+import streamlit
+sys.path.insert(0, {repo!r})
+heavy = {heavy!r}
+def package(name):
+    return next((h for h in heavy if name == h or name.startswith(h + '.')), None)
+for name in [m for m in sys.modules if package(m)]:
+    del sys.modules[name]
+code = compile({source!r}, {page!r}, 'exec')
+before = set(sys.modules)
+start = time.perf_counter()
+exec(code, {{'__name__': '__page__'}})
+elapsed = time.perf_counter() - start
+imported = sorted({{package(m) for m in set(sys.modules) - before if package(m)}})
+print(json.dumps({{'seconds': elapsed, 'heavy': imported}}))
+'''
+
+STARTUP_RUNNER = '''
+import sys
+sys.path.insert(0, {repo!r})
+sys.stderr.write({marker!r} + '\\n')
+sys.stderr.flush()
+{source}
+'''
+STARTUP_MARKER = '-- page imports --'
+# A top-level import in -X importtime output: cumulative microseconds and an
+# unindented module name
+IMPORTTIME_RE = re.compile(r'^import time:\s+\d+ \|\s+(\d+) \| (\S.*)$')
+
+
+def import_source(path):
+    """The top-level import statements of a page script."""
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    imports = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return '\n'.join(ast.get_source_segment(open(path).read(), node) for node in imports)
+
+
+def run_page(path):
+    source = import_source(path)
+    runner = RUNNER.format(repo=REPO_DIR, source=source, page=path, heavy=HEAVY_PACKAGES)
+    out = subprocess.run([sys.executable, '-c', runner], cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def startup_seconds(path):
+    """Cumulative -X importtime of the page's imports in a fresh interpreter."""
+    runner = STARTUP_RUNNER.format(repo=REPO_DIR, marker=STARTUP_MARKER, source=import_source(path))
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', runner], cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    lines = out.stderr.split(STARTUP_MARKER, 1)[1].splitlines()
+    return sum(int(m.group(1)) for m in map(IMPORTTIME_RE.match, lines) if m) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-page import time against a budget')
+    parser.add_argument('pages', nargs='*', help='page scripts (default: Welcome.py and pages/*.py)')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help='in-app import budget per page in seconds')
+    parser.add_argument('--repeat', type=int, default=5, help='in-app runs per page')
+    args = parser.parse_args()
+    pages = args.pages or [os.path.join(REPO_DIR, 'Welcome.py')] + sorted(glob.glob(os.path.join(REPO_DIR, 'pages', '*.py')))
+
+    failed = False
+    print(f"{'page':<24} {'startup ms':>11} {'in-app ms':>10}  eager heavy imports")
+    for page in pages:
+        startup = startup_seconds(page)
+        runs = [run_page(page) for _ in range(args.repeat)]
+        in_app = sorted(r['seconds'] for r in runs)[args.repeat // 2]
+        heavy = runs[0]['heavy']
+        over = in_app > args.budget
+        failed |= over or bool(heavy)
+        flag = '  OVER BUDGET' if over else ''
+        print(f"{os.path.relpath(page, REPO_DIR):<24} {1000 * startup:>11.1f} {1000 * in_app:>10.1f}  {', '.join(heavy) or '-'}{flag}")
+    print(f'budget: {1000 * args.budget:.0f} ms in-app per page')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# Benchmark incremental scraping against the local fixture server
+#
+# Usage: python benchmarks/bench_incremental.py [n_racquets] [--change-rate 0.02]
+#
+# Runs scrape_tw_data.scrape(incremental=True) through a site's life cycle:
+# a first full scrape, a rerun of the unchanged page (answered 304, then
+# again without validators so the page comes back with identical content),
+# and a run after the fixture page changed specs, dropped racquets and
+# listed new ones. Checks the added / changed / removed summary, that only
+# the new listings were parsed, and that the merged records and database
+# equal those of a full scrape of the updated page.
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+import pandas as pd
+from recommender_fixture import FixtureServer, fixture_page, fixture_racquets
+from scrape_tw_data import load_records, scrape
+
+
+def keys(df):
+    return sorted(df['Brand'] + '||' + df['Model'] + '||' + df['String Pattern'])
+
+
+def updated_racquets(racquets, rate, rng):
+    """racquets after a site update: (racquets, added, changed, removed)."""
+    n_changes = max(1, int(len(racquets) * rate))
+    picked = rng.choice(len(racquets), 2 * n_changes, replace=False)
+    changed, removed = picked[:n_changes], picked[n_changes:]
+    df = racquets.copy()
+    df.loc[changed, 'Weight (g)'] += 1
+    added = racquets.iloc[rng.choice(len(racquets), n_changes, replace=False)].copy()
+    added['Model'] = added['Model'] + ' Pro'
+    df = pd.concat([df.drop(index=removed), added], ignore_index=True)
+    return df, added, racquets.iloc[changed], racquets.iloc[removed]
+
+
+def run_scrape(url, directory, incremental=True):
+    """scrape() writing every artifact under directory; (summary, seconds)."""
+    path = lambda name: os.path.join(directory, name)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = scrape(url, incremental, path('racquets.csv'), path('columns'), path('features'), path('records.csv'),
+                         path('state.json'), path('quarantine.csv'), path('report.json'), None)
+    return summary, time.perf_counter() - start
+
+
+def sorted_records(path):
+    """Records by hash, with each Cluster id replaced by the cluster's first hash.
+
+    Cluster ids are numbered in record order, which differs between an
+    incremental and a full scrape; the clusters themselves must not.
+    """
+    records = load_records(path).sort_values('Record Hash').reset_index(drop=True)
+    records['Cluster'] = records.groupby('Cluster')['Record Hash'].transform('min')
+    return records
+
+
+def main(n, rate):
+    rng = np.random.default_rng(0)
+    racquets = fixture_racquets(n)
+    with FixtureServer(fixture_page(racquets)) as server, tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'incremental')
+        os.mkdir(directory)
+        summary, elapsed = run_scrape(server.url, directory)
+        assert summary['added'] == keys(racquets) and not summary['changed'] and not summary['removed'], summary
+        print(f"full scrape:      {1000 * elapsed:8.1f} ms, {summary['parsed']} listings parsed")
+
+        before = server.not_modified
+        summary, elapsed = run_scrape(server.url, directory)
+        assert summary is None and server.not_modified == before + 1, 'unchanged page was not answered 304'
+        print(f'unchanged (304):  {1000 * elapsed:8.1f} ms')
+
+        # Without validators the page comes back whole, with the same hash
+        state_path = os.path.join(directory, 'state.json')
+        with open(state_path) as f:
+            state = json.load(f)
+        with open(state_path, 'w') as f:
+            json.dump({'content_hash': state['content_hash']}, f)
+        summary, elapsed = run_scrape(server.url, directory)
+        assert summary is None and server.not_modified == before + 1, 'identical page was not recognized'
+        print(f'unchanged (200):  {1000 * elapsed:8.1f} ms')
+
+        updated, added, changed, removed = updated_racquets(racquets, rate, rng)
+        server.set_page(fixture_page(updated))
+        summary, elapsed = run_scrape(server.url, directory)
+        assert summary['added'] == keys(added), 'added racquets differ'
+        assert summary['changed'] == keys(changed), 'changed racquets differ'
+        assert summary['removed'] == keys(removed), 'removed racquets differ'
+        assert summary['parsed'] == len(added) + len(changed), f"{summary['parsed']} listings parsed"
+        print(f"updated page:     {1000 * elapsed:8.1f} ms, {summary['parsed']} listings parsed, {summary['reused']} reused, "
+              f"{len(summary['added'])} added, {len(summary['changed'])} changed, {len(summary['removed'])} removed")
+
+        reference = os.path.join(tmp, 'full')
+        os.mkdir(reference)
+        run_scrape(server.url, reference, incremental=False)
+        pd.testing.assert_frame_equal(sorted_records(os.path.join(directory, 'records.csv')),
+                                      sorted_records(os.path.join(reference, 'records.csv')))
+        pd.testing.assert_frame_equal(pd.read_csv(os.path.join(directory, 'racquets.csv')),
+                                      pd.read_csv(os.path.join(reference, 'racquets.csv')))
+    print('Incremental scrapes match a full scrape of the updated page')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('n', type=int, nargs='?', default=2_000)
+    parser.add_argument('--change-rate', type=float, default=0.02)
+    args = parser.parse_args()
+    main(args.n, args.change_rate)
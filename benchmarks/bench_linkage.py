@@ -0,0 +1,94 @@
+# Benchmark record linkage on synthetic listings with planted near-duplicates
+#
+# Usage: python benchmarks/bench_linkage.py [n_listings ...]
+#
+# Distinct racquets are sampled from the synthetic model (so their specs
+# differ as real ones do) and given made-up model names. A fraction of them
+# is listed again with a reformatted or misspelt model string and specs off
+# by up to half a percent (head size, a blocking key, is kept). Linkage should rejoin exactly those pairs; the
+# script reports pair precision / recall, the candidate pairs compared
+# against all N^2 / 2 pairs, and fails if precision or recall drops below
+# MIN_QUALITY.
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+import pandas as pd
+from dataset import DATABASE_PATH, SPEC_COLS, read_racquets_csv
+from linkage import BLOCK_COLS, canonical_table, link_records
+from synthetic import RacquetModel
+
+SIZES = [10_000, 100_000]
+DUPLICATE_FRACTION = 0.2
+SPEC_NOISE = 0.005
+MIN_QUALITY = 0.95
+LETTERS = np.array(list('abcdefghijklmnopqrstuvwxyz'))
+
+
+def perturb_name(name, rng):
+    words = name.split(' ')
+    kind = rng.integers(4)
+    if kind == 0:
+        return name.upper() if rng.random() < 0.5 else name.lower()
+    if kind == 1:
+        return name + '.'
+    if kind == 2 and len(words) > 1:
+        i = rng.integers(len(words) - 1)
+        return ' '.join(words[:i] + [words[i] + words[i + 1]] + words[i + 2:])
+    # Swap two adjacent letters of the code word
+    code = words[-1]
+    i = rng.integers(1, len(code) - 1)
+    words[-1] = code[:i] + code[i + 1] + code[i] + code[i + 2:]
+    return ' '.join(words)
+
+
+def listings(n, seed=0):
+    """(listings, source) where source is the distinct racquet of each listing."""
+    rng = np.random.default_rng(seed)
+    n_distinct = int(n / (1 + DUPLICATE_FRACTION))
+    model = RacquetModel(read_racquets_csv(DATABASE_PATH))
+    base = model.sample(n_distinct, rng).astype({'Brand': str, 'String Pattern': str})
+    codes = [''.join(c) for c in LETTERS[rng.integers(0, 26, (n_distinct, 6))]]
+    base['Model'] = base['Model'].str.replace(r' #\d+$', '', regex=True) + ' ' + pd.Series(codes).str.capitalize()
+    source = rng.integers(0, n_distinct, n - n_distinct)
+    dupes = base.iloc[source].reset_index(drop=True)
+    dupes['Model'] = [perturb_name(m, rng) for m in dupes['Model']]
+    for s in SPEC_COLS:
+        if s in BLOCK_COLS:
+            continue
+        dupes[s] = dupes[s] * (1 + rng.uniform(-SPEC_NOISE, SPEC_NOISE, len(dupes)))
+    df = pd.concat([base, dupes], ignore_index=True)
+    order = rng.permutation(len(df))
+    return df.iloc[order].reset_index(drop=True), np.concatenate([np.arange(n_distinct), source])[order]
+
+
+def n_pairs(sizes):
+    sizes = np.asarray(sizes, dtype=np.int64)
+    return int((sizes * (sizes - 1) // 2).sum())
+
+
+def main(sizes):
+    print(f"{'listings':>10} {'candidates':>12} {'all pairs':>16} {'link s':>8} {'merge s':>8} {'precision':>10} {'recall':>8}")
+    for n in sizes:
+        df, source = listings(n)
+        start = time.perf_counter()
+        cluster_ids, stats = link_records(df)
+        t_link = time.perf_counter() - start
+        start = time.perf_counter()
+        canonical = canonical_table(df, cluster_ids)
+        t_merge = time.perf_counter() - start
+        both = pd.DataFrame({'cluster': cluster_ids, 'source': source})
+        true_links = n_pairs(both.groupby(['cluster', 'source']).size())
+        precision = true_links / max(n_pairs(both.groupby('cluster').size()), 1)
+        recall = true_links / max(n_pairs(both.groupby('source').size()), 1)
+        print(f"{n:>10} {stats['candidate_pairs']:>12} {stats['all_pairs']:>16} {t_link:>8.2f} {t_merge:>8.2f} {precision:>10.4f} {recall:>8.4f}")
+        assert len(canonical) == stats['clusters']
+        assert precision >= MIN_QUALITY and recall >= MIN_QUALITY, 'linkage quality below MIN_QUALITY'
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or SIZES)
@@ -0,0 +1,123 @@
+# Benchmark dataset load latency and memory: CSV vs columnar (.npy) format
+#
+# Usage: python benchmarks/bench_load.py [n_rows ...]
+#
+# Synthetic datasets are built by resampling racquet_database.csv. Each
+# measurement runs in a fresh interpreter so "cold" is the first load in a
+# new process and "warm" is the best of several repeat loads in that process.
+# Before timing, checks that reloading a changed dataset releases the old
+# DataFrame and every index derived from it.
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import weakref
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+import pandas as pd
+from dataset import load_racquets, read_racquets_csv, write_columnar, DATABASE_PATH
+from filters import filter_index
+from matching import match_engine
+from search import search_index
+from skyline import skyline_engine
+from tables import sort_index
+
+SIZES = [1_000, 100_000, 1_000_000]
+WARM_REPEATS = 5
+
+CHILD = """
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+from dataset import read_racquets_csv, read_racquets_columnar
+
+def rss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+reader = read_racquets_csv if {fmt!r} == 'csv' else read_racquets_columnar
+base = rss()
+t0 = time.perf_counter()
+df = reader({path!r})
+cold = time.perf_counter() - t0
+load_rss = rss() - base
+# Touch every spec value, as a filter pass over the table would
+t0 = time.perf_counter()
+df.iloc[:, 3:16].sum()
+scan = time.perf_counter() - t0
+scan_rss = rss() - base
+warm = []
+for _ in range({repeats}):
+    t0 = time.perf_counter()
+    reader({path!r})
+    warm.append(time.perf_counter() - t0)
+print(json.dumps({{'cold': cold, 'warm': min(warm), 'scan': scan, 'load_rss': load_rss, 'scan_rss': scan_rss}}))
+"""
+
+
+def synthetic_racquets(n, seed=0):
+    base = read_racquets_csv(DATABASE_PATH)
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    df['Model'] = df['Model'] + ' #' + pd.Series(np.arange(n)).astype(str)
+    return df
+
+
+def derive_all(df):
+    """Build every per-dataset index the pages use."""
+    for build in [filter_index, match_engine, search_index, skyline_engine, sort_index]:
+        build(df)
+
+
+def check_release(tmp):
+    """A reload, and dropping an unloaded frame, must free the derived objects."""
+    path = os.path.join(tmp, 'reload.csv')
+    df = synthetic_racquets(1_000)
+    df.to_csv(path, index=False)
+    old = load_racquets(path)
+    derive_all(old)
+    refs = [weakref.ref(old), weakref.ref(filter_index(old)), weakref.ref(search_index(old))]
+    del old
+    df.iloc[:500].to_csv(path, index=False)
+    new = load_racquets(path)
+    derive_all(new)
+    gc.collect()
+    assert all(ref() is None for ref in refs), 'reload kept the previous DataFrame or its indexes alive'
+    assert filter_index(new) is filter_index(load_racquets(path))
+    derive_all(df)
+    refs = [weakref.ref(df), weakref.ref(search_index(df))]
+    del df
+    gc.collect()
+    assert all(ref() is None for ref in refs), 'a DataFrame not from load_racquets kept its indexes alive'
+    print('Reloads release the previous DataFrame and its derived indexes')
+
+
+def measure(fmt, path):
+    code = CHILD.format(root=os.path.dirname(BENCH_DIR), fmt=fmt, path=path, repeats=WARM_REPEATS)
+    out = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+    return json.loads(out)
+
+
+def main(sizes):
+    with tempfile.TemporaryDirectory() as tmp:
+        check_release(tmp)
+    print(f"{'rows':>9} {'format':>9} {'cold ms':>9} {'warm ms':>9} {'scan ms':>9} {'load MiB':>9} {'scan MiB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            df = synthetic_racquets(n)
+            csv_path = os.path.join(tmp, f'racquets_{n}.csv')
+            col_path = os.path.join(tmp, f'racquets_{n}')
+            df.to_csv(csv_path, index=False)
+            write_columnar(df, col_path)
+            for fmt, path in [('csv', csv_path), ('columnar', col_path)]:
+                r = measure(fmt, path)
+                print(f"{n:>9} {fmt:>9} {1000 * r['cold']:>9.1f} {1000 * r['warm']:>9.1f} {1000 * r['scan']:>9.1f} "
+                      f"{r['load_rss'] / 2**20:>9.1f} {r['scan_rss'] / 2**20:>9.1f}")
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or SIZES)
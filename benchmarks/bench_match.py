@@ -0,0 +1,91 @@
+# Benchmark Match queries: full StandardScaler + cdist + sort/rank vs
+# MatchEngine.top_k (uncached and cached)
+#
+# Usage: python benchmarks/bench_match.py [n_rows ...]
+#
+# Also checks that core.match_specs rejects targets without any spec.
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+from scipy.spatial.distance import cdist
+from sklearn.preprocessing import StandardScaler
+from dataset import read_racquets_csv, DATABASE_PATH, SPEC_COLS
+from core import match_specs
+from matching import MatchEngine
+
+SIZES = [1_244, 10_000, 100_000, 1_000_000]
+K = 25
+QUERIES = 5
+
+
+def synthetic_racquets(n, seed=0):
+    base = read_racquets_csv(DATABASE_PATH)
+    if n == len(base):
+        return base
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    # Jitter the resampled specs so distances are not all zero or tied
+    df[SPEC_COLS] = df[SPEC_COLS] * rng.normal(1, 0.01, (n, len(SPEC_COLS))).astype(np.float32)
+    return df
+
+
+def search_full(df, target, weights):
+    # Former page implementation: refit the scaler, score and rank every row
+    scaler = StandardScaler()
+    scaler.fit(df[SPEC_COLS])
+    sub_df = df.copy()
+    weighted_matrix = np.array(scaler.transform(sub_df[SPEC_COLS])) * weights
+    sub_df['similarity_dist'] = cdist(weighted_matrix[target, :].reshape(1, -1), weighted_matrix).ravel()
+    sub_df.drop(index=target, inplace=True)
+    sub_df.sort_values('similarity_dist', inplace=True)
+    sub_df['Similarity Rank'] = sub_df['similarity_dist'].rank(method='max')
+    return sub_df
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def check_empty_targets(df):
+    """match_specs must reject targets that set no spec instead of ranking them."""
+    all_open = np.full((1, len(SPEC_COLS)), np.nan)
+    for targets in [[], [{}], [{'Weight (g)': 305}, {'Weight (g)': None}], all_open]:
+        try:
+            match_specs(df, targets, k=3)
+        except ValueError:
+            continue
+        raise AssertionError(f'match_specs accepted targets without a spec: {targets}')
+    assert len(match_specs(df, [{'Weight (g)': 305}], k=3)) == 3
+    print('match_specs rejects targets without a spec')
+
+
+def main(sizes):
+    check_empty_targets(synthetic_racquets(1_000))
+    print(f"{'rows':>9} {'build ms':>9} {'full ms':>9} {'top-k ms':>9} {'cached ms':>10}")
+    rng = np.random.default_rng(1)
+    for n in sizes:
+        df = synthetic_racquets(n)
+        engine, build = timed(MatchEngine, df)
+        full, topk, cached = [], [], []
+        for _ in range(QUERIES):
+            target = int(rng.integers(0, n))
+            weights = rng.integers(0, 101, len(SPEC_COLS)).astype(float)
+            expected, t = timed(search_full, df, target, weights)
+            full.append(t)
+            (rows, dist, ranks), t = timed(engine.top_k, target, weights, K)
+            topk.append(t)
+            _, t = timed(engine.top_k, target, weights, K)
+            cached.append(t)
+            np.testing.assert_allclose(dist, expected['similarity_dist'].to_numpy()[:K], rtol=1e-4, atol=1e-3)
+        print(f"{n:>9} {1000 * build:>9.1f} {1000 * np.median(full):>9.1f} {1000 * np.median(topk):>9.1f} {1000 * np.median(cached):>10.3f}")
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or SIZES)
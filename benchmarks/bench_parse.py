@@ -0,0 +1,70 @@
+# Benchmark recommender page parsing: BeautifulSoup + per-listing loop vs
+# streaming tag scan + vectorized column parsing
+#
+# Usage: python benchmarks/bench_parse.py [n_rows ...]
+#
+# Both paths must produce identical DataFrames; the script fails otherwise.
+# They must also extract the same listings from a page whose class
+# attributes are written in other valid ways (extra whitespace, reordered or
+# extra classes) and that has decoy divs.
+import os
+import re
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import pandas as pd
+from recommender_fixture import fixture_page, fixture_racquets
+from scrape_tw_data import extract_datapoints, extract_datapoints_soup, parse_racquets, parse_racquets_loop
+
+SIZES = [1_000, 100_000]
+# Other spellings of 'circlegrey {status}', then divs that are not listings
+CLASS_VARIANTS = ['circlegrey  {status}', '{status} circlegrey', 'circlegrey {status} highlight', '\tcirclegrey\n{status} ']
+DECOYS = ['<div class="circlegrey" id="a||b"></div>', '<div class="current" id="a||b"></div>',
+          '<div class="circlegreyish current" id="a||b"></div>']
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def variant_page(page):
+    """page with its racquet class attributes respelled and decoy divs added."""
+    count = iter(range(len(page)))
+    def respell(match):
+        return 'class="' + CLASS_VARIANTS[next(count) % len(CLASS_VARIANTS)].format(status=match.group(1)) + '"'
+    page = re.sub(r'class="circlegrey (current|notcurrent)"', respell, page.decode())
+    return page.replace('<body>', '<body>\n' + '\n'.join(DECOYS)).encode()
+
+
+def check_variants():
+    page = fixture_page(fixture_racquets(200))
+    expected = extract_datapoints(page)
+    for extract in [extract_datapoints_soup, extract_datapoints]:
+        assert extract(variant_page(page)) == expected, f'{extract.__name__} differs on respelled class attributes'
+    print('Respelled class attributes extract the same listings')
+
+
+def main(sizes):
+    check_variants()
+    print(f"{'rows':>8} {'path':>10} {'extract s':>10} {'parse s':>10} {'total s':>10}")
+    for n in sizes:
+        page = fixture_page(fixture_racquets(n))
+        results = {}
+        for name, extract, parse in [('soup+loop', extract_datapoints_soup, parse_racquets_loop),
+                                     ('streaming', extract_datapoints, parse_racquets)]:
+            datapoints, t_extract = timed(extract, page)
+            df, t_parse = timed(parse, datapoints)
+            results[name] = (datapoints, df)
+            print(f"{n:>8} {name:>10} {t_extract:>10.3f} {t_parse:>10.3f} {t_extract + t_parse:>10.3f}")
+        assert results['soup+loop'][0] == results['streaming'][0], 'extracted datapoints differ'
+        pd.testing.assert_frame_equal(results['soup+loop'][1], results['streaming'][1])
+    print('DataFrames identical')
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or SIZES)
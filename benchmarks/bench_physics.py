@@ -0,0 +1,91 @@
+# Benchmark and golden-value check for physics.py
+#
+# Usage: python benchmarks/bench_physics.py [n_rows]
+#
+# Checks the vectorized formulas against racquet_database.csv and against
+# the original per-row implementations (scraper .apply rounding, the
+# customize.ipynb tip/tail functions), then times both at n_rows (10^6 by
+# default).
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+import physics
+from dataset import read_racquets_csv, DATABASE_PATH
+
+# Duplicate listings are averaged after the derived specs are computed, so
+# a few database rows do not reproduce exactly
+MAX_GOLDEN_MISMATCH = 0.01
+
+
+def derived_specs_apply(sw, w, b, length_in):
+    # Former scrape_tw_data.py implementation
+    rw = sw - (0.001*w * (b - 10)**2)
+    rw = rw.apply(lambda x: int(round(x, 0)))
+    pi = (12 * rw)/(0.001 * w * (2.54 * length_in)**2) - 1
+    pi = pi.apply(lambda x: round(x, 2))
+    mgr_i = (0.001 * w * 980.5 * b)/(rw + 0.001 * w * b**2)
+    return rw, pi, mgr_i
+
+
+# Former customize.ipynb implementations (masses in g for balance, kg otherwise)
+def nb_delta_balance(M, L, b, m_tail, m_tip):
+    delta_b = ((L-b)*(M*b/L + m_tip) - b*(M*(L-b)/L + m_tail))/(M + m_tail + m_tip)
+    return b + delta_b
+
+
+def nb_delta_swingweight(L, m_tail, m_tip):
+    return m_tail*(10**2) + m_tip*(L-10)**2
+
+
+def nb_delta_recoilweight(new_b, L, m_tail, m_tip):
+    return m_tail * (new_b**2) + m_tip * (L - new_b)**2
+
+
+def check_golden():
+    df = read_racquets_csv(DATABASE_PATH).astype({c: float for c in ['Weight (g)', 'Balance (cm)', 'Swingweight (kg cm^2)', 'Length (in)']})
+    rw, pi, mgr_i = physics.derived_specs(df['Swingweight (kg cm^2)'], df['Weight (g)'], df['Balance (cm)'], df['Length (in)'])
+    for name, values, tol in [('Recoil Weight (kg cm^2)', rw, 0.5), ('Polarization Index', pi, 0.005), ('MgR/I', mgr_i, 1e-4)]:
+        mismatch = (np.abs(values - df[name]) > tol).mean()
+        print(f'{name}: {100 * mismatch:.2f}% of database rows differ')
+        assert mismatch <= MAX_GOLDEN_MISMATCH, f'{name} does not reproduce racquet_database.csv'
+
+    # Customization grid at the notebook's example racquet
+    m = np.arange(0, 7.01, 0.5)
+    tail, tip = np.meshgrid(m, m)
+    new_b = 31.8 + physics.delta_balance(349, 68.58, 31.8, tail, tip)
+    ref = np.vectorize(nb_delta_balance)(349, 68.58, 31.8, tail, tip)
+    np.testing.assert_allclose(new_b, ref, rtol=1e-12)
+    np.testing.assert_allclose(physics.delta_swingweight(68.58, tail, tip),
+                               np.vectorize(nb_delta_swingweight)(68.58, 0.001 * tail, 0.001 * tip), rtol=1e-12)
+    np.testing.assert_allclose(physics.delta_recoilweight(new_b, 68.58, tail, tip),
+                               np.vectorize(nb_delta_recoilweight)(ref, 68.58, 0.001 * tail, 0.001 * tip), rtol=1e-12)
+    print('customization formulas match customize.ipynb')
+
+
+def bench(n):
+    base = read_racquets_csv(DATABASE_PATH)
+    rng = np.random.default_rng(0)
+    df = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    args = [df['Swingweight (kg cm^2)'].astype(float), df['Weight (g)'].astype(float),
+            df['Balance (cm)'].astype(float), df['Length (in)'].astype(float)]
+    timings = {}
+    for name, func in [('apply', derived_specs_apply), ('vectorized', physics.derived_specs)]:
+        start = time.perf_counter()
+        results = func(*args)
+        timings[name] = time.perf_counter() - start
+        print(f'{n} rows, {name}: {timings[name]:.3f} s')
+        if name == 'apply':
+            reference = results
+    for ref, new in zip(reference, results):
+        np.testing.assert_array_equal(np.asarray(ref, dtype=float), np.asarray(new, dtype=float))
+    print(f"speedup: {timings['apply'] / timings['vectorized']:.0f}x, results identical")
+
+
+if __name__ == '__main__':
+    check_golden()
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 10**6)
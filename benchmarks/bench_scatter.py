@@ -0,0 +1,72 @@
+# Benchmark the Discover scatter plot: full ColumnDataSource of every column
+# vs the column-pruned WebGL / density pipeline
+#
+# Usage: python benchmarks/bench_scatter.py [n_rows ...]
+#
+# Payload is the size of the Bokeh document JSON sent to the browser. Above
+# DENSITY_THRESHOLD racquets the new pipeline sends a binned density image.
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+from bokeh.embed import json_item
+from bokeh.models import CategoricalColorMapper, ColumnDataSource, HoverTool, Legend
+from bokeh.palettes import viridis
+from bokeh.plotting import figure
+from dataset import read_racquets_csv, DATABASE_PATH
+from scatter import DENSITY_THRESHOLD, density_chart, density_data, point_chart, point_data
+
+SIZES = [1_244, 10_000, 100_000]
+S1, S2 = 'Weight (g)', 'Swingweight (kg cm^2)'
+
+
+def synthetic_racquets(n, seed=0):
+    base = read_racquets_csv(DATABASE_PATH)
+    if n == len(base):
+        return base
+    rng = np.random.default_rng(seed)
+    return base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+
+
+def chart_full(sub_df):
+    # Former page implementation
+    hover = HoverTool(tooltips=[('Brand', '@Brand'), ('Model', '@Model')])
+    brands = list(sub_df['Brand'].unique())
+    color_mapper = CategoricalColorMapper(factors=brands, palette=viridis(len(brands)))
+    chart = figure(width=1000, height=800, tools=[hover, 'crosshair', 'box_zoom', 'reset'], x_axis_label=S1, y_axis_label=S2)
+    chart.add_layout(Legend(), 'right')
+    chart.circle(x=S1, y=S2, size=10, color=dict(field='Brand', transform=color_mapper), line_alpha=1.0, line_color='gray', fill_alpha=0.7, legend_group='Brand', source=ColumnDataSource(sub_df))
+    return chart
+
+
+def chart_pruned(df):
+    rows = np.arange(len(df))
+    if len(rows) > DENSITY_THRESHOLD:
+        x, y = df[S1].to_numpy(), df[S2].to_numpy()
+        counts, x_edges, y_edges = density_data(x, y, (x.min(), x.max()), (y.min(), y.max()))
+        return density_chart(counts, x_edges, y_edges, S1, S2)
+    return point_chart(point_data(df, rows, S1, S2), S1, S2, list(df['Brand'].unique()))
+
+
+def timed_payload(build):
+    start = time.perf_counter()
+    payload = json.dumps(json_item(build()))
+    return time.perf_counter() - start, len(payload)
+
+
+def main(sizes):
+    print(f"{'rows':>9} {'full ms':>9} {'full KB':>9} {'pruned ms':>10} {'pruned KB':>10}")
+    for n in sizes:
+        df = synthetic_racquets(n)
+        full_time, full_size = timed_payload(lambda: chart_full(df))
+        pruned_time, pruned_size = timed_payload(lambda: chart_pruned(df))
+        print(f"{n:>9} {1000 * full_time:>9.1f} {full_size / 1024:>9.0f} {1000 * pruned_time:>10.1f} {pruned_size / 1024:>10.0f}")
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or SIZES)
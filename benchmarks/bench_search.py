@@ -0,0 +1,101 @@
+# Benchmark typeahead search latency on synthetic datasets
+#
+# Usage: python benchmarks/bench_search.py [n_rows ...] [--queries 2000] [--k 10]
+#
+# Queries are taken from random racquets of the dataset, as a user would
+# type them: every keystroke prefix of the full name or of the model alone,
+# the full name, and the full name with two adjacent letters swapped. Reports
+# the index build time and memory, the latency percentiles per kind of
+# query, and how often the racquet is the first match (full name) or among
+# the k matches (typo). Fails if the median latency of any kind of query
+# exceeds BUDGET_MS, a full-name query does not return its racquet first,
+# or fewer than MIN_TYPO_RECALL of the typos find their racquet.
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+from dataset import DATABASE_PATH, read_racquets_csv
+from search import SearchIndex
+from synthetic import RacquetModel
+
+SIZES = [10_000, 1_000_000]
+BUDGET_MS = 1.0
+MIN_TYPO_RECALL = 0.9
+
+
+def index_bytes(index):
+    arrays = [index.rows, index.names, index.ties, index.model_order, index.model_ranks, index.models,
+              index.offsets, index.postings]
+    return sum(a.nbytes for a in arrays)
+
+
+def swap_letters(text, rng):
+    letters = [i for i in range(len(text) - 1) if text[i].isalpha() and text[i + 1].isalpha() and text[i] != text[i + 1]]
+    if not letters:
+        return text
+    i = letters[rng.integers(len(letters))]
+    return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+
+def queries(df, n, rng):
+    """{kind: [(query, row)]} for n random racquets of df."""
+    kinds = {'keystroke': [], 'model keystroke': [], 'full name': [], 'typo': []}
+    for row in rng.choice(len(df), n, replace=False):
+        model = f"{df['Model'].iat[row]} {df['String Pattern'].iat[row]}"
+        name = f"{df['Brand'].iat[row]} {model}"
+        kinds['keystroke'].append((name[:rng.integers(1, len(name) + 1)], row))
+        kinds['model keystroke'].append((model[:rng.integers(1, len(model) + 1)], row))
+        kinds['full name'].append((name, row))
+        kinds['typo'].append((swap_letters(name, rng), row))
+    return kinds
+
+
+def main(sizes, n_queries, k):
+    rng = np.random.default_rng(0)
+    model = RacquetModel(read_racquets_csv(DATABASE_PATH))
+    print(f"{'rows':>10} {'kind':>16} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'hit rate':>9}")
+    failures = []
+    for n in sizes:
+        df = model.sample(n, rng).astype({'Brand': str, 'String Pattern': str})
+        start = time.perf_counter()
+        index = SearchIndex(df)
+        t_build = time.perf_counter() - start
+        print(f'{n:>10} index built in {t_build:.2f} s, {index_bytes(index) / 2**20:.0f} MiB')
+        for kind, items in queries(df, min(n_queries, n), rng).items():
+            for query, _ in items[:50]:
+                index.search(query, k)
+            times, hits = [], 0
+            for query, row in items:
+                start = time.perf_counter()
+                rows, _ = index.search(query, k)
+                times.append(time.perf_counter() - start)
+                if kind == 'full name':
+                    hits += len(rows) > 0 and rows[0] == row
+                else:
+                    hits += row in rows
+            times = 1000 * np.array(times)
+            p50, p99 = np.percentile(times, [50, 99])
+            rate = hits / len(items)
+            print(f"{'':>10} {kind:>16} {p50:>8.3f} {p99:>8.3f} {times.max():>8.3f} {rate:>9.3f}")
+            if p50 > BUDGET_MS:
+                failures.append(f'{n} rows, {kind}: median {p50:.3f} ms over {BUDGET_MS} ms')
+            if kind == 'full name' and rate < 1:
+                failures.append(f'{n} rows: a full-name query did not return its racquet first')
+            if kind == 'typo' and rate < MIN_TYPO_RECALL:
+                failures.append(f'{n} rows: typo recall {rate:.3f} below {MIN_TYPO_RECALL}')
+    assert not failures, '; '.join(failures)
+    print(f'Median search within {BUDGET_MS} ms at every size')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('sizes', type=int, nargs='*', default=SIZES)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+    main(args.sizes, args.queries, args.k)
@@ -0,0 +1,88 @@
+# Benchmark Pareto skyline queries on synthetic datasets
+#
+# Usage: python benchmarks/bench_skyline.py [n_rows ...] [--check-rows 3000]
+#
+# Times SkylineEngine.frontier (uncached) for spec sets of 1 to 4 specs, from
+# correlated ones to directions that pull against each other (light but
+# stable racquets), over the whole dataset and over a sidebar-style filter.
+# Results on a random sample of check-rows racquets must equal a pairwise
+# reference. Fails if any query at the largest size exceeds BUDGET_S.
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+from dataset import DATABASE_PATH, read_racquets_csv
+from skyline import SkylineEngine, skyline
+from synthetic import RacquetModel
+
+SIZES = [10_000, 1_000_000]
+BUDGET_S = 1.0
+QUERIES = {
+    'min weight': {'Weight (g)': 'min'},
+    'max swingweight, min weight': {'Swingweight (kg cm^2)': 'max', 'Weight (g)': 'min'},
+    'max twistweight, max sweet zone': {'Twistweight (kg cm^2)': 'max', 'Sweet Zone (sq in)': 'max'},
+    'max twistweight, max sweet zone, min weight': {
+        'Twistweight (kg cm^2)': 'max', 'Sweet Zone (sq in)': 'max', 'Weight (g)': 'min'},
+    'max swingweight, max twistweight, min weight, min stiffness': {
+        'Swingweight (kg cm^2)': 'max', 'Twistweight (kg cm^2)': 'max', 'Weight (g)': 'min', 'RA Stiffness': 'min'},
+}
+
+
+def reference(values, maximize):
+    """Pareto rows by comparing every pair of rows."""
+    values = np.where(maximize, values, -values)
+    keep = []
+    for i, row in enumerate(values):
+        if np.isnan(row).any():
+            continue
+        ge = (values >= row).all(axis=1)
+        gt = (values > row).any(axis=1)
+        if not (ge & gt).any():
+            keep.append(i)
+    return np.array(keep, dtype=np.int64)
+
+
+def check(df, n, rng):
+    rows = rng.choice(len(df), min(n, len(df)), replace=False)
+    for directions in QUERIES.values():
+        values = df[list(directions)].to_numpy(dtype=float)[rows]
+        # Coarse copies give many ties and duplicates
+        for v in [values, np.round(values / 5) * 5]:
+            maximize = np.array([d == 'max' for d in directions.values()])
+            np.testing.assert_array_equal(skyline(v, maximize), reference(v, maximize))
+
+
+def main(sizes, check_rows):
+    rng = np.random.default_rng(0)
+    model = RacquetModel(read_racquets_csv(DATABASE_PATH))
+    check(model.sample(check_rows, rng), check_rows, rng)
+    print(f'Skylines of {check_rows} racquets match the pairwise reference')
+    print(f"{'rows':>10} {'filter':>8} {'ms':>8} {'skyline':>8}  specs")
+    slowest = 0
+    for n in sizes:
+        df = model.sample(n, rng)
+        mask = (df['Headsize (sq in)'] >= 98).to_numpy() & (df['Weight (g)'] <= 320).to_numpy()
+        for name, directions in QUERIES.items():
+            for label, m in [('all', None), ('sidebar', mask)]:
+                engine = SkylineEngine(df)
+                start = time.perf_counter()
+                rows = engine.frontier(directions, m)
+                elapsed = time.perf_counter() - start
+                print(f'{n:>10} {label:>8} {1000 * elapsed:>8.1f} {len(rows):>8}  {name}')
+                if n == sizes[-1]:
+                    slowest = max(slowest, elapsed)
+    assert slowest <= BUDGET_S, f'slowest skyline at {sizes[-1]} rows took {slowest:.2f} s, over {BUDGET_S} s'
+    print(f'Every skyline at {sizes[-1]} rows within {BUDGET_S} s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('sizes', type=int, nargs='*', default=SIZES)
+    parser.add_argument('--check-rows', type=int, default=3000)
+    args = parser.parse_args()
+    main(args.sizes, args.check_rows)
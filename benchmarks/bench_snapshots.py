@@ -0,0 +1,90 @@
+# Benchmark the snapshot store: storage growth, as-of and diff latency
+#
+# Usage: python benchmarks/bench_snapshots.py [n_rows] [--versions 100] [--change-rate 0.002]
+#
+# Simulates a series of scrapes of a synthetic database where a small
+# fraction of racquets change specs, get discontinued or are added each
+# time. Reports the store size against keeping a full copy per scrape, and
+# the time of as-of and diff queries; as-of results must equal the
+# simulated tables.
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+import pandas as pd
+from dataset import DATABASE_PATH, DF_COLS, SPEC_COLS, read_racquets_csv
+from snapshots import KEY_COLS, SnapshotStore
+from synthetic import RacquetModel
+
+
+def next_scrape(df, rate, rng, version):
+    """df after one site update: spec changes, discontinued and new racquets."""
+    df = df.copy()
+    n_changes = max(1, int(len(df) * rate))
+    changed = rng.choice(len(df), n_changes, replace=False)
+    df.loc[changed, 'Weight (g)'] += 1
+    current = np.flatnonzero(df['Current'].to_numpy())
+    df.loc[rng.choice(current, n_changes // 4, replace=False), 'Current'] = False
+    new = df.iloc[rng.choice(len(df), n_changes // 4, replace=False)].copy()
+    new['Model'] = new['Model'] + f' v{version}'
+    new['Current'] = True
+    df = pd.concat([df, new], ignore_index=True).drop_duplicates(KEY_COLS)
+    return df.sort_values(KEY_COLS).reset_index(drop=True)
+
+
+def main(n, n_versions, rate):
+    rng = np.random.default_rng(0)
+    df = RacquetModel(read_racquets_csv(DATABASE_PATH)).sample(n, rng).astype({'Brand': str, 'String Pattern': str})
+    df = df.sort_values(KEY_COLS).reset_index(drop=True)
+    start_date = datetime(2024, 1, 1)
+    tables = []
+    with tempfile.TemporaryDirectory() as path:
+        store = SnapshotStore(path)
+        full_bytes = 0
+        start = time.perf_counter()
+        for v in range(n_versions):
+            if v:
+                df = next_scrape(df, rate, rng, v)
+            store.append(df, start_date + timedelta(days=v))
+            tables.append(df)
+            full_bytes += len(df) * (len(DF_COLS) * 8)
+        t_append = (time.perf_counter() - start) / n_versions
+        versions = store.versions()
+        store_bytes = sum(v['bytes'] for v in versions)
+        delta_bytes = sum(v['bytes'] for v in versions[1:])
+        print(f'{n} racquets, {n_versions} versions, {rate:.1%} changed per version')
+        print(f'store: {store_bytes / 2**20:.1f} MiB (first version {versions[0]["bytes"] / 2**20:.1f} MiB, '
+              f'deltas {delta_bytes / max(n_versions - 1, 1) / 1024:.1f} KiB each); '
+              f'full copies (uncompressed): {full_bytes / 2**20:.0f} MiB')
+        print(f'append: {1000 * t_append:.0f} ms per version')
+
+        for v in [1, n_versions // 2, n_versions]:
+            fresh = SnapshotStore(path)
+            start = time.perf_counter()
+            table = fresh.as_of(v)
+            elapsed = time.perf_counter() - start
+            expected = tables[v - 1][DF_COLS].astype({'Brand': object, 'String Pattern': object, **{s: float for s in SPEC_COLS}})
+            pd.testing.assert_frame_equal(table, expected, check_dtype=False)
+            print(f'as-of version {v:>4} (cold): {1000 * elapsed:8.1f} ms, {len(table)} racquets')
+        start = time.perf_counter()
+        changes = store.diff(start_date, start_date + timedelta(days=n_versions - 1))
+        elapsed = time.perf_counter() - start
+        counts = changes['Change'].value_counts().to_dict()
+        print(f'diff first..last (warm): {1000 * elapsed:8.1f} ms, {counts}')
+    print('As-of tables match the simulated scrapes')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('n', type=int, nargs='?', default=100_000)
+    parser.add_argument('--versions', type=int, default=100)
+    parser.add_argument('--change-rate', type=float, default=0.002)
+    args = parser.parse_args()
+    main(args.n, args.versions, args.change_rate)
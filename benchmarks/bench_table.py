@@ -0,0 +1,77 @@
+# Benchmark the Discover results table: full Plotly table vs the paginated,
+# server-side sorted table
+#
+# Usage: python benchmarks/bench_table.py [n_rows ...]
+#
+# Each rerun takes a random half of the dataset as the filter mask, sorts it
+# by (Brand, Current, Model) and builds the table figure. Payload is the size
+# of the figure JSON sent to the browser. Both paths must produce the same
+# first page.
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+import plotly.graph_objects as go
+from dataset import read_racquets_csv, DATABASE_PATH
+from tables import SortIndex, page_bounds
+
+SIZES = [1_244, 100_000, 1_000_000]
+RERUNS = 5
+SORT_COLS = ('Brand', 'Current', 'Model')
+PAGE_SIZE = 25
+
+
+def synthetic_racquets(n, seed=0):
+    base = read_racquets_csv(DATABASE_PATH)
+    if n == len(base):
+        return base
+    rng = np.random.default_rng(seed)
+    return base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+
+
+def table_figure(sub_df):
+    return go.Figure(data=[go.Table(
+        header=dict(values=list(sub_df.columns)),
+        cells=dict(values=[sub_df[c] for c in sub_df.columns])
+    )])
+
+
+def table_full(df, mask):
+    # Former page implementation: every filtered row is sent
+    sub_df = df.iloc[np.flatnonzero(mask)].sort_values(by=list(SORT_COLS), kind='stable')
+    return sub_df, table_figure(sub_df).to_json()
+
+
+def table_paged(df, sidx, mask):
+    rows = sidx.sort_rows(mask, SORT_COLS)
+    start, stop = page_bounds(len(rows), 1, PAGE_SIZE)
+    page_df = df.iloc[rows[start:stop]]
+    return page_df, table_figure(page_df).to_json()
+
+
+def main(sizes):
+    print(f"{'rows':>9} {'full ms':>9} {'full KB':>9} {'paged ms':>9} {'paged KB':>9}")
+    for n in sizes:
+        df = synthetic_racquets(n)
+        sidx = SortIndex(df)
+        sidx.order(SORT_COLS)
+        rng = np.random.default_rng(1)
+        full, paged = [], []
+        for _ in range(RERUNS):
+            mask = rng.random(n) < 0.5
+            start = time.perf_counter()
+            expected, full_json = table_full(df, mask)
+            full.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            result, paged_json = table_paged(df, sidx, mask)
+            paged.append(time.perf_counter() - start)
+            assert (expected.iloc[:PAGE_SIZE][list(SORT_COLS)].values == result[list(SORT_COLS)].values).all()
+        print(f"{n:>9} {1000 * np.median(full):>9.1f} {len(full_json) / 1024:>9.0f} {1000 * np.median(paged):>9.1f} {len(paged_json) / 1024:>9.0f}")
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or SIZES)
@@ -0,0 +1,62 @@
+# Benchmark ingest validation on synthetic listings with planted errors
+#
+# Usage: python benchmarks/bench_validation.py [n_rows ...]
+#
+# Each table gets ERROR_RATE of its rows broken in one of four ways: a spec
+# shifted by a decimal place, a missing spec, an impossible value, or a
+# stale derived spec. Validation must correct the shifted and stale values,
+# quarantine exactly the missing and impossible ones, and finish within
+# its time budget.
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+from dataset import DATABASE_PATH, read_racquets_csv
+from synthetic import RacquetModel
+from validation import SPEC_RANGES, validate
+
+SIZES = [100_000, 1_000_000]
+ERROR_RATE = 0.01
+
+
+def broken_listings(n, seed=0):
+    """(listings, planted) where planted maps each kind of error to its rows."""
+    rng = np.random.default_rng(seed)
+    df = RacquetModel(read_racquets_csv(DATABASE_PATH)).sample(n, rng).astype({'Brand': str, 'String Pattern': str})
+    for s in list(SPEC_RANGES) + ['Recoil Weight (kg cm^2)', 'Polarization Index', 'MgR/I']:
+        df[s] = df[s].astype(np.float64)
+    rows = rng.choice(n, int(n * ERROR_RATE), replace=False)
+    planted = dict(zip(['shifted', 'missing', 'impossible', 'stale'], np.array_split(rows, 4)))
+    # Weight and Twistweight shifted by a decimal place either way
+    df.loc[planted['shifted'], 'Weight (g)'] *= 10
+    df.loc[planted['missing'], 'Balance (cm)'] = np.nan
+    df.loc[planted['impossible'], 'Swingweight (kg cm^2)'] = -1
+    df.loc[planted['stale'], 'Recoil Weight (kg cm^2)'] += 5
+    return df, planted
+
+
+def main(sizes):
+    print(f"{'rows':>10} {'seconds':>8} {'budget s':>9} {'rows/s':>12} {'fixed':>7} {'stale':>7} {'quarantined':>12}")
+    for n in sizes:
+        df, planted = broken_listings(n)
+        start = time.perf_counter()
+        clean, quarantined, report = validate(df)
+        elapsed = time.perf_counter() - start
+        checks = report['checks']
+        fixed = checks['fixes']['Weight (g)']['count']
+        stale = checks['consistency']['Recoil Weight (kg cm^2)']['count']
+        print(f"{n:>10} {elapsed:>8.3f} {report['budget_seconds']:>9.2f} {n / elapsed:>12.0f} {fixed:>7} {stale:>7} {report['quarantined']:>12}")
+        assert fixed == len(planted['shifted']), 'shifted weights not all corrected'
+        assert stale >= len(planted['stale']), 'stale recoil weights not all found'
+        assert set(quarantined.index) == set(planted['missing']) | set(planted['impossible']), 'wrong rows quarantined'
+        assert np.allclose(clean.loc[planted['shifted'], 'Weight (g)'], df.loc[planted['shifted'], 'Weight (g)'] / 10)
+        assert report['within_budget'], 'validation over its time budget'
+    print('Planted errors corrected or quarantined')
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or SIZES)
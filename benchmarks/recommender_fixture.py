@@ -0,0 +1,222 @@
+# Fixture recommender pages and a local stand-in for the TWU server
+#
+# Usage: python benchmarks/recommender_fixture.py [--rows N] [--port 8000]
+#
+# Pages are rebuilt from racquet_database.csv (resampled to N rows if given)
+# in the same `circlegrey current|notcurrent` div / '||'-separated id layout
+# that scrape_tw_data.py parses. The server answers conditional requests with
+# ETag / Last-Modified so incremental scraping can be exercised offline:
+#
+#   python scrape_tw_data.py --incremental --url http://localhost:8000/ --out /tmp/db.csv ...
+#
+# It also serves a detail page per racquet for scrape_details.py, with
+# optional latency and injected 503 answers to exercise retries:
+#
+#   python scrape_details.py --detail-url 'http://localhost:8000/detail?brand={brand}&model={model}&pattern={pattern}' ...
+import argparse
+import email.utils
+import hashlib
+import html
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+import pandas as pd
+from dataset import read_racquets_csv, DATABASE_PATH
+
+# Position of each database column in the '||'-separated id string
+COL_TO_IDX = {
+    'Brand': 1,
+    'Model': 2,
+    'Headsize (sq in)': 4,
+    'Length (in)': 5,
+    'Swingweight (kg cm^2)': 6,
+    'Twistweight (kg cm^2)': 7,
+    'Vibration Frequency (Hz)': 14,
+    'Sweet Zone (sq in)': 15,
+    'Weight (g)': 16,
+    'Balance (cm)': 17,
+    'Beam Width (mm)': 19,
+    'RA Stiffness': 24
+}
+N_FIELDS = 28
+
+
+def fixture_racquets(n=None, seed=0):
+    """Racquets from the database, optionally resampled to n listings."""
+    df = read_racquets_csv(DATABASE_PATH).astype({'Brand': str, 'String Pattern': str})
+    if n is not None:
+        rng = np.random.default_rng(seed)
+        df = df.iloc[rng.integers(0, len(df), n)].reset_index(drop=True)
+        df['Model'] = df['Model'] + ' ' + pd.Series(np.arange(n)).astype(str)
+    return df
+
+
+def racquet_id(row):
+    fields = ['0'] * N_FIELDS
+    for c, i in COL_TO_IDX.items():
+        value = row[c]
+        if c == 'Model':
+            value = '_'.join(value.split(' '))
+        elif c != 'Brand':
+            value = f'{float(value):g}'
+        fields[i] = value
+    mains, crosses = row['String Pattern'].split('x')
+    fields[-3] = mains
+    fields[-2] = f'{crosses}0'
+    return '||'.join(fields)
+
+
+def fixture_page(df):
+    """Render racquets as a recommender page."""
+    divs = []
+    for row in df.to_dict('records'):
+        cls = 'current' if row['Current'] else 'notcurrent'
+        divs.append(f'<div class="circlegrey {cls}" id="{html.escape(racquet_id(row))}"></div>')
+    return ('<html><head><title>Racquet Recommender</title></head><body>\n'
+            + '\n'.join(divs) + '\n</body></html>\n').encode()
+
+
+# Fields shown on the fixture detail pages, besides the database specs
+DETAIL_FIELDS = ['Composition', 'Power Level', 'Stiffness', 'Swing Speed']
+COMPOSITIONS = ['Graphite', 'Graphite/Basalt', 'Graphite/Kevlar', 'Graphite/Textreme']
+
+
+def fixture_details(row):
+    """Detail fields for a racquet, derived deterministically from its key."""
+    seed = int(hashlib.sha1(f"{row['Brand']}|{row['Model']}|{row['String Pattern']}".encode()).hexdigest()[:8], 16)
+    return {
+        'Composition': COMPOSITIONS[seed % len(COMPOSITIONS)],
+        'Power Level': ['Low', 'Low-Medium', 'Medium', 'Medium-High', 'High'][seed // 7 % 5],
+        'Stiffness': f"{row['RA Stiffness']:g}",
+        'Swing Speed': ['Moderate', 'Moderate-Fast', 'Fast'][seed // 41 % 3]
+    }
+
+
+def fixture_detail_page(row):
+    """Render a racquet's detail page with its spec table."""
+    rows = ''.join(f'<tr><th>{html.escape(k)}:</th><td>{html.escape(v)}</td></tr>\n' for k, v in fixture_details(row).items())
+    title = html.escape(f"{row['Brand']} {row['Model']}")
+    return (f'<html><head><title>{title}</title></head><body><h1>{title}</h1>\n'
+            f'<table class="specs">\n{rows}</table>\n</body></html>\n').encode()
+
+
+class FixtureServer:
+    """Serve a page on localhost with ETag / Last-Modified validators.
+
+    set_page() swaps the served content, as a site update would. With
+    details (a DataFrame of racquets), /detail?brand=&model=&pattern= serves
+    each racquet's detail page after latency seconds, answering a fail_rate
+    fraction of detail requests with 503 instead.
+    """
+
+    def __init__(self, page, port=0, details=None, latency=0.0, fail_rate=0.0, seed=0):
+        self.requests = 0
+        self.not_modified = 0
+        self.failed = 0
+        self.set_page(page)
+        self.details = {}
+        if details is not None:
+            for row in details.to_dict('records'):
+                self.details[(row['Brand'], row['Model'], row['String Pattern'])] = fixture_detail_page(row)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, so pooled clients reuse their connections; headers
+            # and body go out as separate writes, so Nagle would stall each
+            # response on the client's delayed ACK
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def send_body(self, status, body):
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_detail(self, query):
+                time.sleep(fixture.latency)
+                with fixture._lock:
+                    fail = fixture._rng.random() < fixture.fail_rate
+                    fixture.failed += fail
+                if fail:
+                    self.send_body(503, b'busy')
+                    return
+                key = tuple(query.get(k, [''])[0] for k in ['brand', 'model', 'pattern'])
+                body = fixture.details.get(key)
+                if body is None:
+                    self.send_body(404, b'not found')
+                else:
+                    self.send_body(200, body)
+
+            def do_GET(self):
+                with fixture._lock:
+                    fixture.requests += 1
+                url = urlsplit(self.path)
+                if url.path == '/detail':
+                    self.do_detail(parse_qs(url.query))
+                    return
+                etag, modified, body = fixture.etag, fixture.last_modified, fixture.page
+                if self.headers.get('If-None-Match') == etag:
+                    fixture.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', modified)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def set_page(self, page):
+        self.page = page
+        self.etag = '"' + hashlib.sha1(page).hexdigest() + '"'
+        self.last_modified = email.utils.formatdate(time.time(), usegmt=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve a fixture recommender page.')
+    parser.add_argument('--rows', type=int, default=None, help='resample the database to this many listings')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds before answering a detail request')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='fraction of detail requests answered with 503')
+    args = parser.parse_args()
+    racquets = fixture_racquets(args.rows)
+    with FixtureServer(fixture_page(racquets), args.port, racquets, args.latency, args.fail_rate) as server:
+        print(f'Serving fixture recommender page at {server.url}')
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            pass
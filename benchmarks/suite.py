@@ -0,0 +1,261 @@
+# Benchmark suite for the data pipeline
+#
+# Usage:
+#   python benchmarks/suite.py run [--sizes 1244 10000 100000] [--cases filter match ...] [--out results.json]
+#   python benchmarks/suite.py compare base.json new.json [--threshold 0.1]
+#
+# run times every case at each dataset size (synthetic racquets resampled
+# from the database) and writes the per-call timings to a JSON file along
+# with the commit and library versions. compare matches cases by name and
+# size between two result files and exits with status 1 if any case got
+# slower by more than the threshold.
+#
+# Cases:
+#   scrape_parse        extract + parse a rendered recommender page
+#   load_csv            read_racquets_csv
+#   load_columnar       read_racquets_columnar (memory-mapped)
+#   filter              Discover sidebar filter chain on a FilterIndex
+#   radar_rescale       utils.radar_rescale over the whole dataset
+#   radar_rescale_rows  utils.radar_rescale_rows for 20 racquets
+#   facets              FacetChain update after a slider moves 1% of rows
+#   match               uncached MatchEngine.top_k, k=25, random weights
+#   customize           customization grid, 7 g at 0.01 g (size independent)
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import numpy as np
+import pandas as pd
+from bench_filter import filter_indexed, random_selection
+from bench_match import synthetic_racquets
+from recommender_fixture import fixture_page, fixture_racquets
+from customize import _racquet_specs, _surfaces
+from dataset import SPEC_COLS, read_racquets_columnar, read_racquets_csv, spec_stats, write_columnar
+from facets import FacetChain
+from filters import FilterIndex
+from matching import MatchEngine
+from scrape_tw_data import extract_datapoints, parse_racquets
+from utils import radar_rescale, radar_rescale_rows
+
+SIZES = [1_244, 10_000, 100_000]
+REPEAT = 5
+MIN_REPEAT_SECONDS = 0.2
+DEFAULT_THRESHOLD = 0.10
+RADAR_SPECS = ['Weight (g)', 'Balance (cm)', 'Swingweight (kg cm^2)', 'RA Stiffness', 'Beam Width (mm)']
+
+###############
+#### Cases ####
+###############
+# Each case takes the dataset size and a scratch directory and returns the
+# function to time; setup work done before returning is not timed.
+
+
+def case_scrape_parse(n, tmp):
+    page = fixture_page(fixture_racquets(n))
+    return lambda: parse_racquets(extract_datapoints(page))
+
+
+def case_load_csv(n, tmp):
+    path = os.path.join(tmp, f'racquets_{n}.csv')
+    if not os.path.exists(path):
+        synthetic_racquets(n).to_csv(path, index=False)
+    return lambda: read_racquets_csv(path)
+
+
+def case_load_columnar(n, tmp):
+    path = os.path.join(tmp, f'racquets_{n}_columns')
+    if not os.path.exists(path):
+        write_columnar(synthetic_racquets(n), path)
+    return lambda: read_racquets_columnar(path)
+
+
+def case_filter(n, tmp):
+    df = synthetic_racquets(n)
+    fidx = FilterIndex(df)
+    selection = random_selection(df, np.random.default_rng(1))
+    return lambda: filter_indexed(fidx, *selection)
+
+
+def case_facets(n, tmp):
+    df = synthetic_racquets(n)
+    chain = FacetChain(FilterIndex(df))
+    rng = np.random.default_rng(1)
+    masks = [rng.random(n) < 0.8]
+    masks.append(masks[0] ^ (rng.random(n) < 0.01))
+    state = {'i': 0}
+
+    def update():
+        state['i'] ^= 1
+        for s in SPEC_COLS:
+            chain.facets(s, masks[state['i']], spec=s)
+    return update
+
+
+def case_radar_rescale(n, tmp):
+    df = synthetic_racquets(n)
+    return lambda: radar_rescale(df, RADAR_SPECS, 1, 5)
+
+
+def case_radar_rescale_rows(n, tmp):
+    df = synthetic_racquets(n)
+    stats = spec_stats(df)
+    rows = df.iloc[np.random.default_rng(1).integers(0, n, 20)]
+    return lambda: radar_rescale_rows(rows, RADAR_SPECS, stats, 1, 5)
+
+
+def case_match(n, tmp):
+    df = synthetic_racquets(n)
+    engine = MatchEngine(df, cache_size=0)
+    rng = np.random.default_rng(1)
+    target = int(rng.integers(0, n))
+    weights = rng.integers(0, 101, len(SPEC_COLS)).astype(float)
+    return lambda: engine.top_k(target, weights, 25)
+
+
+def case_customize(n, tmp):
+    specs = _racquet_specs(synthetic_racquets(1_244).iloc[0])
+    # Bypass the LRU cache so every call computes the grid
+    return lambda: _surfaces.__wrapped__(specs, 7.0, 0.01)
+
+
+CASES = {
+    'scrape_parse': case_scrape_parse,
+    'load_csv': case_load_csv,
+    'load_columnar': case_load_columnar,
+    'filter': case_filter,
+    'facets': case_facets,
+    'radar_rescale': case_radar_rescale,
+    'radar_rescale_rows': case_radar_rescale_rows,
+    'match': case_match,
+    'customize': case_customize
+}
+SIZE_INDEPENDENT = {'customize'}
+
+#################
+#### Running ####
+#################
+
+
+def time_case(func, repeat=REPEAT):
+    """Seconds per call for each of repeat timing runs.
+
+    Fast functions are looped within a run so that each run lasts at least
+    MIN_REPEAT_SECONDS.
+    """
+    start = time.perf_counter()
+    func()
+    first = time.perf_counter() - start
+    number = max(1, int(MIN_REPEAT_SECONDS / max(first, 1e-9)))
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    return times, number
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(cases, sizes, repeat, out):
+    results = {}
+    print(f"{'case':<20} {'rows':>9} {'median ms':>11} {'min ms':>9} {'loops':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in cases:
+            for n in (sizes[:1] if name in SIZE_INDEPENDENT else sizes):
+                func = CASES[name](n, tmp)
+                times, number = time_case(func, repeat)
+                key = f'{name}[{n}]'
+                results[key] = {
+                    'case': name,
+                    'rows': n,
+                    'median': float(np.median(times)),
+                    'min': float(np.min(times)),
+                    'max': float(np.max(times)),
+                    'loops': number,
+                    'times': times
+                }
+                print(f"{name:<20} {n:>9} {1000 * results[key]['median']:>11.3f} {1000 * results[key]['min']:>9.3f} {number:>6}")
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.platform(),
+        'cpus': os.cpu_count(),
+        'repeat': repeat,
+        'results': results
+    }
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'-> {out}')
+
+
+def compare(base_path, new_path, threshold):
+    """Print per-case change in median time; True if any case regressed."""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"base: {base_path} ({base.get('commit')})  new: {new_path} ({new.get('commit')})")
+    print(f"{'case':<30} {'base ms':>10} {'new ms':>10} {'change':>8}")
+    regressed = False
+    for key, result in new['results'].items():
+        if key not in base['results']:
+            print(f"{key:<30} {'-':>10} {1000 * result['median']:>10.3f} {'new':>8}")
+            continue
+        base_result = base['results'][key]
+        ratio = result['median'] / base_result['median']
+        # Only count a slowdown when even the fastest new run is slower than
+        # the threshold allows, so a single noisy run does not fail
+        flag = ''
+        if ratio > 1 + threshold and result['min'] > base_result['median'] * (1 + threshold):
+            flag = '  REGRESSION'
+            regressed = True
+        elif ratio < 1 / (1 + threshold):
+            flag = '  faster'
+        print(f"{key:<30} {1000 * base_result['median']:>10.3f} {1000 * result['median']:>10.3f} {ratio - 1:>+8.1%}{flag}")
+    for key in base['results']:
+        if key not in new['results']:
+            print(f"{key:<30} {1000 * base['results'][key]['median']:>10.3f} {'-':>10} {'missing':>8}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Racquet Savant benchmark suite')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run the benchmarks and write a JSON results file')
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='dataset sizes (rows)')
+    run_parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES), help='cases to run')
+    run_parser.add_argument('--repeat', type=int, default=REPEAT, help='timing runs per case')
+    run_parser.add_argument('--out', default='benchmark_results.json', help='results file')
+    compare_parser = commands.add_parser('compare', help='compare two results files')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='allowed slowdown as a fraction (0.1 = 10%%)')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        run(args.cases, args.sizes, args.repeat, args.out)
+    elif compare(args.base, args.new, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+# Build the standardized feature matrix opened by the Match page
+#
+# The scraper already writes it for the default dataset; run this for other
+# datasets (e.g. one from synthetic.py) or after changing the spec columns:
+#   python build_features.py [--dataset racquets_10m_columns] [--out racquet_features]
+import argparse
+import os
+import time
+
+from dataset import load_racquets, load_info
+from matching import FEATURES_CHUNK_ROWS, FEATURES_PATH, write_features
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write the standardized spec matrix, scaler statistics and row ids.')
+    parser.add_argument('--dataset', default=None, help='dataset path (default: columnar dataset, else CSV)')
+    parser.add_argument('--out', default=FEATURES_PATH, help='feature artifact directory')
+    parser.add_argument('--chunk-rows', type=int, default=FEATURES_CHUNK_ROWS, help='rows standardized at a time')
+    args = parser.parse_args()
+
+    df = load_racquets(args.dataset)
+    info = load_info(args.dataset)
+    start = time.perf_counter()
+    manifest = write_features(df, info['hash'], args.out, chunk_rows=args.chunk_rows)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(os.path.join(args.out, 'matrix.npy'))
+    print(f"{manifest['rows']} racquets x {len(manifest['spec_cols'])} specs in {elapsed:.1f} s ({size / 2**20:.1f} MiB) -> {args.out}")
@@ -0,0 +1,28 @@
+# Build the equal-weight nearest-neighbour table served by the Match page
+#
+# Run after scrape_tw_data.py:
+#   python build_neighbours.py [--neighbours 50] [--processes 4] [--memory-mb 256]
+import argparse
+import os
+import time
+
+from dataset import load_racquets, load_info
+from matching import NEIGHBOURS_PATH, build_neighbours, match_engine, write_neighbours
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompute each racquet\'s nearest neighbours for default-weight matching.')
+    parser.add_argument('--dataset', default=None, help='dataset path (default: columnar dataset, else CSV)')
+    parser.add_argument('--out', default=NEIGHBOURS_PATH, help='neighbour table directory')
+    parser.add_argument('--neighbours', type=int, default=50, help='neighbours stored per racquet')
+    parser.add_argument('--processes', type=int, default=1, help='worker processes')
+    parser.add_argument('--memory-mb', type=int, default=256, help='memory bound per distance block')
+    args = parser.parse_args()
+
+    df = load_racquets(args.dataset)
+    info = load_info(args.dataset)
+    start = time.perf_counter()
+    ids, dist = build_neighbours(match_engine(df).matrix, args.neighbours, args.memory_mb, args.processes)
+    manifest = write_neighbours(ids, dist, info['hash'], args.out)
+    elapsed = time.perf_counter() - start
+    size = sum(os.path.getsize(os.path.join(args.out, f)) for f in ['ids.npy', 'distances.npy'])
+    print(f"{manifest['rows']} racquets x {manifest['n_neighbours']} neighbours in {elapsed:.1f} s ({size / 2**20:.1f} MiB) -> {args.out}")
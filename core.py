@@ -0,0 +1,151 @@
+# Headless racquet API
+#
+# The filtering, radar scaling and matching the pages perform, as plain
+# functions over a loaded dataset with no Streamlit dependency, for scripts
+# and batch jobs (see match_batch.py).
+#
+#   from core import load_racquets, filter_mask, match
+#   df = load_racquets()
+#   mask = filter_mask(df, availability=[True], brands=['Head', 'Wilson'])
+#   match(df, find_racquet(df, 'Head', 'Speed MP 2022'), k=10, mask=mask)
+#   search_racquets(df, 'speed mp', k=5)
+#   pareto_frontier(df, {'Twistweight (kg cm^2)': 'max', 'Weight (g)': 'min'}, mask=mask)
+import numpy as np
+
+from dataset import SPEC_COLS, load_racquets, spec_stats
+from filters import filter_index
+from matching import match_engine
+from search import search_index
+from skyline import skyline_engine
+from utils import radar_rescale_rows
+
+__all__ = [
+    'load_racquets', 'filter_mask', 'filter_racquets', 'find_racquet', 'search_racquets', 'pareto_frontier',
+    'radar_values', 'weight_vector', 'match', 'target_matrix', 'match_specs'
+]
+
+DEFAULT_WEIGHT = 50
+
+
+def filter_mask(df, availability=None, brands=None, spec_ranges=None, string_patterns=None):
+    """Boolean row mask for the sidebar filters; None leaves a filter off.
+
+    availability is a list of Current values (True for available,
+    False for discontinued), spec_ranges maps a spec to (min, max).
+    """
+    fidx = filter_index(df)
+    mask = fidx.all_rows()
+    if availability is not None:
+        mask &= fidx.category_mask('Current', availability)
+    if brands is not None:
+        mask &= fidx.category_mask('Brand', brands)
+    for s, (min_val, max_val) in (spec_ranges or {}).items():
+        mask &= fidx.range_mask(s, min_val, max_val)
+    if string_patterns is not None:
+        mask &= fidx.category_mask('String Pattern', string_patterns)
+    return mask
+
+
+def filter_racquets(df, **filters):
+    """Copy of the racquets passing filter_mask(df, **filters)."""
+    return filter_index(df).materialize(filter_mask(df, **filters))
+
+
+def find_racquet(df, brand, model):
+    """Row position of a racquet by brand and model; KeyError if absent."""
+    rows = np.flatnonzero((df['Brand'] == brand).to_numpy() & (df['Model'] == model).to_numpy())
+    if len(rows) == 0:
+        raise KeyError(f'{brand} {model}')
+    return int(rows[0])
+
+
+def search_racquets(df, query, k=10, mask=None):
+    """The k racquets whose names best match query, as a DataFrame.
+
+    Fuzzy, typeahead-style: see search.SearchIndex.search. Adds a Match
+    Score column in front of the specs.
+    """
+    rows, scores = search_index(df).search(query, k, mask)
+    result = df.iloc[rows].copy()
+    result.insert(0, 'Match Score', scores)
+    return result
+
+
+def pareto_frontier(df, directions, mask=None):
+    """Racquets on the Pareto frontier of directions, as a DataFrame.
+
+    directions maps each spec to 'max' or 'min', e.g.
+    {'Twistweight (kg cm^2)': 'max', 'Weight (g)': 'min'}; a racquet is kept
+    unless another one is as good on every spec and better on one.
+    """
+    return df.iloc[skyline_engine(df).frontier(directions, mask)]
+
+
+def radar_values(df, rows, spec_cols, scale_min=1, scale_max=5):
+    """Specs of rows rescaled to [scale_min, scale_max] against the whole dataset."""
+    return radar_rescale_rows(df.iloc[rows], spec_cols, spec_stats(df), scale_min, scale_max)
+
+
+def weight_vector(weights=None, spec_cols=SPEC_COLS):
+    """Weights in spec order from a {spec: weight} mapping; unlisted specs get DEFAULT_WEIGHT."""
+    weights = weights or {}
+    unknown = set(weights) - set(spec_cols)
+    if unknown:
+        raise KeyError(f'Unknown specs: {sorted(unknown)}')
+    return np.array([weights.get(s, DEFAULT_WEIGHT) for s in spec_cols], dtype=float)
+
+
+def match(df, target, weights=None, k=25, mask=None):
+    """The k racquets most similar to row target, as a DataFrame.
+
+    weights is a {spec: weight} mapping or a vector in SPEC_COLS order.
+    Adds Similarity Rank and Distance columns in front of the specs.
+    """
+    if weights is None or isinstance(weights, dict):
+        weights = weight_vector(weights)
+    rows, dist, ranks = match_engine(df).top_k(target, weights, k, mask=mask)
+    result = df.iloc[rows].copy()
+    result.insert(0, 'Similarity Rank', ranks)
+    result.insert(1, 'Distance', dist)
+    return result
+
+
+def target_matrix(targets, spec_cols=SPEC_COLS):
+    """(m, n_specs) array from {spec: value} mappings; unlisted specs are NaN (open)."""
+    matrix = np.full((len(targets), len(spec_cols)), np.nan)
+    for i, target in enumerate(targets):
+        unknown = set(target) - set(spec_cols)
+        if unknown:
+            raise KeyError(f'Unknown specs: {sorted(unknown)}')
+        for j, s in enumerate(spec_cols):
+            if s in target and target[s] is not None:
+                matrix[i, j] = target[s]
+    return matrix
+
+
+def match_specs(df, targets, weights=None, k=25, mask=None):
+    """The k racquets nearest to each target spec set, as one DataFrame.
+
+    targets is a list of {spec: value} mappings, where specs left out are
+    ignored, or an array in SPEC_COLS order with NaN for open specs. All
+    targets are answered in one batched search. Adds Target (position in
+    targets), Similarity Rank and Distance columns. Raises ValueError when
+    there are no targets or a target sets no spec.
+    """
+    if len(targets) == 0:
+        raise ValueError('no targets')
+    if isinstance(targets, (list, tuple)) and isinstance(targets[0], dict):
+        targets = target_matrix(targets)
+    # A target with no spec would be at distance 0 from every racquet
+    empty = np.flatnonzero(np.isnan(np.asarray(targets, dtype=float)).all(axis=1))
+    if len(empty):
+        raise ValueError(f'targets {empty.tolist()} set no spec; enter at least one target spec')
+    if weights is None or isinstance(weights, dict):
+        weights = weight_vector(weights)
+    results = match_engine(df).top_k_specs(targets, weights, k, mask=mask)
+    rows = np.concatenate([r for r, _, _ in results])
+    result = df.iloc[rows].copy()
+    result.insert(0, 'Target', np.repeat(np.arange(len(results)), [len(r) for r, _, _ in results]))
+    result.insert(1, 'Similarity Rank', np.concatenate([ranks for _, _, ranks in results]))
+    result.insert(2, 'Distance', np.concatenate([dist for _, dist, _ in results]))
+    return result
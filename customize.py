@@ -0,0 +1,100 @@
+# Tip/tail customization surfaces for the Customize page
+#
+# For a racquet and a grid of lead masses added at the butt (tail) and the
+# tip, computes the resulting balance, swingweight, recoil weight,
+# polarization index and MgR/I over the whole grid with NumPy broadcasting.
+# Surfaces are cached per (racquet specs, grid spec). Grids are capped at
+# MAX_GRID_POINTS per axis (a finer step is coarsened) and few are cached,
+# so memory stays bounded; charts get a further downsampled copy.
+from functools import lru_cache
+
+import numpy as np
+
+from physics import CM_PER_IN, delta_balance, delta_recoilweight, delta_swingweight, mgr_over_i, polarization_index
+
+DEFAULT_MAX_MASS = 7.0
+DEFAULT_STEP = 0.01
+# 701 x 701 cells (7 g at 0.01 g) is about 4 MB per surface, 24 MB per grid
+MAX_GRID_POINTS = 701
+CACHE_SIZE = 4
+CHART_POINTS = 201
+
+
+def grid_masses(max_mass=DEFAULT_MAX_MASS, step=DEFAULT_STEP):
+    """Added masses (g) along each grid axis, from 0 to max_mass inclusive."""
+    n = int(round(max_mass / step)) + 1
+    return np.linspace(0, step * (n - 1), n)
+
+
+def grid_step(max_mass, step=DEFAULT_STEP):
+    """step, coarsened so the grid has at most MAX_GRID_POINTS per axis."""
+    if int(round(max_mass / step)) + 1 > MAX_GRID_POINTS:
+        return max_mass / (MAX_GRID_POINTS - 1)
+    return step
+
+
+def _customized(weight, length_in, balance, swingweight, recoil_weight, tail_mass, tip_mass):
+    length = CM_PER_IN * length_in
+    shift = delta_balance(weight, length, balance, tail_mass, tip_mass)
+    new_balance = balance + shift
+    new_weight = weight + tail_mass + tip_mass
+    # The frame's own recoil weight grows as the balance point moves away
+    # from it (parallel axis term), on top of the added masses' contribution
+    new_recoil_weight = recoil_weight + 0.001 * weight * shift**2 + delta_recoilweight(new_balance, length, tail_mass, tip_mass)
+    return {
+        'Weight (g)': new_weight,
+        'Balance (cm)': new_balance,
+        'Swingweight (kg cm^2)': swingweight + delta_swingweight(length, tail_mass, tip_mass),
+        'Recoil Weight (kg cm^2)': new_recoil_weight,
+        'Polarization Index': polarization_index(new_recoil_weight, new_weight, length_in),
+        'MgR/I': mgr_over_i(new_weight, new_balance, new_recoil_weight)
+    }
+
+
+def _racquet_specs(racquet):
+    return (float(racquet['Weight (g)']), float(racquet['Length (in)']), float(racquet['Balance (cm)']),
+            float(racquet['Swingweight (kg cm^2)']), float(racquet['Recoil Weight (kg cm^2)']))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _surfaces(specs, max_mass, step):
+    masses = grid_masses(max_mass, step)
+    # Rows are tip masses, columns tail masses
+    tail = masses[np.newaxis, :]
+    tip = masses[:, np.newaxis]
+    shape = (len(masses), len(masses))
+    surfaces = {'Tail Mass (g)': masses, 'Tip Mass (g)': masses}
+    for name, values in _customized(*specs, tail, tip).items():
+        surfaces[name] = np.broadcast_to(values, shape)
+    for arr in surfaces.values():
+        if arr.flags.writeable:
+            arr.flags.writeable = False
+    return surfaces
+
+
+def customization_surfaces(racquet, max_mass=DEFAULT_MAX_MASS, step=DEFAULT_STEP):
+    """Spec surfaces over a tail x tip mass grid for a racquet row.
+
+    racquet is a mapping with the database's Weight, Length, Balance,
+    Swingweight and Recoil Weight columns. Returns a dict of read-only
+    arrays: the two mass axes and a (n_tip, n_tail) array per spec. The
+    step is coarsened by grid_step when the grid would be too large.
+    """
+    max_mass = float(max_mass)
+    return _surfaces(_racquet_specs(racquet), max_mass, float(grid_step(max_mass, float(step))))
+
+
+def chart_grid(masses, surface, max_points=CHART_POINTS):
+    """(masses, surface) subsampled to at most max_points per axis, ends kept."""
+    stride = -(-len(masses) // max_points)
+    if stride <= 1:
+        return masses, surface
+    idx = np.arange(0, len(masses), stride)
+    if idx[-1] != len(masses) - 1:
+        idx = np.append(idx[:max_points - 1], len(masses) - 1)
+    return masses[idx], surface[np.ix_(idx, idx)]
+
+
+def customized_specs(racquet, tail_mass, tip_mass):
+    """Specs after adding tail_mass and tip_mass (g) to a racquet row."""
+    return _customized(*_racquet_specs(racquet), tail_mass, tip_mass)
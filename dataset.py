@@ -0,0 +1,408 @@
+# Shared racquet dataset loader
+#
+# Streamlit re-runs every page script on each widget interaction, so the
+# database is parsed here once per process and the same DataFrame is handed
+# to every session and page. The cache is invalidated when the file on disk
+# changes (mtime first, then content hash to ignore touch-only updates).
+#
+# The scraper writes the database twice: as racquet_database.csv and as a
+# columnar directory of .npy files plus a manifest.json. The columnar copy is
+# opened memory-mapped so the float specs are never parsed or copied; the CSV
+# is only read when the columnar copy is missing.
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_PATH = os.path.join(BASE_DIR, 'racquet_database.csv')
+COLUMNAR_PATH = os.path.join(BASE_DIR, 'racquet_database_columns')
+COLUMNAR_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+
+# Column layout of racquet_database.csv
+ID_COLS = ['Current', 'Brand', 'Model']
+CATEGORY_COLS = ['Brand', 'String Pattern']
+SPEC_COLS = [
+    'Headsize (sq in)',
+    'Length (in)',
+    'Beam Width (mm)',
+    'Weight (g)',
+    'Balance (cm)',
+    'Swingweight (kg cm^2)',
+    'Twistweight (kg cm^2)',
+    'Recoil Weight (kg cm^2)',
+    'Polarization Index',
+    'Sweet Zone (sq in)',
+    'RA Stiffness',
+    'Vibration Frequency (Hz)',
+    'MgR/I'
+]
+DF_COLS = ID_COLS + SPEC_COLS + ['String Pattern']
+STAT_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+CSV_DTYPES = {
+    'Current': 'bool',
+    'Brand': 'category',
+    'Model': 'object',
+    'String Pattern': 'category',
+    **{c: 'float32' for c in SPEC_COLS}
+}
+
+_cache = {}
+_lock = threading.RLock()
+
+
+def _file_hash(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def read_racquets_csv(path=DATABASE_PATH):
+    """Parse the racquet CSV with compact dtypes."""
+    df = pd.read_csv(path, dtype=CSV_DTYPES)
+    return df[DF_COLS]
+
+
+def compute_spec_stats(df):
+    """Per-spec min, max, mean, std and quantiles over the whole dataset."""
+    values = df[SPEC_COLS].to_numpy(dtype=np.float64)
+    if len(values) == 0:
+        return {}
+    quantiles = np.quantile(values, STAT_QUANTILES, axis=0)
+    stats = {}
+    for j, c in enumerate(SPEC_COLS):
+        stats[c] = {
+            'min': float(values[:, j].min()),
+            'max': float(values[:, j].max()),
+            'mean': float(values[:, j].mean()),
+            'std': float(values[:, j].std()),
+            'quantiles': {str(q): float(v) for q, v in zip(STAT_QUANTILES, quantiles[:, j])}
+        }
+    return stats
+
+
+def save_npy(dir_path, name, arr):
+    # Write next to the target and rename, so readers that still have the
+    # old file mapped keep a valid view
+    tmp_path = os.path.join(dir_path, f'.{name}.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.save(f, arr, allow_pickle=False)
+    os.replace(tmp_path, os.path.join(dir_path, name))
+
+
+def _category_codes(values):
+    cat = pd.Categorical(values)
+    categories = np.asarray(cat.categories, dtype=str)
+    return cat.codes, categories
+
+
+def write_columnar(df, path=COLUMNAR_PATH):
+    """Write df as a versioned columnar dataset directory.
+
+    Specs are stored as one (n_specs, n_rows) float32 array so every column
+    is contiguous on disk; string columns are stored as integer codes plus a
+    categories array.
+    """
+    os.makedirs(path, exist_ok=True)
+    digest = hashlib.sha1()
+    arrays = {
+        'current.npy': np.ascontiguousarray(df['Current'], dtype=bool),
+        'specs.npy': np.ascontiguousarray(df[SPEC_COLS].to_numpy(dtype=np.float32).T)
+    }
+    for c in ['Brand', 'Model', 'String Pattern']:
+        codes, categories = _category_codes(df[c])
+        name = c.lower().replace(' ', '_')
+        arrays[f'{name}.codes.npy'] = codes
+        arrays[f'{name}.categories.npy'] = categories
+    for name, arr in arrays.items():
+        save_npy(path, name, arr)
+        digest.update(name.encode())
+        digest.update(arr.tobytes())
+    manifest = {
+        'format_version': COLUMNAR_FORMAT_VERSION,
+        'dataset_version': digest.hexdigest(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'rows': len(df),
+        'columns': DF_COLS,
+        'spec_cols': SPEC_COLS,
+        'spec_stats': compute_spec_stats(df)
+    }
+    # The manifest is written last; readers treat it as the commit marker
+    tmp_path = os.path.join(path, f'.{MANIFEST_FILE}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, MANIFEST_FILE))
+    return manifest
+
+
+class ColumnarWriter:
+    """Write a columnar dataset of a known number of rows chunk by chunk.
+
+    For datasets too large to hold as one DataFrame. Brand and String
+    Pattern categories must be given up front; Model is stored with one
+    category per row. Arrays are written to temporary memory-mapped files
+    and renamed into place by close(spec_stats), which writes the manifest
+    last as write_columnar does.
+    """
+
+    def __init__(self, path, n_rows, brand_categories, pattern_categories, model_width=64):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.n_rows = n_rows
+        self.row = 0
+        self.categories = {
+            'brand': np.asarray(brand_categories, dtype=str),
+            'string_pattern': np.asarray(pattern_categories, dtype=str)
+        }
+        shapes = {
+            'current.npy': (bool, (n_rows,)),
+            'specs.npy': (np.float32, (len(SPEC_COLS), n_rows)),
+            'brand.codes.npy': (np.int16, (n_rows,)),
+            'model.codes.npy': (np.int32, (n_rows,)),
+            'model.categories.npy': (f'<U{model_width}', (n_rows,)),
+            'string_pattern.codes.npy': (np.int16, (n_rows,))
+        }
+        for name, (dtype, shape) in shapes.items():
+            # Allocate the file; chunks are written through short-lived maps
+            # so written pages do not stay resident
+            np.lib.format.open_memmap(self._tmp_path(name), mode='w+', dtype=dtype, shape=shape).flush()
+
+    def _tmp_path(self, name):
+        return os.path.join(self.path, f'.{name}.tmp')
+
+    def _write(self, name, index, values):
+        arr = np.load(self._tmp_path(name), mmap_mode='r+')
+        arr[index] = values
+        arr.flush()
+        del arr
+
+    def write(self, df):
+        """Append the rows of df (DF_COLS) to the dataset."""
+        start, stop = self.row, self.row + len(df)
+        if stop > self.n_rows:
+            raise ValueError(f'{stop} rows written to a dataset of {self.n_rows}')
+        rows = slice(start, stop)
+        self._write('current.npy', rows, df['Current'].to_numpy(dtype=bool))
+        self._write('specs.npy', (slice(None), rows), df[SPEC_COLS].to_numpy(dtype=np.float32).T)
+        for c, name in [('Brand', 'brand'), ('String Pattern', 'string_pattern')]:
+            codes = pd.Categorical(df[c].astype(str), categories=self.categories[name]).codes
+            if (codes < 0).any():
+                raise ValueError(f'{c} value not in the given categories')
+            self._write(f'{name}.codes.npy', rows, codes)
+        self._write('model.codes.npy', rows, np.arange(start, stop))
+        self._write('model.categories.npy', rows, df['Model'].to_numpy(dtype=str))
+        self.row = stop
+
+    def close(self, spec_stats):
+        """Move the arrays into place and write the manifest."""
+        if self.row != self.n_rows:
+            raise ValueError(f'{self.row} of {self.n_rows} rows written')
+        for name, categories in self.categories.items():
+            save_npy(self.path, f'{name}.categories.npy', categories)
+        digest = hashlib.sha1()
+        names = ['current.npy', 'specs.npy', 'brand.codes.npy', 'brand.categories.npy', 'model.codes.npy',
+                 'model.categories.npy', 'string_pattern.codes.npy', 'string_pattern.categories.npy']
+        for name in names:
+            tmp_path = self._tmp_path(name)
+            if os.path.exists(tmp_path):
+                os.replace(tmp_path, os.path.join(self.path, name))
+            digest.update(name.encode())
+            digest.update(_file_hash(os.path.join(self.path, name)).encode())
+        manifest = {
+            'format_version': COLUMNAR_FORMAT_VERSION,
+            'dataset_version': digest.hexdigest(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'rows': self.n_rows,
+            'columns': DF_COLS,
+            'spec_cols': SPEC_COLS,
+            'spec_stats': spec_stats
+        }
+        tmp_path = os.path.join(self.path, f'.{MANIFEST_FILE}.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST_FILE))
+        return manifest
+
+
+def read_manifest(path=COLUMNAR_PATH):
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != COLUMNAR_FORMAT_VERSION:
+        raise ValueError(f"Unsupported columnar format version {manifest.get('format_version')} in {path}")
+    return manifest
+
+
+def read_racquets_columnar(path=COLUMNAR_PATH):
+    """Open a columnar dataset directory without copying the spec arrays.
+
+    The float32 spec columns are read-only views into memory-mapped files.
+    """
+    manifest = read_manifest(path)
+
+    def load(name):
+        return np.load(os.path.join(path, name), mmap_mode='r', allow_pickle=False)
+
+    def categories(name):
+        return np.load(os.path.join(path, f'{name}.categories.npy'), allow_pickle=False)
+
+    specs = load('specs.npy')
+    df = pd.DataFrame(specs.T, columns=manifest['spec_cols'], copy=False)
+    df.insert(0, 'Current', load('current.npy'))
+    df.insert(1, 'Brand', pd.Categorical.from_codes(load('brand.codes.npy'), categories('brand')))
+    # Model is almost unique per row, so it is decoded to plain strings to
+    # match the CSV loader
+    model_codes = load('model.codes.npy')
+    df.insert(2, 'Model', categories('model').astype(object)[model_codes])
+    df['String Pattern'] = pd.Categorical.from_codes(load('string_pattern.codes.npy'), categories('string_pattern'))
+    return df
+
+
+def _stamp_path(path):
+    # File whose change signals a new dataset version
+    if os.path.isdir(path):
+        return os.path.join(path, MANIFEST_FILE)
+    return path
+
+
+def _load(path):
+    start = time.perf_counter()
+    spec_stats = None
+    if os.path.isdir(path):
+        df = read_racquets_columnar(path)
+        spec_stats = read_manifest(path).get('spec_stats')
+        fmt = 'columnar'
+    else:
+        df = read_racquets_csv(path)
+        fmt = 'csv'
+    info = {
+        'path': path,
+        'format': fmt,
+        'rows': len(df),
+        'load_seconds': time.perf_counter() - start,
+        'memory_bytes': int(df.memory_usage(deep=True).sum())
+    }
+    if spec_stats:
+        info['spec_stats'] = spec_stats
+    return df, info
+
+
+def default_path():
+    """Columnar dataset if the scraper has written one, otherwise the CSV."""
+    if os.path.exists(os.path.join(COLUMNAR_PATH, MANIFEST_FILE)):
+        return COLUMNAR_PATH
+    return DATABASE_PATH
+
+
+def _get_entry(path):
+    path = os.path.abspath(path or default_path())
+    mtime = os.stat(_stamp_path(path)).st_mtime_ns
+    with _lock:
+        entry = _cache.get(path)
+        if entry is not None and entry['mtime'] == mtime:
+            return entry
+        digest = _file_hash(_stamp_path(path))
+        if entry is not None and entry['hash'] == digest:
+            entry['mtime'] = mtime
+            return entry
+        df, info = _load(path)
+        info['hash'] = digest
+        # Objects derived from df live on its entry, so a reload drops them
+        # together with the old DataFrame
+        entry = {'mtime': mtime, 'hash': digest, 'df': df, 'info': info, 'derived': {}}
+        _cache[path] = entry
+        return entry
+
+
+def dataset_version(path=None):
+    """Content hash of the dataset at path, as load_info(path)['hash'].
+
+    Artifacts built from a dataset (neighbour tables, feature matrices)
+    record it so a reader can tell whether they are still current.
+    """
+    return _file_hash(_stamp_path(os.path.abspath(path or default_path())))
+
+
+def load_racquets(path=None):
+    """Return the shared racquet DataFrame, reloading it if the file changed.
+
+    path defaults to the columnar dataset, falling back to the CSV. The
+    returned frame is shared between sessions and must not be modified in
+    place; filter into a copy instead.
+    """
+    return _get_entry(path)['df']
+
+
+def load_info(path=None):
+    """Return load statistics (rows, load time, memory) for the cached dataset."""
+    return dict(_get_entry(path)['info'])
+
+
+def dataset_info(df):
+    """Load statistics of a DataFrame returned by load_racquets(), else None."""
+    with _lock:
+        for entry in _cache.values():
+            if entry['df'] is df:
+                return dict(entry['info'])
+    return None
+
+
+def derived(df, name, build):
+    """Return build(df), computed once per DataFrame and cached under name.
+
+    Used for indexes and matrices that pages derive from the shared dataset.
+    For a DataFrame returned by load_racquets() they are kept on its cache
+    entry and dropped when a reload replaces it; for any other DataFrame
+    they are kept on the frame itself and collected with it.
+    """
+    with _lock:
+        cached = None
+        for entry in _cache.values():
+            if entry['df'] is df:
+                cached = entry['derived']
+        if cached is None:
+            cached = df.__dict__.get('_derived')
+            if cached is None:
+                # Not a column: set on the object, past pandas' __setattr__
+                cached = {}
+                object.__setattr__(df, '_derived', cached)
+        if name not in cached:
+            cached[name] = build(df)
+        return cached[name]
+
+
+def spec_stats(df):
+    """Dataset-wide spec statistics (see compute_spec_stats).
+
+    Taken from the columnar manifest when df was loaded from one, otherwise
+    computed once per DataFrame.
+    """
+    def build(df):
+        info = dataset_info(df)
+        if info is not None and 'spec_stats' in info:
+            return info['spec_stats']
+        return compute_spec_stats(df)
+    return derived(df, 'spec_stats', build)
+
+
+if __name__ == '__main__':
+    # python dataset.py [path]            report load statistics
+    # python dataset.py --write-columnar  convert the CSV to the columnar format
+    if sys.argv[1:] == ['--write-columnar']:
+        manifest = write_columnar(read_racquets_csv(DATABASE_PATH))
+        print(f"Wrote {manifest['rows']} racquets to {COLUMNAR_PATH} (version {manifest['dataset_version'][:12]})")
+        sys.exit(0)
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    info = load_info(path)
+    print(f"{info['rows']} racquets loaded from {info['path']} ({info['format']})")
+    print(f"load time: {1000 * info['load_seconds']:.1f} ms")
+    print(f"memory: {info['memory_bytes'] / 1024:.1f} KiB")
+
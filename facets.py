@@ -0,0 +1,136 @@
+# Incremental facets for the sidebar filter chain
+#
+# The Discover and Compare sidebars apply their filters one after another,
+# and each widget's bounds depend on the racquets left by the filters above
+# it. A FacetChain keeps, per filter stage, the input mask from the last
+# rerun along with its facets: row count, min/max, a small histogram for
+# specs, and per-value counts for categories. On the next rerun only the
+# rows that entered or left a stage's input are used to update its facets,
+# so moving one slider leaves the stages above it untouched and updates the
+# stages below it by the changed rows only. Filter masks are cached per
+# selection, so an unchanged widget does not rebuild its mask.
+import numpy as np
+
+FACET_BINS = 20
+SPARK_CHARS = ' ▁▂▃▄▅▆▇█'
+
+
+class FacetChain:
+
+    def __init__(self, fidx, bins=FACET_BINS):
+        self.fidx = fidx
+        self.bins = bins
+        self._bin_ids = {}
+        self._stages = {}
+
+    def bin_edges(self, spec):
+        """Histogram bin edges over the full range of spec."""
+        sorted_values = self.fidx.sorted[spec]
+        return np.linspace(sorted_values[0], sorted_values[-1], self.bins + 1)
+
+    def _bins(self, spec):
+        # Histogram bin of every row, computed once per spec
+        if spec not in self._bin_ids:
+            edges = self.bin_edges(spec)
+            ids = np.searchsorted(edges, self.fidx.values[spec], side='right') - 1
+            self._bin_ids[spec] = np.clip(ids, 0, self.bins - 1).astype(np.int16)
+        return self._bin_ids[spec]
+
+    def _compute(self, in_mask, spec, category):
+        facets = {'count': int(np.count_nonzero(in_mask))}
+        if spec is not None:
+            bounds = self.fidx.bounds(spec, in_mask)
+            facets['min'], facets['max'] = bounds if bounds is not None else (None, None)
+            facets['histogram'] = np.bincount(self._bins(spec)[in_mask], minlength=self.bins)
+        if category is not None:
+            n_categories = len(self.fidx.categories[category])
+            facets['counts'] = np.bincount(self.fidx.codes[category][in_mask], minlength=n_categories)
+        return facets
+
+    def _update(self, facets, in_mask, added, removed, spec, category):
+        n_added, n_removed = np.count_nonzero(added), np.count_nonzero(removed)
+        facets = dict(facets, count=facets['count'] + n_added - n_removed)
+        if spec is not None:
+            values = self.fidx.values[spec]
+            bins = self._bins(spec)
+            facets['histogram'] = (facets['histogram'] + np.bincount(bins[added], minlength=self.bins)
+                                   - np.bincount(bins[removed], minlength=self.bins))
+            if facets['count'] == 0:
+                facets['min'], facets['max'] = None, None
+            else:
+                removed_values = values[removed]
+                if facets['min'] is None or (n_removed and (removed_values.min() <= facets['min'] or removed_values.max() >= facets['max'])):
+                    # An extreme row left: rescan through the sorted index
+                    facets['min'], facets['max'] = self.fidx.bounds(spec, in_mask)
+                elif n_added:
+                    added_values = values[added]
+                    facets['min'] = min(facets['min'], added_values.min())
+                    facets['max'] = max(facets['max'], added_values.max())
+        if category is not None:
+            codes = self.fidx.codes[category]
+            n_categories = len(facets['counts'])
+            facets['counts'] = (facets['counts'] + np.bincount(codes[added], minlength=n_categories)
+                                - np.bincount(codes[removed], minlength=n_categories))
+        return facets
+
+    def facets(self, name, in_mask, spec=None, category=None):
+        """Facets of the rows entering stage name.
+
+        Pass spec for a range filter (count, min, max, histogram over
+        bin_edges(spec)) or category for a checkbox filter (count, and counts
+        per value in fidx.categories order). After apply(), the dict also
+        holds 'remaining', the rows left by the stage.
+        """
+        stage = self._stages.get(name)
+        if stage is None or stage['spec'] != spec or stage['category'] != category:
+            stage = {'spec': spec, 'category': category, 'filters': {}}
+            self._stages[name] = stage
+            stage['facets'] = self._compute(in_mask, spec, category)
+        else:
+            changed = stage['in_mask'] ^ in_mask
+            if changed.any():
+                if np.count_nonzero(changed) > len(in_mask) // 2:
+                    stage['facets'] = self._compute(in_mask, spec, category)
+                else:
+                    stage['facets'] = self._update(stage['facets'], in_mask, changed & in_mask, changed & stage['in_mask'], spec, category)
+        # Copy: pages narrow their mask in place
+        stage['in_mask'] = in_mask.copy()
+        return stage['facets']
+
+    def apply(self, name, in_mask, selection, build):
+        """in_mask narrowed by the stage's filter for selection.
+
+        build() makes the filter mask; it is cached per selection, so
+        reruns with an unchanged widget reuse it.
+        """
+        stage = self._stages[name]
+        if selection not in stage['filters']:
+            # Only the latest few selections are worth keeping
+            if len(stage['filters']) >= 4:
+                stage['filters'].pop(next(iter(stage['filters'])))
+            stage['filters'][selection] = build()
+        out_mask = in_mask & stage['filters'][selection]
+        stage['facets']['remaining'] = int(np.count_nonzero(out_mask))
+        return out_mask
+
+
+def facet_chain(state, key, fidx):
+    """The FacetChain stored under key in state (e.g. st.session_state).
+
+    A new chain is started when the dataset, and so fidx, changes.
+    """
+    chain = state.get(key)
+    if chain is None or chain.fidx is not fidx:
+        chain = FacetChain(fidx)
+        state[key] = chain
+    return chain
+
+
+def sparkline(histogram):
+    """Histogram counts as a row of block characters."""
+    histogram = np.asarray(histogram)
+    top = histogram.max() if len(histogram) else 0
+    if top == 0:
+        return SPARK_CHARS[0] * len(histogram)
+    levels = np.ceil(histogram / top * (len(SPARK_CHARS) - 1)).astype(int)
+    return ''.join(SPARK_CHARS[i] for i in levels)
@@ -0,0 +1,97 @@
+# Indexed filter engine for the racquet sidebar filters
+#
+# Instead of copying the DataFrame once per slider, filters are evaluated as
+# boolean row masks: numeric ranges through a sorted index per spec
+# (searchsorted), categorical selections through one precomputed mask per
+# category value. The DataFrame is only materialized once, for the final
+# mask.
+import numpy as np
+
+from dataset import SPEC_COLS, derived
+
+CATEGORY_FILTER_COLS = ['Current', 'Brand', 'String Pattern']
+
+
+class FilterIndex:
+
+    def __init__(self, df, spec_cols=SPEC_COLS, category_cols=CATEGORY_FILTER_COLS):
+        self.df = df
+        self.n = len(df)
+        self.values = {}
+        self.order = {}
+        self.sorted = {}
+        for s in spec_cols:
+            values = df[s].to_numpy()
+            order = np.argsort(values, kind='stable')
+            self.values[s] = values
+            self.order[s] = order
+            self.sorted[s] = values[order]
+        self.codes = {}
+        self.categories = {}
+        self.category_masks = {}
+        for c in category_cols:
+            codes, categories = _factorize(df[c])
+            self.codes[c] = codes
+            self.categories[c] = categories
+            self.category_masks[c] = {v: codes == i for i, v in enumerate(categories)}
+
+    def all_rows(self):
+        return np.ones(self.n, dtype=bool)
+
+    def range_mask(self, spec, min_val, max_val):
+        """Rows with min_val <= spec <= max_val."""
+        sorted_values = self.sorted[spec]
+        # Compare in the column's own precision, so a bound typed as the
+        # displayed value includes the stored float32 value
+        lo = np.searchsorted(sorted_values, sorted_values.dtype.type(min_val), side='left')
+        hi = np.searchsorted(sorted_values, sorted_values.dtype.type(max_val), side='right')
+        order = self.order[spec]
+        # Scatter whichever side of the range touches fewer rows
+        if hi - lo <= self.n // 2:
+            mask = np.zeros(self.n, dtype=bool)
+            mask[order[lo:hi]] = True
+        else:
+            mask = np.ones(self.n, dtype=bool)
+            mask[order[:lo]] = False
+            mask[order[hi:]] = False
+        return mask
+
+    def category_mask(self, col, values):
+        """Rows whose col value is any of values."""
+        mask = np.zeros(self.n, dtype=bool)
+        for v in values:
+            m = self.category_masks[col].get(v)
+            if m is not None:
+                mask |= m
+        return mask
+
+    def bounds(self, spec, mask):
+        """(min, max) of spec over the rows in mask, or None if mask is empty."""
+        in_order = mask[self.order[spec]]
+        if not in_order.any():
+            return None
+        first = in_order.argmax()
+        last = len(in_order) - 1 - in_order[::-1].argmax()
+        return self.sorted[spec][first], self.sorted[spec][last]
+
+    def present_categories(self, col, mask):
+        """Category values occurring in mask, in order of first appearance."""
+        codes = self.codes[col][mask]
+        unique_codes, first = np.unique(codes, return_index=True)
+        return [self.categories[col][c] for c in unique_codes[np.argsort(first)]]
+
+    def materialize(self, mask):
+        """Copy of the selected rows."""
+        return self.df.iloc[np.flatnonzero(mask)].copy()
+
+
+def _factorize(series):
+    if hasattr(series, 'cat'):
+        return series.cat.codes.to_numpy(), list(series.cat.categories)
+    categories, codes = np.unique(series.to_numpy(), return_inverse=True)
+    return codes, categories.tolist()
+
+
+def filter_index(df):
+    """FilterIndex for df, built once per loaded dataset."""
+    return derived(df, 'filter_index', FilterIndex)
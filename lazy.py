@@ -0,0 +1,53 @@
+# Lazy imports for the Streamlit pages
+#
+# Plotting and numeric libraries take most of a page's import time, but a
+# page only needs them once it renders a chart or runs a match. lazy_import
+# returns a stand-in module that performs the real import on first
+# attribute access, so `go = lazy_import('plotly.graph_objects')` at module
+# top costs nothing until `go.Figure` is used.
+import importlib
+import sys
+import threading
+
+_lock = threading.Lock()
+
+
+class LazyModule:
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with _lock:
+                module = self.__dict__['_module']
+                if module is None:
+                    module = importlib.import_module(self.__dict__['_name'])
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_import(name):
+    """Module name, imported on first attribute access.
+
+    Returns the module itself if it has already been imported.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
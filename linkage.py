@@ -0,0 +1,184 @@
+# Record linkage for scraped racquet listings
+#
+# The same racquet is sometimes listed more than once with slightly
+# different model strings ("Pure Aero VS" / "Pure Aero VS.", "Vcore 95" /
+# "VCORE 95"). Listings are linked in two steps:
+#
+#   blocking  every listing gets a few keys -- (Current, Brand, Headsize,
+#             String Pattern) plus its whole normalized model, its rarest
+#             model token, or that token's first or last few letters --
+#             and only listings sharing a key are compared, so the work
+#             grows with the block sizes instead of N^2. Blocks larger than
+#             max_block are skipped.
+#   scoring   a candidate pair is linked when every spec is within
+#             SPEC_TOLERANCE of each other and the model strings differ only
+#             in spacing, case and punctuation, or by typos: the models must
+#             agree on every number (years and weight variants stay apart),
+#             have the same number of words, and each word without an exact
+#             match must be close to its counterpart ("MP" / "Pro" and
+#             added words like "Nite" keep listings apart).
+#
+# Linked pairs are grouped into clusters (connected components), and
+# canonical_table() merges each cluster into one racquet.
+import re
+from difflib import SequenceMatcher
+
+import numpy as np
+import pandas as pd
+
+from dataset import SPEC_COLS
+
+BLOCK_COLS = ['Current', 'Brand', 'Headsize (sq in)', 'String Pattern']
+RARE_TOKENS = 1
+MAX_BLOCK = 100
+NAME_THRESHOLD = 0.9
+TOKEN_THRESHOLD = 0.75
+# Largest relative difference between the specs of linked listings
+SPEC_TOLERANCE = 0.03
+PAIR_CHUNK = 1_000_000
+
+TOKEN_RE = re.compile(r'[a-z]+|\d+(?:\.\d+)?')
+
+
+def model_tokens(model):
+    """Lower-case word and number tokens of a model string."""
+    return TOKEN_RE.findall(str(model).lower())
+
+
+def name_similarity(a, b):
+    """Similarity in [0, 1] of two token lists, ignoring spacing and punctuation."""
+    return SequenceMatcher(None, ''.join(a), ''.join(b), autojunk=False).ratio()
+
+
+def same_model(a, b, name_threshold=NAME_THRESHOLD, token_threshold=TOKEN_THRESHOLD):
+    """Whether token lists a and b name the same model up to formatting or typos."""
+    if ''.join(a) == ''.join(b):
+        return True
+    if len(a) != len(b) or {t for t in a if t[0].isdigit()} != {t for t in b if t[0].isdigit()}:
+        return False
+    extra_a = [t for t in a if t not in b]
+    extra_b = [t for t in b if t not in a]
+    if len(extra_a) != len(extra_b):
+        return False
+    for ta, tb in zip(extra_a, extra_b):
+        if SequenceMatcher(None, ta, tb, autojunk=False).ratio() < token_threshold:
+            return False
+    return name_similarity(a, b) >= name_threshold
+
+
+def _block_keys(df, rare_tokens, max_block):
+    # (row, block) pairs: within its attribute group each row is in the
+    # block of its whole model string (spacing and punctuation removed), and
+    # in the blocks of its rarest tokens and of their first and last
+    # (len - 1) // 2 letters, which one typo or swap cannot both change
+    tokens = [model_tokens(m) for m in df['Model']]
+    group = df.groupby(BLOCK_COLS, sort=False, dropna=False).ngroup().to_numpy()
+    counts = {}
+    for g, t in zip(group, tokens):
+        for token in set(t):
+            counts[g, token] = counts.get((g, token), 0) + 1
+    rows, keys = [], []
+    for i, (g, t) in enumerate(zip(group, tokens)):
+        row_keys = {f'{g}|{"".join(t)}'}
+        for token in sorted(set(t), key=lambda token: (counts[g, token], token))[:rare_tokens]:
+            row_keys.add(f'{g}|={token}')
+            affix = (len(token) - 1) // 2
+            if affix:
+                row_keys.update([f'{g}|<{token[:affix]}', f'{g}|>{token[-affix:]}'])
+        rows.extend([i] * len(row_keys))
+        keys.extend(row_keys)
+    blocks = pd.DataFrame({'row': np.array(rows, dtype=np.int64), 'block': pd.factorize(np.array(keys, dtype=object))[0]})
+    sizes = blocks['block'].map(blocks['block'].value_counts())
+    return blocks[(sizes > 1) & (sizes <= max_block)], tokens
+
+
+def _candidate_pairs(df, rare_tokens, max_block):
+    # (left, right) row positions of the pairs sharing a block, left < right
+    blocks, tokens = _block_keys(df, rare_tokens, max_block)
+    blocks = blocks.sort_values(['block', 'row'])
+    sizes = blocks.groupby('block', sort=False).size()
+    block_size = blocks['block'].map(sizes).to_numpy()
+    rows = blocks['row'].to_numpy()
+    pair_codes = []
+    # Blocks of equal size form a (blocks, size) matrix of rows whose upper
+    # triangle holds every pair
+    for size in np.unique(block_size):
+        members = rows[block_size == size].reshape(-1, size)
+        i, j = np.triu_indices(size, 1)
+        pair_codes.append((members[:, i] * len(df) + members[:, j]).ravel())
+    pair_codes = np.unique(np.concatenate(pair_codes)) if pair_codes else np.zeros(0, dtype=np.int64)
+    return pair_codes // len(df), pair_codes % len(df), tokens
+
+
+def link_records(df, spec_cols=SPEC_COLS, name_threshold=NAME_THRESHOLD, spec_tolerance=SPEC_TOLERANCE,
+                 rare_tokens=RARE_TOKENS, max_block=MAX_BLOCK):
+    """Cluster id of every row of df; rows describing the same racquet share one.
+
+    Ids are numbered 0, 1, ... in order of each cluster's first row.
+    Returns (cluster_ids, stats) where stats counts the listings, candidate
+    pairs and links.
+    """
+    df = df.reset_index(drop=True)
+    n = len(df)
+    a, b, tokens = _candidate_pairs(df, rare_tokens, max_block)
+    n_candidates = len(a)
+
+    # Specs first: a cheap vectorized test that rules out most pairs,
+    # applied in chunks of pairs to bound memory
+    values = df[spec_cols].to_numpy(dtype=np.float64)
+    close = np.empty(len(a), dtype=bool)
+    for start in range(0, len(a), PAIR_CHUNK):
+        va, vb = values[a[start:start + PAIR_CHUNK]], values[b[start:start + PAIR_CHUNK]]
+        scale = np.maximum(np.abs(va), np.abs(vb))
+        close[start:start + PAIR_CHUNK] = (np.abs(va - vb) <= spec_tolerance * scale).all(axis=1)
+    a, b = a[close], b[close]
+
+    linked = np.array([same_model(tokens[i], tokens[j], name_threshold) for i, j in zip(a, b)], dtype=bool)
+    a, b = a[linked], b[linked]
+
+    # Connected components by union-find over the links
+    parent = np.arange(n)
+
+    def find(i):
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    for i, j in zip(a, b):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+    roots = np.array([find(i) for i in range(n)], dtype=np.int64)
+    cluster_ids = pd.factorize(roots)[0]
+    stats = {
+        'listings': n,
+        'candidate_pairs': n_candidates,
+        'all_pairs': n * (n - 1) // 2,
+        'links': int(len(a)),
+        'clusters': int(cluster_ids.max() + 1) if n else 0
+    }
+    return cluster_ids, stats
+
+
+def canonical_table(df, cluster_ids, spec_cols=SPEC_COLS):
+    """One row per cluster: specs averaged, the most frequent model string kept.
+
+    Other columns take the value of the cluster's first row (blocking
+    keeps Current, Brand, Headsize and String Pattern equal within a
+    cluster). Rows come out in cluster id order.
+    """
+    df = df.reset_index(drop=True)
+    clusters = pd.Series(cluster_ids, name='Cluster')
+    model_counts = df.groupby([clusters, df['Model']]).size().rename('count').reset_index()
+    # Most listings first, then the shortest and alphabetically first string
+    model_counts['length'] = model_counts['Model'].str.len()
+    model_counts = model_counts.sort_values(['Cluster', 'count', 'length', 'Model'], ascending=[True, False, True, True])
+    models = model_counts.drop_duplicates('Cluster').set_index('Cluster')['Model']
+    canonical = df.groupby(clusters, sort=True).first()
+    canonical[spec_cols] = df[spec_cols].groupby(clusters, sort=True).mean()
+    canonical['Model'] = models
+    canonical['Listings'] = clusters.value_counts().sort_index()
+    return canonical.reset_index(drop=True)
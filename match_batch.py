@@ -0,0 +1,125 @@
+# Bulk similarity matching from the command line
+#
+#   python match_batch.py queries.csv matches.csv [--k 10] [--processes 4]
+#
+# queries.csv has one target racquet per row: Brand and Model columns, an
+# optional k column, and optional weight columns named after the specs
+# (e.g. "Swingweight (kg cm^2)"); missing weights default to 50 as on the
+# Match page. JSON lines input with the same keys is also accepted. The
+# output has one row per (query, match). Queries are split into chunks and
+# fanned out over a process pool; each worker loads the dataset and builds
+# its match engine once.
+import argparse
+import csv
+import json
+import sys
+import time
+from multiprocessing import Pool
+
+from core import filter_mask, weight_vector
+from dataset import SPEC_COLS, load_racquets
+from matching import match_engine
+
+DEFAULT_K = 10
+CHUNK_SIZE = 64
+OUTPUT_COLS = ['Query', 'Target Brand', 'Target Model', 'Similarity Rank', 'Brand', 'Model', 'Distance']
+
+_worker = None
+
+
+def read_queries(path):
+    """Query dicts from a CSV or JSON lines file."""
+    if path.endswith('.jsonl') or path.endswith('.json'):
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def parse_query(query, default_k):
+    """(brand, model, weights, k) from a query dict; empty fields are ignored."""
+    weights = {s: float(query[s]) for s in SPEC_COLS if query.get(s) not in (None, '')}
+    k = int(query['k']) if query.get('k') not in (None, '') else default_k
+    return query['Brand'], query['Model'], weight_vector(weights), k
+
+
+def _init_worker(dataset, availability, brands):
+    global _worker
+    df = load_racquets(dataset)
+    mask = None
+    if availability is not None or brands is not None:
+        mask = filter_mask(df, availability=availability, brands=brands)
+    _worker = (match_engine(df), mask)
+
+
+def _match_chunk(chunk):
+    engine, mask = _worker
+    results = []
+    for query_id, target, weights, k in chunk:
+        rows, dist, ranks = engine.top_k(target, weights, k, mask=mask, mask_key='batch')
+        results.append((query_id, target, rows, dist, ranks))
+    return results
+
+
+def match_batch(tasks, dataset=None, availability=None, brands=None, processes=1, chunk_size=CHUNK_SIZE):
+    """Run (query_id, target row, weights, k) tasks; yields (query_id, target, rows, distances, ranks) in order."""
+    chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+    init_args = (dataset, availability, brands)
+    if processes > 1:
+        with Pool(processes, initializer=_init_worker, initargs=init_args) as pool:
+            for results in pool.imap(_match_chunk, chunks):
+                yield from results
+    else:
+        _init_worker(*init_args)
+        for chunk in chunks:
+            yield from _match_chunk(chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find the top-k similar racquets for many target racquets.')
+    parser.add_argument('queries', help='CSV or JSON lines file of target racquets')
+    parser.add_argument('out', help='output CSV of matches')
+    parser.add_argument('--dataset', default=None, help='dataset path (default: columnar dataset, else CSV)')
+    parser.add_argument('--k', type=int, default=DEFAULT_K, help='matches per query when the query has no k')
+    parser.add_argument('--availability', choices=['all', 'available', 'discontinued'], default='all', help='candidate racquets to match against')
+    parser.add_argument('--brands', nargs='+', default=None, help='restrict candidates to these brands')
+    parser.add_argument('--processes', type=int, default=1, help='worker processes')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='queries per task sent to a worker')
+    args = parser.parse_args()
+    availability = {'all': None, 'available': [True], 'discontinued': [False]}[args.availability]
+
+    df = load_racquets(args.dataset)
+    # First row of each (Brand, Model), as core.find_racquet resolves it
+    row_of, listings = {}, {}
+    for i, key in enumerate(zip(df['Brand'].astype(str), df['Model'].astype(str))):
+        row_of.setdefault(key, i)
+        listings[key] = listings.get(key, 0) + 1
+    tasks, skipped = [], 0
+    for query_id, query in enumerate(read_queries(args.queries)):
+        brand, model, weights, k = parse_query(query, args.k)
+        target = row_of.get((brand, model))
+        if target is None:
+            print(f'Query {query_id}: unknown racquet {brand} {model}, skipped', file=sys.stderr)
+            skipped += 1
+            continue
+        if listings[(brand, model)] > 1:
+            print(f'Query {query_id}: {listings[(brand, model)]} racquets named {brand} {model}, matching the first', file=sys.stderr)
+        tasks.append((query_id, target, weights, k))
+
+    brand_col, model_col = df['Brand'].to_numpy(), df['Model'].to_numpy()
+    start = time.perf_counter()
+    n_rows = 0
+    with open(args.out, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(OUTPUT_COLS)
+        for query_id, target, rows, dist, ranks in match_batch(tasks, args.dataset, availability, args.brands, args.processes, args.chunk_size):
+            for row, d, rank in zip(rows, dist, ranks):
+                writer.writerow([query_id, brand_col[target], model_col[target], rank, brand_col[row], model_col[row], f'{d:.6g}'])
+            n_rows += len(rows)
+    elapsed = time.perf_counter() - start
+    print(f'{len(tasks)} queries ({skipped} skipped), {n_rows} matches in {elapsed:.2f} s '
+          f'({len(tasks) / max(elapsed, 1e-9):.0f} queries/s, processes={args.processes}) -> {args.out}')
+
+
+if __name__ == '__main__':
+    main()
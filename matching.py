@@ -0,0 +1,385 @@
+# Similarity search for the Match page
+#
+# Racquets are compared by weighted Euclidean distance between standardized
+# spec vectors. The standardized matrix is built once per dataset as a
+# contiguous float32 array; a query only selects the k nearest rows with
+# argpartition instead of sorting every candidate, and recent results are
+# kept in an LRU cache keyed by (target, weights, filter state, k).
+#
+# Queries with equal weights on every spec (the page default) can be served
+# from a neighbour table built offline by build_neighbours.py.
+#
+# The standardized matrix itself is also written by the data build step
+# (scrape_tw_data.py, or build_features.py for other datasets) as a feature
+# artifact: the float32 matrix, the per-spec means and scales it was
+# standardized with, and a row-id map back to dataset rows, all tagged with
+# the dataset version. When it matches the loaded dataset the engine opens it
+# memory-mapped instead of standardizing at request time.
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from multiprocessing import Pool
+
+import numpy as np
+
+from dataset import BASE_DIR, SPEC_COLS, dataset_info, derived, save_npy
+
+CACHE_SIZE = 256
+NEIGHBOURS_PATH = os.path.join(BASE_DIR, 'racquet_neighbours')
+NEIGHBOURS_FORMAT_VERSION = 1
+FEATURES_PATH = os.path.join(BASE_DIR, 'racquet_features')
+FEATURES_FORMAT_VERSION = 1
+FEATURES_CHUNK_ROWS = 1_000_000
+
+
+class MatchEngine:
+
+    def __init__(self, df, spec_cols=SPEC_COLS, cache_size=CACHE_SIZE, features=None):
+        """features is (matrix, mean, scale, row_ids) from read_features;
+        without it the matrix is standardized here.
+        """
+        self.df = df
+        self.spec_cols = list(spec_cols)
+        if features is None:
+            features = standardize(df, self.spec_cols)
+        self.matrix, self.mean, self.scale, self.row_ids = features
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # (ids, distances) from a neighbour table, set by match_engine()
+        self.neighbours = None
+
+    def distances(self, target, weights, rows=None):
+        """Weighted distances from row target to rows (all rows if None)."""
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        w = np.asarray(weights, dtype=np.float32)
+        diff = (matrix - self.matrix[target]) * w
+        return np.sqrt(np.einsum('ij,ij->i', diff, diff))
+
+    def top_k(self, target, weights, k, mask=None, mask_key=None):
+        """The k racquets nearest to row target, excluding target itself.
+
+        mask restricts the candidates (boolean array over all rows); pass
+        mask_key, a hashable description of the filter state, to avoid
+        hashing the mask for the cache key. Returns (rows, distances, ranks)
+        sorted by distance, where ranks count candidates at least as close
+        (ties share the highest rank, as pandas rank(method='max')).
+        """
+        if mask is not None and mask_key is None:
+            mask_key = hashlib.sha1(np.packbits(mask)).hexdigest()
+        key = (int(target), tuple(float(w) for w in weights), mask_key, int(k))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        result = None
+        if self.neighbours is not None and _equal_weights(weights):
+            result = self._search_table(target, weights[0], k, mask)
+        if result is None:
+            result = self._search(target, weights, k, mask)
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _search(self, target, weights, k, mask):
+        n = len(self.matrix)
+        if mask is not None and np.count_nonzero(mask) < n // 4:
+            # Few candidates: score only those rows
+            rows = np.flatnonzero(mask)
+            rows = rows[rows != target]
+            dist = self.distances(target, weights, rows)
+        else:
+            # Many candidates: score every row in place and rule out the rest
+            rows = None
+            dist = self.distances(target, weights)
+            if mask is not None:
+                dist[~mask] = np.inf
+            dist[target] = np.inf
+        n_candidates = np.count_nonzero(np.isfinite(dist)) if rows is None else len(rows)
+        k = min(k, n_candidates)
+        if k == 0:
+            return np.zeros(0, dtype=int), dist[:0], np.zeros(0, dtype=int)
+        if k < len(dist):
+            nearest = np.argpartition(dist, k - 1)[:k]
+        else:
+            nearest = np.arange(len(dist))
+        # Order by distance, then row, so ties come out the same way as
+        # from the neighbour table
+        nearest = nearest[np.lexsort((nearest, dist[nearest]))]
+        top_dist = dist[nearest]
+        ranks = np.searchsorted(top_dist, top_dist, side='right')
+        # Rows tied with the k-th distance may have equals outside the top k
+        tied = top_dist == top_dist[-1]
+        ranks[tied] = np.count_nonzero(dist <= top_dist[-1])
+        return (nearest if rows is None else rows[nearest]), top_dist, ranks
+
+    def top_k_specs(self, targets, weights, k, mask=None, mask_key=None):
+        """The k racquets nearest to each of several target spec vectors.
+
+        targets is an (m, n_specs) array of spec values in spec_cols order,
+        or a single vector; NaN leaves a spec open, and open specs are
+        ignored for that target. All targets are scored together with
+        matrix products in the standardized space. Returns a list of
+        (rows, distances, ranks) per target, as top_k.
+        """
+        targets = np.atleast_2d(np.asarray(targets, dtype=np.float64))
+        if mask is not None and mask_key is None:
+            mask_key = hashlib.sha1(np.packbits(mask)).hexdigest()
+        key = ('specs', hashlib.sha1(targets.tobytes()).hexdigest(), tuple(float(w) for w in weights), mask_key, int(k))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        result = self._search_specs(targets, weights, k, mask)
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _search_specs(self, targets, weights, k, mask, memory_mb=64):
+        rows = np.arange(len(self.matrix)) if mask is None else np.flatnonzero(mask)
+        k = min(k, len(rows))
+        if k == 0:
+            return [(np.zeros(0, dtype=int), np.zeros(0), np.zeros(0, dtype=int)) for _ in targets]
+        open_specs = np.isnan(targets)
+        z = np.where(open_specs, 0, (targets - self.mean) / self.scale)
+        w2 = np.where(open_specs, 0, np.asarray(weights, dtype=np.float64)**2)
+        x = self.matrix[rows].astype(np.float64)
+        x2 = x**2
+        results = []
+        # Squared distances for a block of targets at once, expanded as
+        # sum w^2 x^2 - 2 sum w^2 x z + sum w^2 z^2; blocks bound the
+        # (rows, targets) matrix to memory_mb
+        block = max(1, memory_mb * 2**20 // (8 * len(rows)))
+        for start in range(0, len(targets), block):
+            bw2, bz = w2[start:start + block], z[start:start + block]
+            d2 = x2 @ bw2.T - 2 * (x @ (bw2 * bz).T) + (bw2 * bz**2).sum(axis=1)
+            np.maximum(d2, 0, out=d2)
+            if k < len(rows):
+                nearest = np.argpartition(d2, k - 1, axis=0)[:k]
+            else:
+                nearest = np.repeat(np.arange(len(rows))[:, None], d2.shape[1], axis=1)
+            nearest_d2 = np.take_along_axis(d2, nearest, axis=0)
+            order = np.lexsort((nearest, nearest_d2), axis=0)
+            nearest = np.take_along_axis(nearest, order, axis=0)
+            nearest_d2 = np.take_along_axis(nearest_d2, order, axis=0)
+            # Rows tied with the k-th distance may have equals outside the top k
+            n_within = np.count_nonzero(d2 <= nearest_d2[-1], axis=0)
+            for j in range(d2.shape[1]):
+                top_d2 = nearest_d2[:, j]
+                ranks = np.searchsorted(top_d2, top_d2, side='right')
+                ranks[top_d2 == top_d2[-1]] = n_within[j]
+                results.append((rows[nearest[:, j]], np.sqrt(top_d2), ranks))
+        return results
+
+
+    def _search_table(self, target, weight, k, mask):
+        # Precomputed neighbours hold unweighted distances over all rows.
+        # Returns None when the stored list cannot answer the query exactly.
+        ids, dist = self.neighbours
+        ids, dist = ids[target], dist[target] * np.float32(weight)
+        if mask is not None:
+            keep = mask[ids]
+            ids, dist = ids[keep], dist[keep]
+        if len(ids) <= k:
+            return None
+        # A tie across the k-th distance may continue past the stored list
+        if dist[k] == dist[k - 1]:
+            return None
+        ranks = np.searchsorted(dist[:k], dist[:k], side='right')
+        return ids[:k].astype(int), dist[:k], ranks
+
+
+def _equal_weights(weights):
+    weights = np.asarray(weights)
+    return len(weights) > 0 and weights[0] > 0 and (weights == weights[0]).all()
+
+##########################
+#### Neighbour Tables ####
+##########################
+
+_block_matrix = None
+_block_sq_norms = None
+
+
+def _init_block_worker(matrix):
+    global _block_matrix, _block_sq_norms
+    _block_matrix = matrix.astype(np.float64)
+    _block_sq_norms = np.einsum('ij,ij->i', _block_matrix, _block_matrix)
+
+
+def _neighbour_block(args):
+    start, stop, n_neighbours = args
+    a = _block_matrix[start:stop]
+    d2 = _block_sq_norms[start:stop, None] + _block_sq_norms[None, :] - 2 * (a @ _block_matrix.T)
+    np.maximum(d2, 0, out=d2)
+    rows = np.arange(stop - start)
+    d2[rows, rows + start] = np.inf
+    nearest = np.argpartition(d2, n_neighbours - 1, axis=1)[:, :n_neighbours]
+    nearest_d2 = np.take_along_axis(d2, nearest, axis=1)
+    order = np.lexsort((nearest, nearest_d2), axis=1)
+    return (np.take_along_axis(nearest, order, axis=1).astype(np.int32),
+            np.sqrt(np.take_along_axis(nearest_d2, order, axis=1)).astype(np.float32))
+
+
+def build_neighbours(matrix, n_neighbours, memory_mb=256, processes=1):
+    """Nearest neighbours of every row of matrix, excluding the row itself.
+
+    Rows are processed in blocks whose (block, n) distance matrix fits in
+    memory_mb, optionally spread over a process pool, so the full n x n
+    matrix is never held. Returns (ids int32, distances float32), each of
+    shape (n, n_neighbours) and sorted by distance.
+    """
+    n = len(matrix)
+    n_neighbours = min(n_neighbours, n - 1)
+    # Distances (float64) plus argpartition indices (int64) per block element
+    block = max(1, min(n, memory_mb * 2**20 // (16 * n)))
+    tasks = [(start, min(start + block, n), n_neighbours) for start in range(0, n, block)]
+    ids = np.empty((n, n_neighbours), dtype=np.int32)
+    dist = np.empty((n, n_neighbours), dtype=np.float32)
+    if processes > 1:
+        with Pool(processes, initializer=_init_block_worker, initargs=(matrix,)) as pool:
+            results = pool.imap(_neighbour_block, tasks)
+            for (start, stop, _), (block_ids, block_dist) in zip(tasks, results):
+                ids[start:stop], dist[start:stop] = block_ids, block_dist
+    else:
+        _init_block_worker(matrix)
+        for start, stop, _ in tasks:
+            ids[start:stop], dist[start:stop] = _neighbour_block((start, stop, n_neighbours))
+    return ids, dist
+
+
+def write_neighbours(ids, dist, dataset_hash, path=NEIGHBOURS_PATH):
+    os.makedirs(path, exist_ok=True)
+    save_npy(path, 'ids.npy', ids)
+    save_npy(path, 'distances.npy', dist)
+    manifest = {
+        'format_version': NEIGHBOURS_FORMAT_VERSION,
+        'dataset_hash': dataset_hash,
+        'rows': int(ids.shape[0]),
+        'n_neighbours': int(ids.shape[1]),
+        'spec_cols': SPEC_COLS
+    }
+    with open(os.path.join(path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_neighbours(dataset_hash, path=NEIGHBOURS_PATH):
+    """Memory-mapped (ids, distances) if the table at path was built for dataset_hash."""
+    try:
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    if manifest.get('format_version') != NEIGHBOURS_FORMAT_VERSION or manifest.get('dataset_hash') != dataset_hash:
+        return None
+    ids = np.load(os.path.join(path, 'ids.npy'), mmap_mode='r')
+    dist = np.load(os.path.join(path, 'distances.npy'), mmap_mode='r')
+    return ids, dist
+
+
+########################
+#### Feature Matrix ####
+########################
+
+def _spec_moments(df, spec_cols):
+    # Same statistics as sklearn's StandardScaler (population std, and
+    # constant columns left unscaled), one column at a time
+    mean, scale = np.empty(len(spec_cols)), np.empty(len(spec_cols))
+    for j, s in enumerate(spec_cols):
+        values = df[s].to_numpy(dtype=np.float64)
+        mean[j] = values.mean()
+        std = values.std()
+        scale[j] = std if std > 0 else 1.0
+    return mean, scale
+
+
+def _standardize_rows(df, spec_cols, mean, scale, start, stop):
+    values = df[spec_cols].iloc[start:stop].to_numpy(dtype=np.float64)
+    return ((values - mean) / scale).astype(np.float32)
+
+
+def standardize(df, spec_cols=SPEC_COLS):
+    """(matrix, mean, scale, row_ids) for df computed in memory."""
+    mean, scale = _spec_moments(df, spec_cols)
+    matrix = np.ascontiguousarray(_standardize_rows(df, spec_cols, mean, scale, 0, len(df)))
+    return matrix, mean, scale, np.arange(len(df), dtype=np.int64)
+
+
+def write_features(df, dataset_hash, path=FEATURES_PATH, spec_cols=SPEC_COLS, chunk_rows=FEATURES_CHUNK_ROWS):
+    """Write the standardized feature matrix of df as a versioned artifact.
+
+    The matrix is written in chunks of chunk_rows rows straight to its
+    .npy file, so memory stays bounded for large datasets.
+    """
+    spec_cols = list(spec_cols)
+    os.makedirs(path, exist_ok=True)
+    mean, scale = _spec_moments(df, spec_cols)
+    n = len(df)
+    tmp_path = os.path.join(path, '.matrix.npy.tmp')
+    matrix = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(n, len(spec_cols)))
+    for start in range(0, n, chunk_rows):
+        stop = min(start + chunk_rows, n)
+        matrix[start:stop] = _standardize_rows(df, spec_cols, mean, scale, start, stop)
+    matrix.flush()
+    del matrix
+    os.replace(tmp_path, os.path.join(path, 'matrix.npy'))
+    save_npy(path, 'row_ids.npy', np.arange(n, dtype=np.int64))
+    manifest = {
+        'format_version': FEATURES_FORMAT_VERSION,
+        'dataset_hash': dataset_hash,
+        'rows': n,
+        'spec_cols': spec_cols,
+        'mean': mean.tolist(),
+        'scale': scale.tolist()
+    }
+    # The manifest is written last; readers treat it as the commit marker
+    with open(os.path.join(path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_features(dataset_hash, path=FEATURES_PATH, spec_cols=SPEC_COLS, rows=None):
+    """Memory-mapped (matrix, mean, scale, row_ids) if the artifact at path
+    was built for dataset_hash and spec_cols, else None.
+
+    Matrix rows are used as DataFrame rows, so with rows given the
+    artifact is also rejected unless its row-id map is range(rows).
+    """
+    try:
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    if (manifest.get('format_version') != FEATURES_FORMAT_VERSION or manifest.get('dataset_hash') != dataset_hash
+            or manifest.get('spec_cols') != list(spec_cols)):
+        return None
+    matrix = np.load(os.path.join(path, 'matrix.npy'), mmap_mode='r')
+    row_ids = np.load(os.path.join(path, 'row_ids.npy'), mmap_mode='r')
+    if rows is not None and (len(matrix) != rows or not np.array_equal(row_ids, np.arange(rows))):
+        return None
+    return matrix, np.array(manifest['mean']), np.array(manifest['scale']), row_ids
+
+
+def _build_engine(df):
+    info = dataset_info(df)
+    features = read_features(info['hash'], rows=len(df)) if info is not None else None
+    engine = MatchEngine(df, features=features)
+    if info is not None:
+        engine.neighbours = read_neighbours(info['hash'])
+    return engine
+
+
+def match_engine(df):
+    """MatchEngine for df, built once per loaded dataset.
+
+    Opens the feature artifact and the neighbour table if they were built
+    for this dataset version.
+    """
+    return derived(df, 'match_engine', _build_engine)
@@ -1,15 +1,14 @@
 # Import common dependencies
 import numpy as np
-import pandas as pd
 import re
-import matplotlib.pyplot as plt
 import streamlit as st
-from bokeh.plotting import figure, show
-from bokeh.models import ColumnDataSource, TableColumn, DataTable, HoverTool, CrosshairTool, Legend, CategoricalColorMapper
-from bokeh.models.widgets import DataTable
-from bokeh.palettes import viridis, plasma
-import plotly.graph_objects as go
-from math import *
+from math import floor, ceil
+from dataset import load_racquets
+from filters import filter_index
+from facets import facet_chain, sparkline
+from tables import paginated_table
+from scatter import DENSITY_THRESHOLD, density_chart, density_data, frontier_overlay, point_chart, point_data
+from skyline import skyline_engine
     
 # Set Container Width to "wide"
 st.set_page_config(layout='wide')
@@ -19,7 +18,9 @@ with open("style.css") as css:
     st.markdown(f'<style>{css.read()}</style>', unsafe_allow_html=True)
 
 # Get racquet specs dataframe
-df = pd.read_csv('racquet_database.csv')
+df = load_racquets()
+fidx = filter_index(df)
+chain = facet_chain(st.session_state, 'discover_facets', fidx)
 
 # Get list of specs
 specs = list(df.columns)[3:].copy()
@@ -33,8 +34,8 @@ for t in ['Available', 'Discontinued']:
     T = st.sidebar.checkbox(label=t, value=True)
     if T:
         availability.append(current_dict[t])
-sub_df = df[df['Current'].isin(availability)].copy()
-if len(sub_df) < 1:
+mask = fidx.category_mask('Current', availability)
+if not mask.any():
     error = st.error('Please choose at least one availability type.')
 else:
     error = False
@@ -43,7 +44,8 @@ else:
 #### Select Brands ####
 if not error:
     # Get list of brands
-    brands = ['All Brands'] + list(sub_df['Brand'].unique())
+    brand_facets = chain.facets('Brand', mask, category='Brand')
+    brands = ['All Brands'] + fidx.present_categories('Brand', mask)
     st.sidebar.subheader(body='Select Brands', divider='red')
     select_brands = []
     # Structure brand checkboxes into 2 columns
@@ -63,10 +65,11 @@ if not error:
         if T: 
             select_brands.append(b)
     if not 'All Brands' in select_brands:
-        sub_df = sub_df[sub_df['Brand'].isin(select_brands)].copy()
+        mask = chain.apply('Brand', mask, tuple(select_brands), lambda: fidx.category_mask('Brand', select_brands))
+        st.sidebar.caption(f"{brand_facets['remaining']} of {brand_facets['count']} racquets remain")
     else:
         select_brands = brands[1:]
-    if len(sub_df) < 1:
+    if not mask.any():
         error = st.error('Please choose at least one brand.')
     else:
         error = False
@@ -78,8 +81,10 @@ if not error:
     st.sidebar.subheader(body='Filter Racquet Specs', divider='red')
     for s in specs:
         if not s == 'String Pattern':
-            min_val = floor(sub_df[s].min())
-            max_val = ceil(sub_df[s].max())
+            spec_facets = chain.facets(s, mask, spec=s)
+            spec_min, spec_max = spec_facets['min'], spec_facets['max']
+            min_val = floor(spec_min)
+            max_val = ceil(spec_max)
             if s == 'Polarization Index':
                 step = 0.01
                 min_val = float(min_val)
@@ -87,12 +92,14 @@ if not error:
             else:
                 step = 1
             sel_min, sel_max = st.sidebar.slider(label=s, min_value=min_val, max_value=max_val, value=(min_val, max_val), step=step)
-            sub_df = sub_df[(sub_df[s] >= sel_min) & (sub_df[s] <= sel_max)].copy()
-            if len(sub_df) == 0:
+            mask = chain.apply(s, mask, (sel_min, sel_max), lambda: fidx.range_mask(s, sel_min, sel_max))
+            # Distribution of the racquets reaching this filter
+            st.sidebar.caption(f"{sparkline(spec_facets['histogram'])}  {spec_facets['remaining']} racquets remain")
+            if not mask.any():
                 break
         else:
-            patterns = list(df['String Pattern'].unique())
-            patterns.sort()
+            pattern_facets = chain.facets(s, mask, category=s)
+            patterns = sorted(fidx.categories[s])
             select_patterns = []
             st.sidebar.write(s)
             # Structure string pattern checkboxes into 3 columns
@@ -112,7 +119,9 @@ if not error:
                     T = d_col.checkbox(p, value=False)
                 if T:
                     select_patterns.append(p)
-            sub_df = sub_df[sub_df['String Pattern'].isin(select_patterns)].copy()
+            mask = chain.apply(s, mask, tuple(select_patterns), lambda: fidx.category_mask(s, select_patterns))
+            st.sidebar.caption(f"{pattern_facets['remaining']} racquets remain")
+    sub_df = fidx.materialize(mask)
 
     ##############################
     #### Set Specs to Display ####
@@ -122,53 +131,58 @@ if not error:
         s2 = st.selectbox('Select Spec #2', specs[0:len(specs)-1], index=3)
         s1_no_unit = re.sub("\(.*?\)", "", s1).strip()
         s2_no_unit = re.sub("\(.*?\)", "", s2).strip()
+    # Above this many racquets the scatter plot shows binned density
+    density_threshold = col_emp_2.number_input(label='Density Threshold (racquets)', min_value=100, value=DENSITY_THRESHOLD, step=1000)
+
+    #########################
+    #### Pareto Frontier ####
+    # Racquets no other filtered racquet beats on every chosen spec
+    frontier = None
+    if col_emp_3.checkbox(label='Show Pareto Frontier', value=False):
+        frontier_specs = col_emp_3.multiselect('Frontier Specs', specs[0:len(specs)-1], default=[s1, s2] if s1 != s2 else [s1])
+        directions = {}
+        for s in frontier_specs:
+            direction = col_emp_4.radio(label=s, options=['Max', 'Min'], horizontal=True, key=f'pareto_{s}')
+            directions[s] = direction.lower()
+        if directions and len(sub_df) > 0:
+            frontier = skyline_engine(df).frontier(directions, mask)
+            frontier_only = col_emp_3.checkbox(label='Frontier Only in Table', value=False)
+            col_emp_3.caption(f'{len(frontier)} racquets on the frontier')
 
     if len(sub_df) > 0:
         ###########################
         #### Plot Racquet Data ####
         st.write('')
-        hover = HoverTool(tooltips=[('Brand', '@Brand'), ('Model', '@Model')])
-        scatter_source = ColumnDataSource(sub_df)
-        color_mapper = CategoricalColorMapper(
-            factors=[b for b in sub_df['Brand'].unique()], 
-            palette=viridis(len(select_brands))
-        )
-        scatter_chart = figure(width=1000, height=800, tools=[hover, 'crosshair', 'box_zoom', 'reset'], x_axis_label=s1, y_axis_label=s2)
-        scatter_chart.add_layout(Legend(), 'right')
-        scatter_chart.circle(x=s1, y=s2, size=10, color=dict(field='Brand', transform=color_mapper), line_alpha=1.0, line_color='gray', fill_alpha=0.7, legend_group='Brand', source=scatter_source)
-        scatter_chart.xaxis.axis_label_text_font_size = '18pt'
-        scatter_chart.yaxis.axis_label_text_font_size = '18pt'
-        scatter_chart.xaxis.major_label_text_font_size = '14pt'
-        scatter_chart.yaxis.major_label_text_font_size = '14pt'
+        view_mask = mask
+        if len(sub_df) > density_threshold:
+            # Drill down: narrow the plotted window, re-binned on every change
+            zoom_col_1, zoom_col_2 = st.columns((1, 1))
+            view_ranges = []
+            for zoom_col, s in [(zoom_col_1, s1), (zoom_col_2, s2)]:
+                s_min, s_max = fidx.bounds(s, mask)
+                s_min, s_max = floor(s_min), ceil(s_max)
+                zoom_min, zoom_max = zoom_col.slider(label=f'Zoom {s}', min_value=s_min, max_value=max(s_min + 1, s_max), value=(s_min, max(s_min + 1, s_max)))
+                view_mask = view_mask & fidx.range_mask(s, zoom_min, zoom_max)
+                view_ranges.append((zoom_min, zoom_max))
+        view_rows = np.flatnonzero(view_mask)
+        if len(view_rows) > density_threshold:
+            counts, x_edges, y_edges = density_data(fidx.values[s1][view_rows], fidx.values[s2][view_rows], *view_ranges)
+            scatter_chart = density_chart(counts, x_edges, y_edges, s1, s2)
+            st.caption(f'{len(view_rows)} racquets in view, shown as density. Zoom in to {density_threshold} or fewer to see individual racquets.')
+        else:
+            scatter_chart = point_chart(point_data(df, view_rows, s1, s2), s1, s2, fidx.present_categories('Brand', mask))
+        if frontier is not None:
+            frontier_overlay(scatter_chart, point_data(df, frontier[view_mask[frontier]], s1, s2), s1, s2)
         st.bokeh_chart(figure=scatter_chart, use_container_width=False)
         ####################
         #### Plot Table ####
-        sub_df.sort_values(by=['Brand', 'Current', 'Model'])
-        table = go.Figure(data=[go.Table(
-            header=dict(
-                values = list(sub_df.columns),
-                fill_color = ['#CDAFAF' if c in [s1, s2] else 'lightgrey' for c in sub_df.columns],
-                align = 'center'
-            ),
-            cells=dict(
-                values = [sub_df[c] for c in sub_df.columns],
-                align = 'center',
-                fill_color = ['#FFC7C7' if c in [s1, s2] else '#FFFFFF' for c in sub_df.columns]
-            )
-        )])
-        table.update_traces(
-            cells_font=dict(
-                family = 'Arial Narrow',
-                color = 'black'
-            ),
-            header_font=dict(
-                family = 'Arial Narrow',
-                color = 'black'
-            )
-        )
         st.write("")
-        st.plotly_chart(table, use_container_width=True)
-        csv_file = sub_df.to_csv()
+        table_rows = mask
+        if frontier is not None and frontier_only:
+            table_rows = np.zeros(len(df), dtype=bool)
+            table_rows[frontier] = True
+        paginated_table(df, table_rows, key='discover_table', sort_options={'Brand, Current, Model': ('Brand', 'Current', 'Model')}, highlight_cols=[s1, s2])
+        csv_file = sub_df.to_csv() if table_rows is mask else fidx.materialize(table_rows).to_csv()
         st.download_button(label="Download Table", data=csv_file, file_name="racquet_specs.csv", type='primary')
     else:
         st.error('There are no racquets that fit the selection of specs.')
@@ -1,17 +1,16 @@
 # Import common dependencies
-import numpy as np
-import pandas as pd
 import re
-import matplotlib.pyplot as plt
 import streamlit as st
-from bokeh.plotting import figure, show
-from bokeh.models import ColumnDataSource, TableColumn, DataTable, HoverTool, CrosshairTool, Legend
-from bokeh.models.widgets import DataTable
-from bokeh.palettes import viridis, plasma
-import plotly.express as px
-import plotly.graph_objects as go
-from math import *
-from utils import radar_rescale
+from math import floor, ceil
+from lazy import lazy_import
+from utils import radar_rescale_rows
+from dataset import load_racquets, spec_stats
+from filters import filter_index
+from facets import facet_chain, sparkline
+from search import racquet_picker
+
+go = lazy_import('plotly.graph_objects')
+plotly_colors = lazy_import('plotly.colors')
     
 # Set Container Width to "wide"
 st.set_page_config(layout='wide')
@@ -21,12 +20,27 @@ with open("style.css") as css:
     st.markdown(f'<style>{css.read()}</style>', unsafe_allow_html=True)
 
 # Get racquet specs dataframe
-df = pd.read_csv('racquet_database.csv')
+df = load_racquets()
+fidx = filter_index(df)
+chain = facet_chain(st.session_state, 'compare_facets', fidx)
 
 # Get list of specs
 specs = list(df.columns)[3:].copy()
 specs_numer = specs[0:len(specs)-1] # Specs with numerical values
 
+# Radar chart colors: blue and red for the first two racquets, then a
+# qualitative palette (built on first use, as plotly is imported lazily)
+MAX_RACQUETS = 20
+RADAR_COLORS = [(15, 10, 222), (242, 38, 19)]
+
+
+def radar_colors(i):
+    if len(RADAR_COLORS) == 2:
+        RADAR_COLORS.extend(plotly_colors.hex_to_rgb(c) for c in plotly_colors.qualitative.Dark24)
+    r, g, b = RADAR_COLORS[i % len(RADAR_COLORS)]
+    return f'rgba({r}, {g}, {b}, 0.3)', f'rgba({r}, {g}, {b}, 1)'
+
+
 ##################################
 #### Select Availability Type ####
 st.sidebar.subheader(body='Retail Availability', divider='red')
@@ -36,8 +50,8 @@ for t in ['Available', 'Discontinued']:
     T = st.sidebar.checkbox(label=t, value=True)
     if T:
         availability.append(current_dict[t])
-sub_df = df[df['Current'].isin(availability)].copy()
-if len(sub_df) < 1:
+mask = fidx.category_mask('Current', availability)
+if not mask.any():
     error = st.error('Please choose at least one availability type.')
 else:
     error = False
@@ -46,7 +60,8 @@ else:
 #### Select Brands ####
 if not error:
     # Get list of brands
-    brands = ['All Brands'] + list(sub_df['Brand'].unique())
+    brand_facets = chain.facets('Brand', mask, category='Brand')
+    brands = ['All Brands'] + fidx.present_categories('Brand', mask)
     st.sidebar.subheader(body='Select Brands', divider='red')
     select_brands = []
     # Structure brand checkboxes into 2 columns
@@ -66,8 +81,9 @@ if not error:
         if T: 
             select_brands.append(b)
     if not 'All Brands' in select_brands:
-        sub_df = sub_df[sub_df['Brand'].isin(select_brands)].copy()
-    if len(sub_df) < 1:
+        mask = chain.apply('Brand', mask, tuple(select_brands), lambda: fidx.category_mask('Brand', select_brands))
+        st.sidebar.caption(f"{brand_facets['remaining']} of {brand_facets['count']} racquets remain")
+    if not mask.any():
         error = st.error('Please choose at least one brand.')
     else:
         error = False
@@ -79,8 +95,10 @@ if not error:
     st.sidebar.subheader(body='Filter Racquet Specs', divider='red')
     for s in specs:
         if not s == 'String Pattern':
-            min_val = floor(sub_df[s].min())
-            max_val = ceil(sub_df[s].max())
+            spec_facets = chain.facets(s, mask, spec=s)
+            spec_min, spec_max = spec_facets['min'], spec_facets['max']
+            min_val = floor(spec_min)
+            max_val = ceil(spec_max)
             if s == 'Polarization Index':
                 step = 0.01
                 min_val = float(min_val)
@@ -88,12 +106,14 @@ if not error:
             else:
                 step = 1
             sel_min, sel_max = st.sidebar.slider(label=s, min_value=min_val, max_value=max_val, value=(min_val, max_val), step=step)
-            sub_df = sub_df[(sub_df[s] >= sel_min) & (sub_df[s] <= sel_max)].copy()
-            if len(sub_df) == 0:
+            mask = chain.apply(s, mask, (sel_min, sel_max), lambda: fidx.range_mask(s, sel_min, sel_max))
+            # Distribution of the racquets reaching this filter
+            st.sidebar.caption(f"{sparkline(spec_facets['histogram'])}  {spec_facets['remaining']} racquets remain")
+            if not mask.any():
                 break
         else:
-            patterns = list(df['String Pattern'].unique())
-            patterns.sort()
+            pattern_facets = chain.facets(s, mask, category=s)
+            patterns = sorted(fidx.categories[s])
             select_patterns = []
             st.sidebar.write(s)
             # Structure string pattern checkboxes into 3 columns
@@ -113,7 +133,9 @@ if not error:
                     T = d_col.checkbox(p, value=False)
                 if T:
                     select_patterns.append(p)
-            sub_df = sub_df[sub_df['String Pattern'].isin(select_patterns)].copy()
+            mask = chain.apply(s, mask, tuple(select_patterns), lambda: fidx.category_mask(s, select_patterns))
+            st.sidebar.caption(f"{pattern_facets['remaining']} racquets remain")
+    sub_df = fidx.materialize(mask)
     ########################################
     #### Select Racquets for Comparison ####
     if len(sub_df) > 1:
@@ -137,20 +159,25 @@ if not error:
             if T:
                 select_specs.append(s)
         ###############
-        # Rescale data for radar chart
-        radar_df = radar_rescale(df=df, spec_cols=select_specs, scale_min=1, scale_max=5)
-        if len(select_specs) > 2 and len(select_specs) < 8: 
-            r1_col, empty_col, r2_col = st.columns((5, 2, 5))
-            r1_col.subheader('Racquet #1')
-            r2_col.subheader('Racquet #2')
+        if len(select_specs) > 2 and len(select_specs) < 8:
+            n_racquets = st.number_input(label='Number of Racquets', min_value=2, max_value=MAX_RACQUETS, value=2)
+            # Structure racquet selections into rows of up to 4 columns
+            n_cols = 2 if n_racquets == 2 else 4
+            rqt_cols = []
+            for r in range(0, n_racquets, n_cols):
+                if n_cols == 2:
+                    r1_col, empty_col, r2_col = st.columns((5, 2, 5))
+                    rqt_cols += [r1_col, r2_col]
+                else:
+                    rqt_cols += list(st.columns(n_cols))
             radar = go.Figure(layout=dict(width=700, height=700, autosize=False))
-            fill_color_dict = {0: 'rgba(15, 10, 222, 0.3)', 1: 'rgba(242, 38, 19, 0.3)'}
-            line_color_dict = {0: 'rgba(15, 10, 222, 1)', 1: 'rgba(242, 38, 19, 1)'}
             # Select racquets
-            for i, rqt_col in enumerate([r1_col, r2_col]):
-                sel_brand = rqt_col.selectbox(label='Brand', options=sub_df['Brand'].unique(), key=f"brand_{i}", index=i)
-                sel_model = rqt_col.selectbox(label='Model', options=sub_df[sub_df['Brand'] == sel_brand]['Model'].unique(), key=f"model_{i}", index=i)
-                rqt_info = sub_df[(sub_df['Brand'] == sel_brand) & (sub_df['Model'] == sel_model)].iloc[0].to_dict()
+            rqt_rows = []
+            for i, rqt_col in enumerate(rqt_cols[:n_racquets]):
+                rqt_col.subheader(f'Racquet #{i + 1}')
+                rqt_row = racquet_picker(rqt_col, df, key=f'racquet_{i}', mask=mask, default=int(sub_df.index[i % len(sub_df)]))
+                rqt_rows.append(rqt_row)
+                rqt_info = sub_df.loc[rqt_row].to_dict()
                 rqt_col.write("")
                 for k in rqt_info:
                     if not k in ['Brand', 'Model']:
@@ -158,20 +185,24 @@ if not error:
                             rqt_col.markdown(f":red[{k}: {rqt_info[k]}]")
                         else:
                             rqt_col.markdown(f"{k}: {rqt_info[k]}")
-                r_vals = list(radar_df[(radar_df['Brand'] == sel_brand) & (radar_df['Model'] == sel_model) & (radar_df['Current'] == rqt_info['Current'])][select_specs].iloc[0].values)
-                theta_vals = [re.sub("[\(\[].*?[\)\]]", "", s) for s in select_specs]
+            # Rescale the selected racquets for the radar chart in one batch
+            radar_df = radar_rescale_rows(sub_df.loc[rqt_rows], select_specs, spec_stats(df), scale_min=1, scale_max=5)
+            theta_vals = [re.sub("[\(\[].*?[\)\]]", "", s) for s in select_specs]
+            for i, rqt_row in enumerate(rqt_rows):
+                r_vals = list(radar_df.iloc[i].values)
+                fill_color, line_color = radar_colors(i)
                 radar.add_trace(
-                    go.Scatterpolar( 
-                        r=r_vals + [r_vals[0]], 
-                        theta=theta_vals + [theta_vals[0]], 
+                    go.Scatterpolar(
+                        r=r_vals + [r_vals[0]],
+                        theta=theta_vals + [theta_vals[0]],
                         fill='toself',
-                        fillcolor=fill_color_dict[i],
-                        line_color=line_color_dict[i],
-                        name=f'{sel_brand} {sel_model}'
+                        fillcolor=fill_color,
+                        line_color=line_color,
+                        name=f"{sub_df.at[rqt_row, 'Brand']} {sub_df.at[rqt_row, 'Model']}"
                     )
                 )
             radar.update_layout(font_family='Arial Narrow', font_size=18, showlegend=True)
-            radar.update_polars(radialaxis=dict(visible=True, range=[0, 5]))    
+            radar.update_polars(radialaxis=dict(visible=True, range=[0, 5]))
             st.plotly_chart(radar, use_container_width=True)
         else:
             st.error(f"Select between 3 and 7 specs to compare.")
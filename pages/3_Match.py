@@ -1,19 +1,12 @@
 # Import common dependencies
 import numpy as np
 import pandas as pd
-import re
-import matplotlib.pyplot as plt
 import streamlit as st
-from bokeh.plotting import figure, show
-from bokeh.models import ColumnDataSource, TableColumn, DataTable, HoverTool, CrosshairTool, Legend, CategoricalColorMapper
-from bokeh.models.widgets import DataTable
-from bokeh.palettes import viridis, plasma
-import plotly.express as px
-import plotly.graph_objects as go
-from sklearn.preprocessing import StandardScaler
-from scipy.spatial.distance import cdist
-from math import *
-from utils import radar_rescale
+from dataset import load_racquets
+from filters import filter_index
+from matching import match_engine
+from search import racquet_picker
+from tables import paginated_table
     
 # Set Container Width to "wide"
 st.set_page_config(layout='wide')
@@ -23,17 +16,15 @@ with open("style.css") as css:
     st.markdown(f'<style>{css.read()}</style>', unsafe_allow_html=True)
 
 # Get racquet specs dataframe
-df = pd.read_csv('racquet_database.csv')
+df = load_racquets()
 df_cols = list(df.columns)
+fidx = filter_index(df)
+engine = match_engine(df)
 
 # Get list of specs
 specs = list(df.columns)[3:].copy()
 specs_numer = specs[0:len(specs)-1] # Specs with numerical values
 
-# StandardScaler numerical columns
-scaler = StandardScaler()
-scaler.fit(df[specs_numer].copy())
-
 ##################################
 #### Select Availability Type ####
 st.sidebar.subheader(body='Retail Availability', divider='red')
@@ -43,8 +34,8 @@ for t in ['Available', 'Discontinued']:
     T = st.sidebar.checkbox(label=t, value=True)
     if T:
         availability.append(current_dict[t])
-sub_df = df[df['Current'].isin(availability)].copy()
-if len(sub_df) < 1:
+mask = fidx.category_mask('Current', availability)
+if not mask.any():
     error = st.error('Please choose at least one availability type.')
 else:
     error = False
@@ -53,7 +44,7 @@ else:
 #### Select Brands ####
 if not error:
     # Get list of brands
-    brands = ['All Brands'] + list(sub_df['Brand'].unique())
+    brands = ['All Brands'] + fidx.present_categories('Brand', mask)
     st.sidebar.subheader(body='Select Brands', divider='red')
     select_brands = []
     # Structure brand checkboxes into 2 columns
@@ -73,8 +64,8 @@ if not error:
         if T: 
             select_brands.append(b)
     if not 'All Brands' in select_brands:
-        sub_df = sub_df[sub_df['Brand'].isin(select_brands)].copy()
-    if len(sub_df) < 1:
+        mask &= fidx.category_mask('Brand', select_brands)
+    if not mask.any():
         error = st.error('Please choose at least one brand.')
     else:
         error = False
@@ -82,13 +73,22 @@ if not error:
 #######################################
 #### Set Relative Spec Importances ####
 if not error:
-    sub_df.reset_index(drop=True, inplace=True)
-    # Select target racquet
-    st.subheader('Select Target Racquet')
-    rqt_col, empty_1, empty_2 = st.columns((1, 1, 1))
-    sel_brand = rqt_col.selectbox(label='Brand', options=sub_df['Brand'].unique(), key=f"brand_{i}", index=0)
-    sel_model = rqt_col.selectbox(label='Model', options=sub_df[sub_df['Brand'] == sel_brand]['Model'].unique(), key=f"model_{i}", index=0)
-    rqt_idx = sub_df.index[(sub_df['Brand'] == sel_brand) & (sub_df['Model'] == sel_model)].to_list()[0]
+    sub_df = fidx.materialize(mask)
+    # Select target racquet, or enter target specs
+    st.subheader('Select Target')
+    target_mode = st.radio(label='Target', options=['Existing Racquet', 'Custom Specs'], horizontal=True, label_visibility='collapsed')
+    if target_mode == 'Existing Racquet':
+        rqt_col, empty_1, empty_2 = st.columns((1, 1, 1))
+        # Row of the target racquet in df
+        rqt_idx = racquet_picker(rqt_col, df, key='target', mask=mask, default=int(sub_df.index[0]), label='Target Racquet')
+    else:
+        st.markdown("""
+            Enter the specs you want in a racquet, one target per row. Specs left blank are ignored for that target, so you can match on just swingweight and stiffness, for example. Add rows to search for several targets at once.
+        """)
+        target_df = st.data_editor(pd.DataFrame(np.nan, index=[0], columns=specs_numer, dtype=float), num_rows='dynamic', hide_index=True, use_container_width=True, key='target_specs')
+        target_specs = target_df[specs_numer].to_numpy(dtype=float)
+        # Targets with no specs entered match nothing in particular
+        target_specs = target_specs[~np.isnan(target_specs).all(axis=1)]
     # Set spec importance weights
     st.divider()
     st.subheader('Set Relative Importances of Specs')
@@ -106,43 +106,31 @@ if not error:
             weight = spec_col_2.slider(label=s, min_value=0, max_value=100, value=50)
         weight_vector.append(weight)
     weight_vector = np.array(weight_vector)
-    # Scaler transform sub_df
-    sub_df_norm = scaler.transform(sub_df[specs_numer])
-    # Add weights
-    weighted_matrix = np.array(sub_df_norm) * weight_vector
     ###############################
     #### Find Similar Racquets ####
     spec_col_1.write("")
+    n_matches = spec_col_1.number_input(label='Number of Matches', min_value=1, max_value=max(1, len(sub_df) - 1), value=min(25, max(1, len(sub_df) - 1)))
+    # Keep the query across reruns so the results table can be paged
+    filter_key = (tuple(availability), tuple(select_brands))
+    if target_mode == 'Existing Racquet':
+        query = (rqt_idx, tuple(weight_vector), n_matches, filter_key)
+    else:
+        query = (target_specs.tobytes(), tuple(weight_vector), n_matches, filter_key)
     if spec_col_1.button('Search for Similar', type='primary'):
-        # Calculate distances
-        dist_vector = cdist(weighted_matrix[rqt_idx, :].reshape(1, -1), weighted_matrix).ravel()
-        sub_df['similarity_dist'] = dist_vector
-        sub_df.drop(index=rqt_idx, inplace=True)
-        # Sort dataframe by similarity
-        sub_df.sort_values('similarity_dist', inplace=True)
-        sub_df['Similarity Rank'] = sub_df['similarity_dist'].rank(method='max')
-        sub_df = sub_df[['Similarity Rank'] + df_cols].copy()
-        # Display results
-        table = go.Figure(data=[go.Table(
-            header=dict(
-                values = list(sub_df.columns),
-                align = 'center'
-            ),
-            cells=dict(
-                values = [sub_df[c] for c in sub_df.columns],
-                align = 'center',
-            )
-        )])
-        table.update_traces(
-            cells_font=dict(
-                family = 'Arial Narrow',
-                color = 'black'
-            ),
-            header_font=dict(
-                family = 'Arial Narrow',
-                color = 'black'
-            )
-        )
+        st.session_state['match_query'] = query
+    if st.session_state.get('match_query') == query:
         st.write("")
-        st.plotly_chart(table, use_container_width=True)
+        # Find the nearest racquets among the filtered ones
+        if target_mode == 'Existing Racquet':
+            match_rows, match_dist, match_rank = engine.top_k(rqt_idx, weight_vector, n_matches, mask=mask, mask_key=filter_key)
+            paginated_table(df, match_rows, key='match_table', sort_options={'Similarity Rank': None}, extra_cols={'Similarity Rank': match_rank})
+        elif len(target_specs) == 0:
+            st.error('Enter at least one target spec.')
+        else:
+            # All targets are answered in one batched search
+            results = engine.top_k_specs(target_specs, weight_vector, n_matches, mask=mask, mask_key=filter_key)
+            match_rows = np.concatenate([rows for rows, _, _ in results])
+            match_target = np.repeat(np.arange(1, len(results) + 1), [len(rows) for rows, _, _ in results])
+            match_rank = np.concatenate([ranks for _, _, ranks in results])
+            paginated_table(df, match_rows, key='match_specs_table', sort_options={'Target, Similarity Rank': None}, extra_cols={'Target': match_target, 'Similarity Rank': match_rank})
     
\ No newline at end of file
@@ -1,16 +1,13 @@
 # Import common dependencies
-import numpy as np
 import pandas as pd
-import re
-import matplotlib.pyplot as plt
 import streamlit as st
-from bokeh.plotting import figure, show
-from bokeh.models import ColumnDataSource, TableColumn, DataTable, HoverTool, CrosshairTool, Legend, CategoricalColorMapper
-from bokeh.models.widgets import DataTable
-from bokeh.palettes import viridis, plasma
-import plotly.graph_objects as go
-from math import *
-    
+from dataset import load_racquets
+from customize import chart_grid, customization_surfaces, customized_specs, grid_step, DEFAULT_MAX_MASS
+from search import racquet_picker
+from lazy import lazy_import
+
+go = lazy_import('plotly.graph_objects')
+
 # Set Container Width to "wide"
 st.set_page_config(layout='wide')
 
@@ -19,11 +16,80 @@ with open("style.css") as css:
     st.markdown(f'<style>{css.read()}</style>', unsafe_allow_html=True)
 
 # Get racquet specs dataframe
+df = load_racquets()
+
 st.subheader("Balanced Customization")
 
 # Description of Tool
 st.write("""
-    One of the challenges in customizing for a dynamic weight such as swing weight, twist weight, and recoil weight is you inevitably shift the balance of the racquet whenever weight is added, unless the addition is concentrated at the balance point. 
+    One of the challenges in customizing for a dynamic weight such as swing weight, twist weight, and recoil weight is you inevitably shift the balance of the racquet whenever weight is added, unless the addition is concentrated at the balance point.
+    The maps below show how a racquet's specs change for every combination of mass added at the butt (tail) and at the tip.
 """)
-    
-            
\ No newline at end of file
+
+########################
+#### Select Racquet ####
+rqt_col, grid_col, empty_col = st.columns((1, 1, 1))
+racquet = df.iloc[racquet_picker(rqt_col, df, key='racquet_0')]
+
+###########################
+#### Set Grid Settings ####
+max_mass = grid_col.number_input(label='Maximum Added Mass per End (g)', min_value=1.0, max_value=30.0, value=DEFAULT_MAX_MASS, step=1.0)
+step = grid_col.select_slider(label='Grid Resolution (g)', options=[0.5, 0.25, 0.1, 0.05, 0.01], value=0.05)
+surfaces = customization_surfaces(racquet, max_mass, step)
+masses = surfaces['Tail Mass (g)']
+if grid_step(max_mass, step) != step:
+    grid_col.caption(f'Maps use a {grid_step(max_mass, step):.3f} g grid at this maximum mass.')
+
+#######################
+#### Added Weights ####
+st.divider()
+mass_col_1, empty_1, mass_col_2 = st.columns((5, 1, 5))
+tail_mass = mass_col_1.slider(label='Tail Mass (g)', min_value=0.0, max_value=float(max_mass), value=0.0, step=float(step))
+tip_mass = mass_col_2.slider(label='Tip Mass (g)', min_value=0.0, max_value=float(max_mass), value=0.0, step=float(step))
+new_specs = customized_specs(racquet, tail_mass, tip_mass)
+spec_table = pd.DataFrame({
+    'Spec': list(new_specs),
+    'Stock': [float(racquet[s]) for s in new_specs],
+    'Customized': [float(new_specs[s]) for s in new_specs]
+})
+spec_table['Change'] = spec_table['Customized'] - spec_table['Stock']
+st.dataframe(spec_table.round(2), hide_index=True, use_container_width=True)
+
+###########################
+#### Plot Spec Surface ####
+surface_specs = [s for s in surfaces if s not in ['Tail Mass (g)', 'Tip Mass (g)']]
+sel_spec = st.selectbox('Spec to Map', surface_specs, index=surface_specs.index('Swingweight (kg cm^2)'))
+# The charts get a coarser copy of the grid; the table above is exact
+chart_masses, spec_surface = chart_grid(masses, surfaces[sel_spec])
+_, balance_surface = chart_grid(masses, surfaces['Balance (cm)'])
+contour = go.Figure(data=[
+    go.Contour(
+        x=chart_masses,
+        y=chart_masses,
+        z=spec_surface,
+        ncontours=25,
+        colorscale='Viridis',
+        colorbar=dict(title=sel_spec)
+    ),
+    # Balance isolines over the selected spec
+    go.Contour(
+        x=chart_masses,
+        y=chart_masses,
+        z=balance_surface,
+        ncontours=10,
+        contours=dict(coloring='lines', showlabels=True),
+        line=dict(color='white', dash='dot'),
+        showscale=False,
+        name='Balance (cm)'
+    ),
+    go.Scatter(x=[tail_mass], y=[tip_mass], mode='markers', marker=dict(color='red', size=12), name='Selection')
+])
+contour.update_layout(
+    font_family='Arial Narrow',
+    font_size=18,
+    height=700,
+    xaxis_title='Tail Mass (g)',
+    yaxis_title='Tip Mass (g)',
+    showlegend=False
+)
+st.plotly_chart(contour, use_container_width=True)
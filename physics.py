@@ -0,0 +1,61 @@
+# Racquet physics
+#
+# Vectorized formulas for the derived specs in the database and for tip/tail
+# customization. Every function takes scalars, NumPy arrays or pandas Series
+# and broadcasts, so whole columns or customization grids are computed in
+# one call.
+#
+# Units follow the database: weight and added masses in g, balance and
+# lengths in cm (except length_in), swingweight / recoil weight in kg cm^2.
+import numpy as np
+
+# Swingweight is measured about an axis 10 cm from the butt cap
+SW_AXIS_CM = 10.0
+GRAVITY_CM_S2 = 980.5
+CM_PER_IN = 2.54
+
+
+def recoil_weight(swingweight, weight, balance):
+    """Moment of inertia about the balance point (kg cm^2)."""
+    return swingweight - 0.001 * weight * (balance - SW_AXIS_CM)**2
+
+
+def swingweight(recoil_weight, weight, balance):
+    """Swingweight from recoil weight (inverse of recoil_weight, kg cm^2)."""
+    return recoil_weight + 0.001 * weight * (balance - SW_AXIS_CM)**2
+
+
+def polarization_index(recoil_weight, weight, length_in):
+    """Recoil weight relative to a uniform rod of the same mass and length, minus one."""
+    return (12 * recoil_weight)/(0.001 * weight * (CM_PER_IN * length_in)**2) - 1
+
+
+def mgr_over_i(weight, balance, recoil_weight):
+    """MgR/I: swing frequency measure from the moment of inertia about the butt."""
+    return (0.001 * weight * GRAVITY_CM_S2 * balance)/(recoil_weight + 0.001 * weight * balance**2)
+
+
+def derived_specs(swingweight, weight, balance, length_in):
+    """Recoil Weight, Polarization Index and MgR/I as stored in the database.
+
+    Recoil weight is rounded to the nearest integer and polarization index to
+    two decimals before being used downstream, as on the TWU site.
+    """
+    rw = np.round(recoil_weight(swingweight, weight, balance))
+    pi = np.round(polarization_index(rw, weight, length_in), 2)
+    return rw, pi, mgr_over_i(weight, balance, rw)
+
+
+def delta_balance(weight, length, balance, tail_mass, tip_mass):
+    """Shift of the balance point after adding mass at the butt and tip (cm)."""
+    return ((length - balance)*(weight*balance/length + tip_mass) - balance*(weight*(length - balance)/length + tail_mass))/(weight + tail_mass + tip_mass)
+
+
+def delta_swingweight(length, tail_mass, tip_mass):
+    """Swingweight added by mass at the butt and tip (kg cm^2)."""
+    return 0.001 * tail_mass * SW_AXIS_CM**2 + 0.001 * tip_mass * (length - SW_AXIS_CM)**2
+
+
+def delta_recoilweight(new_balance, length, tail_mass, tip_mass):
+    """Recoil weight added by mass at the butt and tip, about the new balance point (kg cm^2)."""
+    return 0.001 * tail_mass * new_balance**2 + 0.001 * tip_mass * (length - new_balance)**2
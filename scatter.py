@@ -0,0 +1,80 @@
+# Scatter plot pipeline for the Discover page
+#
+# Only the two plotted specs plus Brand and Model are sent to the browser,
+# drawn with Bokeh's WebGL backend. Above a point threshold the racquets are
+# binned on the server into a 2D histogram and only the bin counts are sent;
+# narrowing the view (drill-down) re-bins the visible window until it holds
+# few enough racquets to draw individually. Racquets on a Pareto frontier
+# (skyline.py) can be drawn on top of either chart.
+import numpy as np
+
+from lazy import lazy_import
+
+models = lazy_import('bokeh.models')
+palettes = lazy_import('bokeh.palettes')
+plotting = lazy_import('bokeh.plotting')
+
+DENSITY_THRESHOLD = 5_000
+DENSITY_BINS = 100
+
+
+def point_data(df, rows, s1, s2):
+    """Columns needed to draw rows of df as points."""
+    return {
+        s1: df[s1].to_numpy()[rows],
+        s2: df[s2].to_numpy()[rows],
+        'Brand': np.asarray(df['Brand'].to_numpy()[rows], dtype=object),
+        'Model': np.asarray(df['Model'].to_numpy()[rows], dtype=object)
+    }
+
+
+def density_data(x, y, x_range, y_range, bins=DENSITY_BINS):
+    """2D histogram of (x, y) over the given ranges.
+
+    Returns (counts, x_edges, y_edges) with counts indexed [y bin, x bin],
+    as Bokeh's image glyph expects.
+    """
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins, range=[x_range, y_range])
+    return counts.T, x_edges, y_edges
+
+
+def _style(chart):
+    chart.xaxis.axis_label_text_font_size = '18pt'
+    chart.yaxis.axis_label_text_font_size = '18pt'
+    chart.xaxis.major_label_text_font_size = '14pt'
+    chart.yaxis.major_label_text_font_size = '14pt'
+    return chart
+
+
+def point_chart(data, s1, s2, brands, width=1000, height=800):
+    """WebGL scatter of point_data coloured by brand."""
+    hover = models.HoverTool(tooltips=[('Brand', '@Brand'), ('Model', '@Model')])
+    color_mapper = models.CategoricalColorMapper(
+        factors=list(brands),
+        palette=palettes.viridis(max(1, len(brands)))
+    )
+    chart = plotting.figure(width=width, height=height, tools=[hover, 'crosshair', 'box_zoom', 'reset'], x_axis_label=s1, y_axis_label=s2, output_backend='webgl')
+    chart.add_layout(models.Legend(), 'right')
+    chart.circle(x=s1, y=s2, size=10, color=dict(field='Brand', transform=color_mapper), line_alpha=1.0, line_color='gray', fill_alpha=0.7, legend_group='Brand', source=models.ColumnDataSource(data))
+    return _style(chart)
+
+
+def density_chart(counts, x_edges, y_edges, s1, s2, width=1000, height=800):
+    """Heatmap of density_data; empty bins are transparent."""
+    image = np.where(counts > 0, counts, np.nan)
+    color_mapper = models.LinearColorMapper(palette=palettes.viridis(256), low=1, high=max(1, counts.max()), nan_color=(0, 0, 0, 0))
+    hover = models.HoverTool(tooltips=[('Racquets', '@image')])
+    chart = plotting.figure(width=width, height=height, tools=[hover, 'crosshair', 'box_zoom', 'reset'], x_axis_label=s1, y_axis_label=s2,
+                   x_range=(x_edges[0], x_edges[-1]), y_range=(y_edges[0], y_edges[-1]), output_backend='webgl')
+    chart.image(image=[image], x=x_edges[0], y=y_edges[0], dw=x_edges[-1] - x_edges[0], dh=y_edges[-1] - y_edges[0], color_mapper=color_mapper)
+    chart.add_layout(models.ColorBar(color_mapper=color_mapper, title='Racquets'), 'right')
+    return _style(chart)
+
+
+def frontier_overlay(chart, data, s1, s2):
+    """Draw point_data of Pareto frontier racquets over a point or density chart."""
+    source = models.ColumnDataSource(data)
+    renderer = chart.scatter(x=s1, y=s2, size=16, marker='diamond', fill_color='red', fill_alpha=0.9, line_color='black', line_width=1.5, legend_label='Pareto Frontier', source=source)
+    # Racquet names on hover, also over a density chart
+    chart.add_tools(models.HoverTool(renderers=[renderer], tooltips=[('Brand', '@Brand'), ('Model', '@Model'), (s1, f'@{{{s1}}}'), (s2, f'@{{{s2}}}')]))
+    return chart
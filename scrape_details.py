@@ -0,0 +1,232 @@
+# Optional enrichment: fetch per-racquet detail pages
+#
+#   python scrape_details.py --detail-url 'https://.../racquet?brand={brand}&model={model}' \
+#       [--records racquet_records.csv] [--out racquet_details.csv] [--workers 8] [--rate 10]
+#
+# The recommender page only carries the specs encoded in each div id. This
+# stage requests one detail page per racquet, built from a URL template
+# with {brand}, {model} and {pattern} placeholders, and collects the
+# label / value rows of the page's spec table (<tr><th>label</th><td>value</td>)
+# into racquet_details.csv, one row per racquet.
+#
+# Pages are fetched by a bounded thread pool over one pooled requests
+# session. All workers share a rate limiter; connection errors, 429 and 5xx
+# answers are retried with exponential backoff (honouring Retry-After), and
+# successful responses are cached on disk, so a rerun only requests pages
+# that are missing from the cache. benchmarks/recommender_fixture.py serves
+# fixture detail pages for running this offline.
+import argparse
+import hashlib
+import html
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from dataset import BASE_DIR
+
+DETAILS_PATH = os.path.join(BASE_DIR, 'racquet_details.csv')
+DETAIL_CACHE_PATH = os.path.join(BASE_DIR, 'racquet_detail_cache')
+WORKERS = 8
+RATE = 10.0
+RETRIES = 4
+BACKOFF = 0.5
+TIMEOUT = 10
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+SPEC_ROW_RE = re.compile(r'<tr[^>]*>\s*<th[^>]*>(.*?)</th>\s*<td[^>]*>(.*?)</td>', re.IGNORECASE | re.DOTALL)
+TAG_RE = re.compile(r'<[^>]+>')
+
+
+class RateLimiter:
+    """Spaces calls to wait() at least 1 / rate seconds apart across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        # Reserve the next slot under the lock, sleep outside it
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ResponseCache:
+    """Response bodies on disk, one file per URL."""
+
+    def __init__(self, path=DETAIL_CACHE_PATH, max_age=None):
+        self.path = path
+        self.max_age = max_age
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, url):
+        return os.path.join(self.path, hashlib.sha1(url.encode()).hexdigest() + '.html')
+
+    def get(self, url):
+        path = self._file(url)
+        try:
+            if self.max_age is not None and time.time() - os.path.getmtime(path) > self.max_age:
+                return None
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, url, content):
+        path = self._file(url)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+class DetailFetcher:
+
+    def __init__(self, workers=WORKERS, rate=RATE, retries=RETRIES, backoff=BACKOFF, timeout=TIMEOUT, cache=None):
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.limiter = RateLimiter(rate)
+        # One connection per worker, reused across requests to the same host
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._lock = threading.Lock()
+        self.stats = {'requested': 0, 'fetched': 0, 'cached': 0, 'retries': 0, 'failed': 0, 'bytes': 0, 'seconds': 0.0}
+
+    def _count(self, **counts):
+        with self._lock:
+            for k, v in counts.items():
+                self.stats[k] += v
+
+    def _delay(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+        # Exponential backoff with jitter, so retries from the pool spread out
+        return self.backoff * 2**attempt * (0.5 + random.random() / 2)
+
+    def fetch(self, url):
+        """Body of url, from the cache or the server; None if it failed."""
+        self._count(requested=1)
+        if self.cache is not None:
+            content = self.cache.get(url)
+            if content is not None:
+                self._count(cached=1)
+                return content
+        for attempt in range(self.retries + 1):
+            self.limiter.wait()
+            response = None
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                pass
+            if response is not None and response.status_code not in RETRY_STATUS:
+                if response.status_code != 200:
+                    break
+                content = response.content
+                if self.cache is not None:
+                    self.cache.put(url, content)
+                self._count(fetched=1, bytes=len(content))
+                return content
+            if attempt < self.retries:
+                self._count(retries=1)
+                time.sleep(self._delay(attempt, response))
+        self._count(failed=1)
+        return None
+
+    def fetch_all(self, urls):
+        """Bodies of urls in order (None where a fetch failed)."""
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.workers) as pool:
+            results = list(pool.map(self.fetch, urls))
+        self._count(seconds=time.perf_counter() - start)
+        return results
+
+    def report(self):
+        """Throughput summary of the fetches so far."""
+        s = self.stats
+        seconds = max(s['seconds'], 1e-9)
+        return (f"{s['requested']} pages in {s['seconds']:.1f} s ({s['requested'] / seconds:.1f} pages/s, "
+                f"{s['bytes'] / 2**20 / seconds:.2f} MiB/s): {s['fetched']} fetched, {s['cached']} cached, "
+                f"{s['retries']} retries, {s['failed']} failed")
+
+    def close(self):
+        self.session.close()
+
+
+def detail_url(template, brand, model, pattern):
+    return template.format(brand=quote(brand), model=quote(model), pattern=quote(pattern))
+
+
+def parse_detail_page(content):
+    """{label: value} from the rows of a detail page's spec table."""
+    text = content.decode('utf-8', errors='replace') if isinstance(content, bytes) else content
+    details = {}
+    for label, value in SPEC_ROW_RE.findall(text):
+        label = html.unescape(TAG_RE.sub('', label)).strip().rstrip(':')
+        if label:
+            details.setdefault(label, html.unescape(TAG_RE.sub('', value)).strip())
+    return details
+
+
+def scrape_details(racquets, template, fetcher):
+    """One row of detail-page fields per racquet.
+
+    racquets has Brand, Model and String Pattern columns. Racquets whose
+    page could not be fetched keep only their key columns.
+    """
+    keys = racquets[['Brand', 'Model', 'String Pattern']].astype(str).drop_duplicates()
+    urls = [detail_url(template, *key) for key in keys.itertuples(index=False)]
+    pages = fetcher.fetch_all(urls)
+    rows = []
+    for key, url, content in zip(keys.itertuples(index=False), urls, pages):
+        row = {'Brand': key[0], 'Model': key[1], 'String Pattern': key[2], 'Detail URL': url, 'Fetched': content is not None}
+        if content is not None:
+            row.update(parse_detail_page(content))
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    from scrape_tw_data import DATABASE_PATH, RECORDS_PATH
+
+    parser = argparse.ArgumentParser(description='Fetch per-racquet detail pages concurrently.')
+    parser.add_argument('--detail-url', required=True,
+                        help='detail page URL template with {brand}, {model} and {pattern} placeholders')
+    parser.add_argument('--records', default=None, help=f'racquets to look up (default: {RECORDS_PATH}, else the database)')
+    parser.add_argument('--out', default=DETAILS_PATH, help='details CSV path')
+    parser.add_argument('--cache', default=DETAIL_CACHE_PATH, help='response cache directory')
+    parser.add_argument('--no-cache', action='store_true', help='always request every page')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='concurrent requests')
+    parser.add_argument('--rate', type=float, default=RATE, help='requests per second across workers (0: unlimited)')
+    parser.add_argument('--retries', type=int, default=RETRIES)
+    parser.add_argument('--backoff', type=float, default=BACKOFF, help='first retry delay in seconds, doubled per retry')
+    args = parser.parse_args()
+
+    records_path = args.records or (RECORDS_PATH if os.path.exists(RECORDS_PATH) else DATABASE_PATH)
+    cache = None if args.no_cache else ResponseCache(args.cache)
+    fetcher = DetailFetcher(args.workers, args.rate, args.retries, args.backoff, cache=cache)
+    try:
+        details = scrape_details(pd.read_csv(records_path), args.detail_url, fetcher)
+    finally:
+        fetcher.close()
+    details.to_csv(args.out, index=False)
+    print(fetcher.report())
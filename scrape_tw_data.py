@@ -1,33 +1,38 @@
 # Import dependencies
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+from operator import methodcaller
 import numpy as np
 import pandas as pd
 import requests
 from bs4 import BeautifulSoup
-from sklearn.preprocessing import StandardScaler
+from dataset import write_columnar, dataset_version, DATABASE_PATH, COLUMNAR_PATH, BASE_DIR
+from linkage import canonical_table, link_records
+from matching import FEATURES_PATH, write_features
+from physics import derived_specs
+from snapshots import SNAPSHOTS_PATH, SnapshotStore
+from validation import validate
 
-######################################
-#### Scrape Data From TWU Website ####
-######################################
+URL = "https://twu.tennis-warehouse.com/cgi-bin/recommender.cgi"
 
-# Set up BeautifulSoup scraper
-url = "https://twu.tennis-warehouse.com/cgi-bin/recommender.cgi"
-page = requests.get(url)
-soup = BeautifulSoup(page.content, "html.parser")
-
-# Scrape data from current and non-current racquets separately
-datapoints_not_current = soup.find_all("div", class_="circlegrey notcurrent")
-datapoints_current = soup.find_all("div", class_="circlegrey current")
-
-#############################
-#### Configure Dataframe ####
-#############################
+# Incremental mode keeps the parsed per-listing records and the HTTP
+# validators of the last fetch next to the database
+RECORDS_PATH = os.path.join(BASE_DIR, 'racquet_records.csv')
+STATE_PATH = os.path.join(BASE_DIR, 'scrape_state.json')
+# Ingest validation output: listings held back from the database, and the report
+QUARANTINE_PATH = os.path.join(BASE_DIR, 'racquet_quarantine.csv')
+REPORT_PATH = os.path.join(BASE_DIR, 'validation_report.json')
 
 # Define columns to extract
 idx_to_col = {
-    1: 'Brand', 
-    2: 'Model', 
-    4: 'Headsize (sq in)', 
-    5: 'Length (in)', 
+    1: 'Brand',
+    2: 'Model',
+    4: 'Headsize (sq in)',
+    5: 'Length (in)',
     6: 'Swingweight (kg cm^2)',
     7: 'Twistweight (kg cm^2)',
     14: 'Vibration Frequency (Hz)',
@@ -37,16 +42,167 @@ idx_to_col = {
     19: 'Beam Width (mm)',
     24: 'RA Stiffness'
 }
-# Create dataframe 
-racquets_data = []
-for k, datapoints in enumerate([datapoints_current, datapoints_not_current]):
-    for d in datapoints:
-        racquet_dict = {}
-        if k == 0:
-            racquet_dict['Current'] = True
-        else:
-            racquet_dict['Current'] = False
-        spec_list = d.attrs['id'].split('||')
+
+# Reorder columns
+df_cols = [
+    'Current',
+    'Brand',
+    'Model',
+    'Headsize (sq in)',
+    'Length (in)',
+    'Beam Width (mm)',
+    'Weight (g)',
+    'Balance (cm)',
+    'Swingweight (kg cm^2)',
+    'Twistweight (kg cm^2)',
+    'Recoil Weight (kg cm^2)',
+    'Polarization Index',
+    'Sweet Zone (sq in)',
+    'RA Stiffness',
+    'Vibration Frequency (Hz)',
+    'MgR/I',
+    'String Pattern'
+]
+specs_numer = df_cols[3:16]
+
+######################################
+#### Scrape Data From TWU Website ####
+######################################
+
+def fetch_page(url, state=None):
+    """GET the recommender page, conditionally if state holds validators.
+
+    Returns (content, state); content is None when the server answers
+    304 Not Modified.
+    """
+    headers = {}
+    if state:
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+    page = requests.get(url, headers=headers)
+    if page.status_code == 304:
+        return None, state
+    page.raise_for_status()
+    new_state = {
+        'url': url,
+        'etag': page.headers.get('ETag'),
+        'last_modified': page.headers.get('Last-Modified'),
+        'content_hash': hashlib.sha1(page.content).hexdigest()
+    }
+    return page.content, new_state
+
+
+# A racquet div has class circlegrey plus current or notcurrent, in any order
+DATAPOINT_CLASS = 'circlegrey'
+STATUS_CLASSES = {'current': True, 'notcurrent': False}
+DIV_RE = re.compile(r"""<div((?:\s+[^\s=>/]+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s"'>]+))?)*)\s*/?>""", re.IGNORECASE)
+ATTR_RE = re.compile(r"""([^\s=>/]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?""")
+
+
+def _decode(content):
+    if isinstance(content, str):
+        return content
+    try:
+        return content.decode('utf-8')
+    except UnicodeDecodeError:
+        return content.decode('cp1252', errors='replace')
+
+
+def extract_datapoints(content):
+    """Return (current, id) pairs for every racquet div on the page.
+
+    Scans the div start tags directly instead of building a DOM. Current
+    racquets come first, then discontinued ones, each in page order.
+    """
+    found = {True: [], False: []}
+    for tag in DIV_RE.finditer(_decode(content)):
+        attrs = {}
+        for name, dq, sq, bare in ATTR_RE.findall(tag.group(1)):
+            attrs.setdefault(name.lower(), dq or sq or bare)
+        if 'id' not in attrs or DATAPOINT_CLASS not in attrs.get('class', ''):
+            continue
+        # Class lists are whitespace-separated sets, as for a CSS selector
+        classes = attrs['class'].split()
+        if DATAPOINT_CLASS not in classes:
+            continue
+        spec_id = attrs['id']
+        spec_id = html.unescape(spec_id) if '&' in spec_id else spec_id
+        for status, current in STATUS_CLASSES.items():
+            if status in classes:
+                found[current].append(spec_id)
+    return [(True, i) for i in found[True]] + [(False, i) for i in found[False]]
+
+
+def extract_datapoints_soup(content):
+    """Reference implementation of extract_datapoints using a BeautifulSoup tree."""
+    soup = BeautifulSoup(content, "html.parser")
+    # Scrape data from current and non-current racquets separately
+    datapoints_not_current = soup.select("div.circlegrey.notcurrent")
+    datapoints_current = soup.select("div.circlegrey.current")
+    return [(True, d.attrs['id']) for d in datapoints_current] + [(False, d.attrs['id']) for d in datapoints_not_current]
+
+
+def record_hash(current, spec_id):
+    return hashlib.sha1(f'{int(current)}|{spec_id}'.encode()).hexdigest()
+
+#############################
+#### Configure Dataframe ####
+#############################
+
+record_cols = ['Record Hash', 'Current'] + list(idx_to_col.values()) + ['String Pattern']
+
+
+def parse_racquets(datapoints, hashes=None):
+    """Parse (current, id) pairs into one row per listing.
+
+    All id strings are split into one field matrix and each spec column is
+    converted in a single array operation. Each row carries the hash of its
+    spec string ('Record Hash', computed unless given) and the
+    Brand/Model/String Pattern key used to diff scrapes ('Record Key').
+    """
+    spec_ids = [spec_id for _, spec_id in datapoints]
+    n_fields = np.fromiter(map(methodcaller('count', '||'), spec_ids), dtype=int, count=len(spec_ids)) + 1
+    width = max(n_fields.max(initial=0), max(idx_to_col) + 1)
+    if len(spec_ids) and (n_fields == width).all():
+        # Every id has the same layout: split them all in one call
+        fields = np.array('||'.join(spec_ids).split('||'), dtype=object).reshape(len(spec_ids), width)
+    else:
+        # Short ids are padded with None; fields counted from the end (the
+        # string pattern) are located through each row's own field count
+        spec_lists = [spec_id.split('||') for spec_id in spec_ids]
+        fields = np.array([l + [None] * (width - len(l)) for l in spec_lists] or np.empty((0, width)), dtype=object)
+    rows = np.arange(len(fields))
+
+    def field_from_end(k):
+        values = pd.Series(fields[rows, np.maximum(n_fields - k, 0)], dtype=object)
+        return values.where(n_fields >= k)
+
+    racquets_data = {
+        'Record Hash': hashes if hashes is not None else [record_hash(current, spec_id) for current, spec_id in datapoints],
+        'Current': [current for current, _ in datapoints],
+        'Brand': fields[:, 1],
+        'Model': pd.Series(fields[:, 2], dtype=object).str.replace('_', ' ', regex=False)
+    }
+    num_idx = [i for i in idx_to_col if i > 2]
+    try:
+        num_values = fields[:, num_idx].astype(float)
+    except (TypeError, ValueError):
+        # Some fields are missing or not numbers: coerce those to NaN
+        num_values = np.column_stack([pd.to_numeric(fields[:, i], errors='coerce') for i in num_idx]) if len(fields) else np.empty((0, len(num_idx)))
+    for j, i in enumerate(num_idx):
+        racquets_data[idx_to_col[i]] = num_values[:, j]
+    racquets_data['String Pattern'] = field_from_end(3) + 'x' + field_from_end(2).str[0:2]
+    return _finish_records(pd.DataFrame(racquets_data, columns=record_cols))
+
+
+def parse_racquets_loop(datapoints):
+    """Reference implementation of parse_racquets parsing one listing at a time."""
+    racquets_data = []
+    for current, spec_id in datapoints:
+        racquet_dict = {'Record Hash': record_hash(current, spec_id), 'Current': current}
+        spec_list = spec_id.split('||')
         for i in idx_to_col:
             try:
                 value = spec_list[i]
@@ -59,54 +215,168 @@ for k, datapoints in enumerate([datapoints_current, datapoints_not_current]):
                 racquet_dict[idx_to_col[i]] = None
         racquet_dict['String Pattern'] = f'{spec_list[-3]}x{spec_list[-2][0:2]}'
         racquets_data.append(racquet_dict)
-df = pd.DataFrame(racquets_data)
-df.dropna(inplace=True)
+    return _finish_records(pd.DataFrame(racquets_data, columns=record_cols))
+
+
+def _finish_records(df):
+    # Incomplete listings are kept; validation quarantines them with a reason
+    df = df.astype({'Current': bool, **{c: float for i, c in idx_to_col.items() if i > 2}})
+    df['Record Key'] = df['Brand'] + '||' + df['Model'] + '||' + df['String Pattern']
+    return add_derived_specs(df)
 
 ##############################################################
 #### Add Columns for Recoil Weight and Polarization Index ####
 ##############################################################
 
-df['Recoil Weight (kg cm^2)'] = df['Swingweight (kg cm^2)'] - (0.001*df['Weight (g)'] * (df['Balance (cm)'] - 10)**2)
-df['Recoil Weight (kg cm^2)'] = df['Recoil Weight (kg cm^2)'].apply(lambda x: int(round(x, 0)))
-df['Polarization Index'] = (12 * df['Recoil Weight (kg cm^2)'])/(0.001 * df['Weight (g)'] * (2.54 * df['Length (in)'])**2) - 1
-df['Polarization Index'] = df['Polarization Index'].apply(lambda x: round(x, 2))
-df['MgR/I'] = (0.001 * df['Weight (g)'] * 980.5 * df['Balance (cm)'])/(df['Recoil Weight (kg cm^2)'] + 0.001 * df['Weight (g)'] * df['Balance (cm)']**2)
+def add_derived_specs(df):
+    df['Recoil Weight (kg cm^2)'], df['Polarization Index'], df['MgR/I'] = derived_specs(
+        df['Swingweight (kg cm^2)'], df['Weight (g)'], df['Balance (cm)'], df['Length (in)'])
+    return df
 
-#############################
-#### Save df to CSV File ####
-#############################
+########################
+#### Build Database ####
+########################
 
-# Reorder columns
-df_cols = [
-    'Current',
-    'Brand',
-    'Model',
-    'Headsize (sq in)', 
-    'Length (in)', 
-    'Beam Width (mm)',
-    'Weight (g)', 
-    'Balance (cm)', 
-    'Swingweight (kg cm^2)', 
-    'Twistweight (kg cm^2)', 
-    'Recoil Weight (kg cm^2)', 
-    'Polarization Index',
-    'Sweet Zone (sq in)',
-    'RA Stiffness',
-    'Vibration Frequency (Hz)',
-    'MgR/I',
-    'String Pattern'
-]
-df = df[df_cols].copy()
-specs_numer = df_cols[3:16]
+def build_database(records):
+    """Turn per-listing records into the racquet database table.
+
+    Listings are validated first (see validation.py): bad values are
+    corrected and listings that fail are quarantined. Listings of the same
+    racquet, including near-identical model strings, are then linked (see
+    linkage.py) and merged by averaging their specs. The cluster id of
+    every listing is stored in records['Cluster'] (-1 if quarantined).
+    Returns (database, quarantined listings, report).
+    """
+    df, quarantined, validation_report = validate(records[df_cols])
+
+    # Link duplicated listings and merge each cluster into one racquet
+    cluster_ids, link_stats = link_records(df, specs_numer)
+    records['Cluster'] = -1
+    records.loc[df.index, 'Cluster'] = cluster_ids
+    df = df.reset_index(drop=True)
+    df = canonical_table(df, cluster_ids, specs_numer)
+    # Racquets still sharing a name (e.g. listed with two head sizes) are averaged
+    df = df.groupby(by=['Current', 'Brand', 'Model', 'String Pattern'], as_index=False)[specs_numer].mean()
+    return df[df_cols].copy(), quarantined, {'validation': validation_report, 'linkage': link_stats}
+
+
+def merge_records(old_records, datapoints):
+    """Merge freshly scraped datapoints into the stored records.
+
+    Only datapoints whose spec-string hash is not already stored are parsed.
+    Returns (records, summary) where summary lists the added, changed and
+    removed racquet keys.
+    """
+    known = set(old_records['Record Hash'])
+    hashes = [record_hash(current, spec_id) for current, spec_id in datapoints]
+    new = [(d, h) for d, h in zip(datapoints, hashes) if h not in known]
+    kept = old_records[old_records['Record Hash'].isin(set(hashes))]
+    parsed = parse_racquets([d for d, _ in new], [h for _, h in new])
+    records = pd.concat([kept, parsed], ignore_index=True)
+
+    # A racquet is changed when the set of listings under its key differs
+    old_sets = old_records.groupby('Record Key')['Record Hash'].agg(frozenset)
+    new_sets = records.groupby('Record Key')['Record Hash'].agg(frozenset)
+    common = old_sets.index.intersection(new_sets.index)
+    summary = {
+        'added': sorted(set(new_sets.index) - set(old_sets.index)),
+        'changed': sorted(k for k in common if old_sets[k] != new_sets[k]),
+        'removed': sorted(set(old_sets.index) - set(new_sets.index)),
+        'parsed': len(parsed),
+        'reused': len(kept)
+    }
+    return records, summary
+
+
+def load_records(path):
+    if not os.path.exists(path):
+        return parse_racquets([])
+    return pd.read_csv(path, dtype={'Record Hash': str, 'Record Key': str, 'Brand': str, 'Model': str, 'String Pattern': str})
+
+
+def load_state(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def print_summary(summary, max_listed=20):
+    print(f"{summary['parsed']} listings parsed, {summary['reused']} reused")
+    for k in ['added', 'changed', 'removed']:
+        print(f"{len(summary[k])} racquets {k}")
+        for key in summary[k][:max_listed]:
+            print(f"    {' '.join(key.split('||'))}")
+        if len(summary[k]) > max_listed:
+            print(f"    ... and {len(summary[k]) - max_listed} more")
+
+
+def save_database(df, csv_path=DATABASE_PATH, columnar_path=COLUMNAR_PATH, features_path=FEATURES_PATH):
+    # Save to file
+    df.to_csv(csv_path, index=False)
+    # Save columnar copy that the app opens memory-mapped
+    write_columnar(df, columnar_path)
+    # Standardized spec matrix for the Match page, tied to the columnar copy
+    write_features(df, dataset_version(columnar_path), features_path)
+
+
+def save_validation(quarantined, report, quarantine_path=QUARANTINE_PATH, report_path=REPORT_PATH):
+    quarantined.to_csv(quarantine_path, index=False)
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def scrape(url=URL, incremental=False, csv_path=DATABASE_PATH, columnar_path=COLUMNAR_PATH, features_path=FEATURES_PATH,
+           records_path=RECORDS_PATH, state_path=STATE_PATH, quarantine_path=QUARANTINE_PATH, report_path=REPORT_PATH,
+           snapshots_path=SNAPSHOTS_PATH):
+    """Scrape the recommender page and write the database.
 
-# Replace incorrect values
-df['Headsize (sq in)'].replace(11.0, 115.0, inplace=True)
-df['Twistweight (kg cm^2)'].replace(115.0, 11.5, inplace=True)
-df['Beam Width (mm)'].replace(242.0, 23.0, inplace=True)
+    In incremental mode the fetch is conditional on the last ETag /
+    Last-Modified and nothing is rewritten when the page is unchanged.
+    Every written database is also appended to the snapshot history at
+    snapshots_path (None to skip). Returns the change summary, or None if
+    nothing changed.
+    """
+    state = load_state(state_path) if incremental else None
+    content, new_state = fetch_page(url, state)
+    if content is None or (state and new_state['content_hash'] == state.get('content_hash')):
+        print('Recommender page not modified; database is up to date.')
+        return None
+    old_records = load_records(records_path) if incremental else parse_racquets([])
+    records, summary = merge_records(old_records, extract_datapoints(content))
+    database, quarantined, report = build_database(records)
+    save_database(database, csv_path, columnar_path, features_path)
+    save_validation(quarantined, report, quarantine_path, report_path)
+    snapshot = SnapshotStore(snapshots_path).append(database) if snapshots_path else None
+    records.to_csv(records_path, index=False)
+    with open(state_path, 'w') as f:
+        json.dump(new_state, f, indent=2)
+    print_summary(summary)
+    validation, link_stats = report['validation'], report['linkage']
+    print(f"{validation['quarantined']} listings quarantined ({quarantine_path}), "
+          f"{sum(c['count'] for c in validation['checks'].get('fixes', {}).values())} values corrected")
+    print(f"{link_stats['listings']} listings linked into {link_stats['clusters']} racquets "
+          f"({link_stats['candidate_pairs']} candidate pairs of {link_stats['all_pairs']})")
+    if snapshot:
+        print(f"Snapshot version {snapshot['version']}: {snapshot['upserts']} racquets added or changed, "
+              f"{snapshot['deletes']} removed")
+    return summary
 
-# Aggregate duplicated racquets by averaging
-df = df.groupby(by=['Current', 'Brand', 'Model', 'String Pattern'], as_index=False)[specs_numer].mean()
-df = df[df_cols].copy()
 
-# Save to file
-df.to_csv('racquet_database.csv', index=False)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scrape racquet specs from the TWU recommender.')
+    parser.add_argument('--url', default=URL)
+    parser.add_argument('--incremental', action='store_true',
+                        help='conditional fetch and only parse new or changed listings')
+    parser.add_argument('--out', default=DATABASE_PATH, help='database CSV path')
+    parser.add_argument('--columns-out', default=COLUMNAR_PATH, help='columnar database directory')
+    parser.add_argument('--features-out', default=FEATURES_PATH, help='standardized spec matrix directory for the Match page')
+    parser.add_argument('--records', default=RECORDS_PATH, help='per-listing record store used by --incremental')
+    parser.add_argument('--state', default=STATE_PATH, help='fetch state file used by --incremental')
+    parser.add_argument('--quarantine', default=QUARANTINE_PATH, help='listings rejected by validation')
+    parser.add_argument('--report', default=REPORT_PATH, help='validation and linkage report (JSON)')
+    parser.add_argument('--snapshots', default=SNAPSHOTS_PATH, help='database history directory')
+    parser.add_argument('--no-snapshot', action='store_true', help='do not record this scrape in the history')
+    args = parser.parse_args()
+    scrape(args.url, args.incremental, args.out, args.columns_out, args.features_out, args.records, args.state, args.quarantine, args.report,
+           None if args.no_snapshot else args.snapshots)
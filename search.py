@@ -0,0 +1,259 @@
+# Typeahead racquet search
+#
+# Every racquet is indexed under its normalized name "brand model string
+# pattern" (lower case, runs of other characters folded to one space). The
+# index is built once per dataset and holds:
+#
+#   names     the padded names as a sorted fixed-width byte array, so a
+#             prefix query is two binary searches; the position of a name in
+#             this array is its entry id
+#   models    the names without the brand, sorted, for prefix queries that
+#             start at the model
+#   postings  for each character trigram, the ids of the entries containing
+#             it (CSR arrays, ids ascending)
+#
+# A query is answered from a bounded number of candidates: the first
+# prefix matches, plus the entries found in the most of the query's rarest
+# trigram lists. Those lists are read rarest first until POSTING_BUDGET
+# entries, and merged with one sort that counts how many lists hold each
+# entry, so a typo only has to leave some of the rare trigrams intact. The
+# MAX_CANDIDATES entries in the most lists are then scored exactly: the
+# fraction of the query trigrams in the name, plus 1 for a prefix match,
+# ties going to current racquets and then shorter names. The work per query
+# is bounded by the budgets, apart from the binary searches.
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from dataset import derived
+from lazy import lazy_import
+
+st = lazy_import('streamlit')
+
+POSTING_BUDGET = 16_384
+MAX_CANDIDATES = 128
+PREFIX_CANDIDATES = 32
+MAX_QUERY_TRIGRAMS = 64
+PICKER_OPTIONS = 20
+BUILD_CHUNK_ROWS = 200_000
+
+# Names are stored with each character replaced by its symbol number:
+# space, a-z and 0-9 are 1-37, so the NUL padding of a fixed-width byte
+# array is symbol 0, the end of the name
+_SYMBOLS = ' abcdefghijklmnopqrstuvwxyz0123456789'
+_BASE = len(_SYMBOLS) + 1
+_ENCODE = np.zeros(256, dtype=np.uint8)
+_ENCODE[np.frombuffer(_SYMBOLS.encode(), dtype=np.uint8)] = np.arange(1, _BASE)
+# Number of set bits of each byte, to count matched trigrams from bitmasks
+_BIT_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def normalize(text):
+    """Lower case, with runs of anything but letters and digits as one space."""
+    return re.sub(r'[^a-z0-9]+', ' ', str(text).lower()).strip()
+
+
+def _normalize_series(series):
+    codes, values = pd.factorize(series.astype(str))
+    # One pass of the regex over the distinct values joined by newlines,
+    # instead of one call per value
+    text = re.sub(r'[^a-z0-9\n]+', ' ', '\n'.join(values).lower())
+    normalized = re.sub(r' ?\n ?', '\n', text).strip(' ').split('\n')
+    if len(normalized) != len(values):
+        # A value with a newline of its own
+        normalized = [normalize(v) for v in values]
+    return pd.Series(np.array(normalized, dtype=object)[codes], index=series.index)
+
+
+def _chars(names):
+    return np.frombuffer(names.tobytes(), dtype=np.uint8).reshape(len(names), names.itemsize)
+
+
+def _encode(names):
+    """Fixed-width byte array of normalized names, as symbol numbers."""
+    names = np.asarray(names).astype(bytes)
+    return _ENCODE[_chars(names)].view(names.dtype).ravel()
+
+
+def _trigrams(names):
+    """(trigram codes, valid) at each position of encoded names."""
+    symbols = _chars(names).astype(np.uint16)
+    codes = (symbols[:, :-2] * _BASE + symbols[:, 1:-1]) * _BASE + symbols[:, 2:]
+    # Padding only follows the name, so a trigram whose last symbol is not
+    # padding lies inside it
+    return codes, symbols[:, 2:] != 0
+
+
+def _query_trigrams(key):
+    codes, valid = _trigrams(np.array([key]))
+    return np.unique(codes[valid])[:MAX_QUERY_TRIGRAMS]
+
+
+class SearchIndex:
+
+    def __init__(self, df, chunk_rows=BUILD_CHUNK_ROWS):
+        self.df = df
+        model = _normalize_series(df['Model']) + ' ' + _normalize_series(df['String Pattern'])
+        full = _normalize_series(df['Brand']) + ' ' + model
+        # Leading and trailing spaces make word starts and ends trigrams
+        names = _encode(' ' + full + ' ')
+        self.rows = np.argsort(names, kind='stable')
+        self.names = names[self.rows]
+        # Tie-break of equal scores: current racquets, then shorter names
+        self.ties = np.char.str_len(self.names) + 1000 * ~df['Current'].to_numpy(dtype=bool)[self.rows]
+        models = _encode(' ' + model + ' ')[self.rows]
+        self.model_order = np.argsort(models, kind='stable')
+        self.models = models[self.model_order]
+        self.model_ranks = np.empty(len(models), dtype=np.int32)
+        self.model_ranks[self.model_order] = np.arange(len(models))
+        # Count the entries of each trigram, then fill the postings chunk by
+        # chunk; entries are visited in id order, so each list is ascending
+        n_codes = _BASE ** 3
+        chunks = []
+        counts = np.zeros(n_codes, dtype=np.int64)
+        for start in range(0, len(self.names), chunk_rows):
+            codes, valid = _trigrams(self.names[start:start + chunk_rows])
+            codes = np.where(valid, codes, n_codes)
+            codes.sort(axis=1)
+            # A trigram repeated within a name is listed once
+            first = np.ones(codes.shape, dtype=bool)
+            first[:, 1:] = codes[:, 1:] != codes[:, :-1]
+            first &= codes < n_codes
+            entries = np.nonzero(first)[0] + start
+            codes = codes[first]
+            counts += np.bincount(codes, minlength=n_codes)
+            chunks.append((codes, entries.astype(np.int32)))
+        self.offsets = np.zeros(n_codes + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+        self.postings = np.empty(self.offsets[-1], dtype=np.int32)
+        fill = self.offsets[:-1].copy()
+        for codes, entries in chunks:
+            order = np.argsort(codes, kind='stable')
+            codes, entries = codes[order], entries[order]
+            # Position of each pair within its trigram's run in this chunk
+            chunk_counts = np.bincount(codes, minlength=n_codes)
+            run_starts = np.cumsum(chunk_counts) - chunk_counts
+            self.postings[fill[codes] + np.arange(len(codes)) - run_starts[codes]] = entries
+            fill += chunk_counts
+        # Query trigram bits, set and cleared by each query under the lock
+        self._bits = np.zeros(n_codes, dtype=np.uint64)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def _prefix(self, keys, key):
+        """Range of the sorted keys that start with key."""
+        if len(key) > keys.itemsize:
+            return 0, 0
+        # Search with keys of the array's own dtype; a shorter one would
+        # make numpy cast the whole array
+        lo = np.searchsorted(keys, np.array(key, dtype=keys.dtype))
+        hi = np.searchsorted(keys, np.array(key[:-1] + bytes([key[-1] + 1]), dtype=keys.dtype))
+        return lo, hi
+
+    def _candidates(self, codes):
+        """Entries found in the most of the rarest trigram lists of codes."""
+        starts, stops = self.offsets[codes], self.offsets[codes + 1]
+        # A name with at least half of the query trigrams has one of the
+        # rarest n // 2 + 1 of them
+        lists = []
+        budget = POSTING_BUDGET
+        ranges = sorted(zip(starts.tolist(), stops.tolist()), key=lambda r: r[1] - r[0])
+        for start, stop in ranges[:len(codes) // 2 + 1]:
+            if budget <= 0:
+                break
+            if stop > start:
+                lists.append(self.postings[start:min(stop, start + budget)])
+                budget -= len(lists[-1])
+        if not lists:
+            return np.zeros(0, dtype=self.postings.dtype)
+        entries = np.sort(np.concatenate(lists))
+        # An entry in c lists repeats c - 1 times after its first copy;
+        # entries in the most lists come first, then entries of one list
+        repeated = entries[1:][entries[1:] == entries[:-1]]
+        multi, counts = np.unique(repeated, return_counts=True)
+        multi = multi[np.argsort(-counts, kind='stable')][:MAX_CANDIDATES]
+        return np.concatenate([multi, entries[:MAX_CANDIDATES - len(multi)]])
+
+    def _scores(self, entries, codes):
+        """Fraction of the query trigrams codes found in each entry."""
+        if not len(codes):
+            return np.zeros(len(entries))
+        trigrams, _ = _trigrams(self.names[entries])
+        # One bit per query trigram, so repeats within a name count once
+        with self._lock:
+            self._bits[codes] = np.left_shift(np.uint64(1), np.arange(len(codes), dtype=np.uint64))
+            masks = np.bitwise_or.reduce(self._bits[trigrams], axis=1)
+            self._bits[codes] = 0
+        shared = _BIT_COUNTS[masks.view(np.uint8).reshape(len(entries), 8)].sum(axis=1)
+        return shared / len(codes)
+
+    def search(self, query, k=10, mask=None):
+        """Best k matches of query as (rows, scores), best first.
+
+        rows are row positions in the indexed DataFrame; mask (a boolean
+        array over its rows) restricts the matches. A score is the fraction
+        of the query's trigrams found in the name, plus 1 when the query is
+        a prefix of the name or of its model. The empty query lists racquets
+        in name order with score 0.
+        """
+        query = normalize(query)
+        if not query:
+            entries = np.arange(len(self)) if mask is None else np.flatnonzero(mask[self.rows])
+            entries = entries[:k]
+            return self.rows[entries], np.zeros(len(entries))
+        # Leading space only: the last word may still be being typed
+        key = _encode([' ' + query])[0]
+        name_lo, name_hi = self._prefix(self.names, key)
+        model_lo, model_hi = self._prefix(self.models, key)
+        codes = _query_trigrams(key)
+        parts = [
+            np.arange(name_lo, min(name_hi, name_lo + PREFIX_CANDIDATES)),
+            self.model_order[model_lo:min(model_hi, model_lo + PREFIX_CANDIDATES)],
+            self._candidates(codes)
+        ]
+        entries = np.unique(np.concatenate(parts))
+        if mask is not None:
+            entries = entries[mask[self.rows[entries]]]
+        # Entry ids and model ranks are positions in the sorted keys, so the
+        # prefix matches are the ids and ranks inside the ranges
+        ranks = self.model_ranks[entries]
+        prefix = ((entries >= name_lo) & (entries < name_hi)) | ((ranks >= model_lo) & (ranks < model_hi))
+        scores = self._scores(entries, codes) + prefix
+        best = np.lexsort((entries, self.ties[entries], -scores))[:k]
+        return self.rows[entries[best]], scores[best]
+
+    def label(self, row):
+        """Display name of a racquet: brand, model, string pattern."""
+        df = self.df
+        label = f"{df['Brand'].iat[row]} {df['Model'].iat[row]} {df['String Pattern'].iat[row]}"
+        if not df['Current'].iat[row]:
+            label += ' (discontinued)'
+        return label
+
+
+def search_index(df):
+    """SearchIndex for df, built once per loaded dataset."""
+    return derived(df, 'search_index', SearchIndex)
+
+
+def racquet_picker(container, df, key, mask=None, default=0, label='Racquet'):
+    """Search box with a select box of its ranked matches.
+
+    Returns the row position of the selected racquet, the best match unless
+    another one is picked. With an empty search, or one that matches
+    nothing, the default row is offered first.
+    """
+    index = search_index(df)
+    query = container.text_input(label=f'Search {label}', key=f'{key}_query',
+                                 placeholder='Brand, model or string pattern')
+    rows, _ = index.search(query, PICKER_OPTIONS, mask)
+    options = [int(r) for r in rows]
+    if query and not options:
+        container.caption('No racquets match the search.')
+    if not query or not options:
+        options = [default] + [r for r in options if r != default]
+    return container.selectbox(label=label, options=options, format_func=index.label, key=f'{key}_row')
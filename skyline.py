@@ -0,0 +1,187 @@
+# Pareto frontier (skyline) queries for the Discover page
+#
+# A racquet is on the skyline of a set of specs when no other racquet is at
+# least as good on every one of them and strictly better on one, where
+# better is larger or smaller per spec. Specs to minimize are negated so
+# every column is maximized, then:
+#
+#   1 spec    the rows with the best value
+#   2 specs   a sort-based sweep: rows in descending order of the first
+#             spec (then the second) are on the skyline when they beat the
+#             best second spec of every row with a larger first spec
+#   3+ specs  sort-filter-skyline in batches: rows are taken in descending
+#             order of a score that grows with every spec (the sum of the
+#             min-max scaled columns), so a row can only be dominated by
+#             rows taken before it. Each batch of the BATCH_ROWS highest
+#             scores is compared within itself; its undominated rows are on
+#             the skyline and are used to discard the remaining rows they
+#             dominate.
+#
+# Before either algorithm runs, every row dominated by the row with the
+# highest score (which is on the skyline) is discarded in one pass, which
+# removes most rows when the chosen specs are correlated. Results are cached
+# per (specs, directions, filter state).
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from dataset import derived
+
+BATCH_ROWS = 256
+PRUNE_POINTS = 8
+CHUNK_ELEMENTS = 1 << 22
+CACHE_SIZE = 64
+
+
+def _dominated(columns, by):
+    """Whether each row of columns (a list of 1-D arrays) is dominated by a row of by."""
+    n = len(columns[0])
+    if n * len(by) <= CHUNK_ELEMENTS:
+        # Few pairs: compare every row with every row of by at once
+        values = np.column_stack(columns)[:, None, :]
+        ge = (by[None, :, :] >= values).all(axis=2)
+        gt = (by[None, :, :] > values).any(axis=2)
+        return (ge & gt).any(axis=1)
+    # Many rows: one pass over each column per row of by
+    out = np.zeros(n, dtype=bool)
+    for point in by:
+        ge = np.ones(n, dtype=bool)
+        gt = np.zeros(n, dtype=bool)
+        for column, value in zip(columns, point):
+            ge &= column <= value
+            gt |= column < value
+        out |= ge & gt
+    return out
+
+
+def _discard(values, rows, front):
+    """rows of values not dominated by the rows front, a few front rows at a time."""
+    for start in range(0, len(front), PRUNE_POINTS):
+        if not len(rows):
+            break
+        columns = [c[rows] for c in values.T]
+        rows = rows[~_dominated(columns, values[front[start:start + PRUNE_POINTS]])]
+    return rows
+
+
+def _scores(columns):
+    """Sum of the min-max scaled columns."""
+    scores = np.zeros(len(columns[0]))
+    for column in columns:
+        lo, hi = column.min(), column.max()
+        scores += (column - lo) / (hi - lo if hi > lo else 1)
+    return scores
+
+
+def _skyline_2d(values, rows):
+    x, y = values[rows, 0], values[rows, 1]
+    # Descending first spec, ties by descending second spec
+    order = np.lexsort((-y, -x))
+    xs, ys = x[order], y[order]
+    new_x = np.ones(len(xs), dtype=bool)
+    np.not_equal(xs[1:], xs[:-1], out=new_x[1:])
+    group = np.cumsum(new_x) - 1
+    starts = np.flatnonzero(new_x)
+    # Best second spec among rows with a strictly larger first spec
+    running = np.maximum.accumulate(ys)
+    before = np.full(len(starts), -np.inf)
+    before[1:] = running[starts[1:] - 1]
+    # The first row of each group has the group's best second spec
+    keep = (ys == ys[starts][group]) & (ys > before[group])
+    return rows[order[keep]]
+
+
+def _skyline_nd(values, rows, scores, batch_rows=BATCH_ROWS):
+    fronts = []
+    while len(rows):
+        s = scores[rows]
+        if len(rows) > batch_rows:
+            # Every row scoring at least the batch_rows-th best, ties included
+            kth = np.partition(s, len(s) - batch_rows)[len(s) - batch_rows]
+            in_batch = s >= kth
+        else:
+            in_batch = np.ones(len(rows), dtype=bool)
+        batch, rows = rows[in_batch], rows[~in_batch]
+        # A row dominating a batch row scores higher, so it is in the batch
+        # or was discarded by a skyline row that dominates both
+        front = batch[~_dominated([c[batch] for c in values.T], values[batch])]
+        fronts.append(front)
+        rows = _discard(values, rows, front[np.argsort(-scores[front], kind='stable')])
+    return np.concatenate(fronts)
+
+
+def skyline(values, maximize=None):
+    """Row positions of the Pareto-optimal rows of the (n, d) array values.
+
+    maximize is a boolean per column (default all True); False columns are
+    minimized. Rows with a missing value are never on the skyline. Rows with
+    equal values are either all on the skyline or all off it. Positions are
+    returned in ascending order.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    if maximize is None:
+        maximize = np.ones(values.shape[1], dtype=bool)
+    # Column-major, so each spec is one contiguous array
+    values = np.asfortranarray(np.where(np.asarray(maximize, dtype=bool), values, -values))
+    missing = np.zeros(len(values), dtype=bool)
+    for column in values.T:
+        missing |= np.isnan(column)
+    rows = np.flatnonzero(~missing)
+    if not len(rows) or values.shape[1] == 0:
+        return rows
+    columns = [c[rows] for c in values.T]
+    if values.shape[1] == 1:
+        return rows[columns[0] == columns[0].max()]
+    scores = np.full(len(values), -np.inf)
+    scores[rows] = _scores(columns)
+    top = rows[np.argmax(scores[rows])]
+    rows = rows[~_dominated(columns, values[[top]])]
+    if values.shape[1] == 2:
+        found = _skyline_2d(values, rows)
+    else:
+        found = _skyline_nd(values, rows, scores)
+    return np.sort(found)
+
+
+class SkylineEngine:
+
+    def __init__(self, df, cache_size=CACHE_SIZE):
+        self.df = df
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def frontier(self, directions, mask=None, mask_key=None):
+        """Rows on the skyline of directions ({spec: 'max' or 'min'}) among mask.
+
+        As MatchEngine.top_k, mask_key is a hashable description of the
+        filter state; without it the mask is hashed for the cache key.
+        """
+        for s, direction in directions.items():
+            if direction not in ('max', 'min'):
+                raise ValueError(f"Direction of {s} must be 'max' or 'min', not {direction!r}")
+        if mask is not None and mask_key is None:
+            mask_key = hashlib.sha1(np.packbits(mask)).hexdigest()
+        key = (tuple(directions.items()), mask_key)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        rows = np.arange(len(self.df)) if mask is None else np.flatnonzero(mask)
+        values = np.column_stack([self.df[s].to_numpy()[rows] for s in directions])
+        maximize = [d == 'max' for d in directions.values()]
+        result = rows[skyline(values, maximize)]
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+
+def skyline_engine(df):
+    """SkylineEngine for df, built once per loaded dataset."""
+    return derived(df, 'skyline_engine', SkylineEngine)
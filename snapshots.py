@@ -0,0 +1,309 @@
+# Append-only history of the racquet database
+#
+#   python snapshots.py list
+#   python snapshots.py as-of 2024-03-01 [--out racquets_2024_03.csv]
+#   python snapshots.py diff 2024-01-01 2024-03-01 [--out changes.csv]
+#
+# Every scrape appends one version to racquet_snapshots/. A version stores
+# only its delta against the version before: the racquets that were added
+# or whose specs changed (upserts) and the ones that disappeared (deletes),
+# as one compressed .npz segment that is never rewritten. A racquet is
+# identified by (Current, Brand, Model, String Pattern), so a racquet that
+# is discontinued shows up as a delete of its current listing and an upsert
+# of its discontinued one. snapshots.json lists the versions with their
+# timestamps and counts.
+#
+# The table as of version v is the last event of every racquet over
+# segments 1..v, found with one lexsort, keeping the racquets whose last
+# event is an upsert. The changes between two versions only involve the
+# racquets with events in between, so a diff compares their states at the
+# two versions.
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from dataset import BASE_DIR, DF_COLS, SPEC_COLS
+
+SNAPSHOTS_PATH = os.path.join(BASE_DIR, 'racquet_snapshots')
+SNAPSHOTS_FORMAT_VERSION = 1
+INDEX_FILE = 'snapshots.json'
+KEY_COLS = ['Current', 'Brand', 'Model', 'String Pattern']
+UPSERT, DELETE = 1, 0
+# Specs within this relative difference are the same; derived specs are
+# recomputed on every scrape and differ in the last bits
+SPEC_RTOL = 1e-9
+
+
+def _same_specs(old, new):
+    return np.isclose(old, new, rtol=SPEC_RTOL, atol=0, equal_nan=True)
+
+
+def _key_strings(current, brand, model, pattern):
+    return pd.Series(np.asarray(current).astype(int).astype(str)) + '||' + pd.Series(brand) + '||' + pd.Series(model) + '||' + pd.Series(pattern)
+
+
+class SnapshotStore:
+
+    def __init__(self, path=SNAPSHOTS_PATH):
+        self.path = path
+        self._segments = {}
+        self._index = None
+
+    def _read_index(self):
+        if self._index is None:
+            try:
+                with open(os.path.join(self.path, INDEX_FILE)) as f:
+                    self._index = json.load(f)
+            except FileNotFoundError:
+                self._index = {'format_version': SNAPSHOTS_FORMAT_VERSION, 'spec_cols': SPEC_COLS, 'versions': []}
+            if self._index['format_version'] != SNAPSHOTS_FORMAT_VERSION or self._index['spec_cols'] != SPEC_COLS:
+                raise ValueError(f'{self.path} was written with another snapshot format or spec list')
+        return self._index
+
+    def versions(self):
+        """Version entries, oldest first: version, taken_at, rows, upserts, deletes, bytes."""
+        return list(self._read_index()['versions'])
+
+    def resolve(self, when):
+        """Version number for when: a version number, a date / datetime, or an ISO date string.
+
+        A date resolves to the last version taken at or before it.
+        """
+        versions = self.versions()
+        if isinstance(when, (int, np.integer)):
+            if not 1 <= when <= len(versions):
+                raise KeyError(f'No snapshot version {when}')
+            return int(when)
+        if isinstance(when, str):
+            when = datetime.fromisoformat(when)
+        if not isinstance(when, datetime):
+            when = datetime(when.year, when.month, when.day)
+        if when.hour == when.minute == when.second == when.microsecond == 0:
+            # A bare date covers the whole day
+            when = when.replace(hour=23, minute=59, second=59)
+        taken = [datetime.fromisoformat(v['taken_at']) for v in versions]
+        v = int(np.searchsorted(np.array(taken, dtype='datetime64[us]'), np.datetime64(when), side='right'))
+        if v == 0:
+            raise KeyError(f'No snapshot taken by {when.isoformat()}')
+        return v
+
+    def _segment(self, version):
+        if version not in self._segments:
+            with np.load(os.path.join(self.path, f'{version:06d}.npz'), allow_pickle=False) as npz:
+                segment = {k: npz[k] for k in npz.files}
+            segment['key'] = _key_strings(segment['current'], segment['brand'], segment['model'], segment['pattern']).to_numpy()
+            self._segments[version] = segment
+        return self._segments[version]
+
+    def _events(self, first, last):
+        # Events of versions first..last concatenated in version order
+        segments = [self._segment(v) for v in range(first, last + 1)]
+        events = {k: np.concatenate([s[k] for s in segments]) for k in segments[0]} if segments else None
+        if events is not None:
+            events['version'] = np.repeat(np.arange(first, last + 1), [len(s['op']) for s in segments])
+        return events
+
+    @staticmethod
+    def _last_events(events, keys=None):
+        # Position of the last event of every key (or of each of keys, -1 if none)
+        codes, uniques = pd.factorize(events['key'])
+        order = np.lexsort((np.arange(len(codes)), codes))
+        sorted_codes = codes[order]
+        last = order[np.r_[sorted_codes[1:] != sorted_codes[:-1], True]] if len(order) else order
+        if keys is None:
+            return last
+        positions = np.full(len(keys), -1)
+        found = pd.Index(uniques).get_indexer(keys)
+        last_by_code = np.full(len(uniques), -1)
+        last_by_code[codes[last]] = last
+        positions[found >= 0] = last_by_code[found[found >= 0]]
+        return positions
+
+    @staticmethod
+    def _frame(events, rows):
+        df = pd.DataFrame({
+            'Current': events['current'][rows],
+            'Brand': events['brand'][rows].astype(object),
+            'Model': events['model'][rows].astype(object),
+            'String Pattern': events['pattern'][rows].astype(object)
+        })
+        df[SPEC_COLS] = events['specs'][rows]
+        return df
+
+    def as_of(self, when):
+        """The racquet table as it was at version / date when, in DF_COLS order.
+
+        Rows are sorted by Current, Brand, Model and String Pattern, as the
+        scraper writes them.
+        """
+        version = self.resolve(when)
+        events = self._events(1, version)
+        last = self._last_events(events)
+        last = last[events['op'][last] == UPSERT]
+        df = self._frame(events, last)
+        return df.sort_values(KEY_COLS, kind='stable').reset_index(drop=True)[DF_COLS]
+
+    def append(self, df, taken_at=None):
+        """Store df as a new version holding its delta against the latest one.
+
+        Returns the new version entry, or None if df equals the latest
+        version.
+        """
+        index = self._read_index()
+        n_versions = len(index['versions'])
+        keys = _key_strings(df['Current'], df['Brand'].astype(str), df['Model'].astype(str), df['String Pattern'].astype(str))
+        if keys.duplicated().any():
+            raise ValueError('Racquets must be unique by Current, Brand, Model and String Pattern')
+        specs = df[SPEC_COLS].to_numpy(dtype=np.float64)
+        upsert = np.ones(len(df), dtype=bool)
+        deleted = np.zeros(0, dtype=int)
+        events = None
+        if n_versions:
+            events = self._events(1, n_versions)
+            last = self._last_events(events)
+            last = last[events['op'][last] == UPSERT]
+            previous = pd.Index(events['key'][last])
+            position = previous.get_indexer(keys)
+            known = position >= 0
+            old_specs = events['specs'][last[position[known]]]
+            same = _same_specs(old_specs, specs[known]).all(axis=1)
+            upsert[np.flatnonzero(known)[same]] = False
+            deleted = last[~previous.isin(keys)]
+            if not upsert.any() and not len(deleted):
+                return None
+        rows = np.flatnonzero(upsert)
+        segment = {
+            'op': np.r_[np.full(len(rows), UPSERT), np.full(len(deleted), DELETE)].astype(np.int8),
+            'specs': np.vstack([specs[rows], np.full((len(deleted), len(SPEC_COLS)), np.nan)])
+        }
+        new = {
+            'current': df['Current'].to_numpy(dtype=bool),
+            'brand': df['Brand'].astype(str).to_numpy().astype(str),
+            'model': df['Model'].astype(str).to_numpy().astype(str),
+            'pattern': df['String Pattern'].astype(str).to_numpy().astype(str)
+        }
+        for k, values in new.items():
+            # Deletes carry the key of the racquet that disappeared
+            gone = events[k][deleted] if len(deleted) else values[:0]
+            segment[k] = np.concatenate([values[rows], gone])
+        version = n_versions + 1
+        os.makedirs(self.path, exist_ok=True)
+        file_path = os.path.join(self.path, f'{version:06d}.npz')
+        if os.path.exists(file_path):
+            raise FileExistsError(f'{file_path} exists but is not listed in {INDEX_FILE}')
+        tmp_path = os.path.join(self.path, f'.{version:06d}.npz.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, **segment)
+        os.replace(tmp_path, file_path)
+        entry = {
+            'version': version,
+            'taken_at': (taken_at or datetime.now()).isoformat(timespec='seconds'),
+            'rows': len(df),
+            'upserts': int(len(rows)),
+            'deletes': int(len(deleted)),
+            'bytes': os.path.getsize(file_path)
+        }
+        index['versions'].append(entry)
+        # The index is written last; a segment it does not list is ignored
+        tmp_path = os.path.join(self.path, f'.{INDEX_FILE}.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.path, INDEX_FILE))
+        return entry
+
+    def diff(self, start, end):
+        """Racquets that changed between versions / dates start and end.
+
+        One row per change with a Change column: 'added', 'removed',
+        'changed' (specs differ; Changed Specs lists them as old -> new),
+        'discontinued' or 'reintroduced' (the same Brand / Model / String
+        Pattern moved between current and discontinued). Specs are the
+        values at end, or at start for removed racquets.
+        """
+        x, y = self.resolve(start), self.resolve(end)
+        if x > y:
+            x, y = y, x
+        columns = ['Change'] + KEY_COLS + ['Changed Specs'] + SPEC_COLS
+        events = self._events(1, y)
+        touched = pd.unique(events['key'][events['version'] > x])
+        # Last event of each touched racquet up to x and up to y (-1 if none)
+        early = np.flatnonzero(events['version'] <= x)
+        before = self._last_events({k: v[early] for k, v in events.items()}, touched)
+        before = np.where(before >= 0, early[np.maximum(before, 0)], -1)
+        after = self._last_events(events, touched)
+        present_before = (before >= 0) & (events['op'][before] == UPSERT)
+        present_after = (after >= 0) & (events['op'][after] == UPSERT)
+
+        both = np.flatnonzero(present_before & present_after)
+        old_specs, new_specs = events['specs'][before[both]], events['specs'][after[both]]
+        differs = ~_same_specs(old_specs, new_specs)
+        changed = differs.any(axis=1)
+        frames = []
+        for rows, change in [(after[present_after & ~present_before], 'added'),
+                             (before[present_before & ~present_after], 'removed'),
+                             (after[both[changed]], 'changed')]:
+            frame = self._frame(events, rows)
+            frame.insert(0, 'Change', change)
+            frame.insert(5, 'Changed Specs', '')
+            frames.append(frame)
+        frames[2]['Changed Specs'] = ['; '.join(f'{SPEC_COLS[j]}: {o[j]:g} -> {n[j]:g}' for j in np.flatnonzero(d))
+                                      for o, n, d in zip(old_specs[changed], new_specs[changed], differs[changed])]
+        result = pd.concat(frames, ignore_index=True)
+
+        # A removal and an addition of the same racquet with the other
+        # Current value is a move between current and discontinued
+        racquet = result['Brand'] + '||' + result['Model'] + '||' + result['String Pattern']
+        drop = np.zeros(len(result), dtype=bool)
+        for was_current, label in [(True, 'discontinued'), (False, 'reintroduced')]:
+            removed = ((result['Change'] == 'removed') & (result['Current'] == was_current)).to_numpy()
+            added = ((result['Change'] == 'added') & (result['Current'] != was_current)).to_numpy()
+            moved = racquet.isin(set(racquet[removed]) & set(racquet[added])).to_numpy()
+            result.loc[added & moved, 'Change'] = label
+            drop |= removed & moved
+        result = result[~drop]
+        return result.sort_values(['Change'] + KEY_COLS, kind='stable').reset_index(drop=True)[columns]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Query the racquet database history.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help='list the stored versions')
+    as_of = sub.add_parser('as-of', help='the database as of a version or date')
+    as_of.add_argument('when', help='version number or ISO date / datetime')
+    diff = sub.add_parser('diff', help='racquets that changed between two versions or dates')
+    diff.add_argument('start')
+    diff.add_argument('end')
+    for p in [as_of, diff]:
+        p.add_argument('--out', default=None, help='write the table to this CSV instead of printing a summary')
+    parser.add_argument('--store', default=SNAPSHOTS_PATH, help='snapshot directory')
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.store)
+
+    def when(value):
+        return int(value) if value.isdigit() else value
+
+    if args.command == 'list':
+        for v in store.versions():
+            print(f"{v['version']:>5}  {v['taken_at']}  {v['rows']:>8} racquets  "
+                  f"+{v['upserts']} -{v['deletes']}  {v['bytes'] / 1024:.1f} KiB")
+        sys.exit(0)
+    start = time.perf_counter()
+    if args.command == 'as-of':
+        table = store.as_of(when(args.when))
+        summary = f'{len(table)} racquets as of version {store.resolve(when(args.when))}'
+    else:
+        table = store.diff(when(args.start), when(args.end))
+        summary = ', '.join(f'{n} {change}' for change, n in table['Change'].value_counts().sort_index().items()) or 'no changes'
+    elapsed = time.perf_counter() - start
+    if args.out:
+        table.to_csv(args.out, index=False)
+    else:
+        print(table.head(20).to_string())
+    print(f'{summary} ({1000 * elapsed:.1f} ms)')
@@ -0,0 +1,179 @@
+# Synthetic racquet datasets for load and scale testing
+#
+#   python synthetic.py 10000000 [--out racquets_10m_columns] [--csv racquets_10m.csv] [--chunk-size 500000]
+#
+# The specs are sampled from a Gaussian copula fitted to the real database:
+# each spec keeps its own distribution (the empirical quantiles) while the
+# correlations between specs, e.g. Weight / Balance / Recoil Weight, follow
+# the real data. Swingweight is then recovered from Weight, Balance and
+# Recoil Weight, and Recoil Weight, Polarization Index and MgR/I recomputed
+# with the same formulas as the scraper, so the identities between them hold
+# exactly. (Sampling Recoil Weight rather than Swingweight keeps the derived
+# specs inside their real ranges.) Current, Brand, String Pattern
+# and the model name stem are drawn together from a random real racquet;
+# model names get a unique #suffix.
+#
+# Rows are generated and written in chunks, so memory stays bounded by the
+# chunk size whatever the number of rows.
+import argparse
+import time
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from dataset import (COLUMNAR_PATH, DATABASE_PATH, DF_COLS, SPEC_COLS, STAT_QUANTILES, ColumnarWriter,
+                     read_racquets_csv)
+from physics import derived_specs, swingweight
+
+# Specs computed from the sampled ones rather than sampled
+DERIVED_COLS = ['Swingweight (kg cm^2)', 'Polarization Index', 'MgR/I']
+SAMPLED_COLS = [s for s in SPEC_COLS if s not in DERIVED_COLS]
+# Specs with at most this many distinct values are sampled from the observed
+# values only (e.g. Length, Headsize); others are interpolated and rounded
+DISCRETE_MAX_VALUES = 40
+CHUNK_SIZE = 500_000
+STATS_SAMPLE_ROWS = 1_000_000
+
+
+class RacquetModel:
+
+    def __init__(self, df):
+        """Fit the copula and category table to a racquet DataFrame."""
+        n = len(df)
+        values = df[SAMPLED_COLS].to_numpy(dtype=np.float64)
+        # Normal scores of each spec's ranks
+        normal = NormalDist()
+        uniform = (np.arange(n) + 0.5) / n
+        self.scores = np.array([normal.inv_cdf(u) for u in uniform])
+        # Tied values share their average rank, so heavily tied specs such as
+        # Length do not get spread over random scores
+        ranks = pd.DataFrame(values).rank(method='average').to_numpy()
+        tied_scores = np.array([[normal.inv_cdf(u) for u in column] for column in ((ranks - 0.5) / n).T]).T
+        self.correlation = np.corrcoef(tied_scores, rowvar=False)
+        self.sorted_values = np.sort(values, axis=0)
+        self.discrete = [len(np.unique(values[:, j])) <= DISCRETE_MAX_VALUES for j in range(len(SAMPLED_COLS))]
+        self.decimals = [_decimals(values[:, j]) for j in range(len(SAMPLED_COLS))]
+        self.categories = df[['Current', 'Brand', 'Model', 'String Pattern']].astype({'Brand': str, 'String Pattern': str}).reset_index(drop=True)
+        self.brands = sorted(self.categories['Brand'].unique())
+        self.patterns = sorted(self.categories['String Pattern'].unique())
+        self.model_width = int(self.categories['Model'].str.len().max()) + 12
+
+    def sample(self, n, rng, start=0):
+        """n synthetic racquets as a DataFrame in DF_COLS order.
+
+        start numbers the model suffixes, so chunks sampled with
+        consecutive starts have unique Brand / Model pairs.
+        """
+        z = rng.multivariate_normal(np.zeros(len(SAMPLED_COLS)), self.correlation, size=n, method='cholesky')
+        specs = {}
+        for j, s in enumerate(SAMPLED_COLS):
+            column = self.sorted_values[:, j]
+            if self.discrete[j]:
+                # Nearest observed value at the sampled quantile
+                idx = np.searchsorted(self.scores, z[:, j]).clip(0, len(column) - 1)
+                specs[s] = column[idx]
+            else:
+                specs[s] = np.round(np.interp(z[:, j], self.scores, column), self.decimals[j])
+        specs['Swingweight (kg cm^2)'] = np.round(swingweight(specs['Recoil Weight (kg cm^2)'], specs['Weight (g)'], specs['Balance (cm)']))
+        specs['Recoil Weight (kg cm^2)'], specs['Polarization Index'], specs['MgR/I'] = derived_specs(
+            specs['Swingweight (kg cm^2)'], specs['Weight (g)'], specs['Balance (cm)'], specs['Length (in)'])
+        template = self.categories.iloc[rng.integers(0, len(self.categories), n)].reset_index(drop=True)
+        template['Model'] = template['Model'].str.strip() + ' #' + pd.Series(np.arange(start, start + n)).astype(str)
+        for s in SPEC_COLS:
+            template[s] = specs[s].astype(np.float32)
+        return template[DF_COLS]
+
+
+def _decimals(values, max_decimals=2):
+    for d in range(max_decimals + 1):
+        if np.allclose(values, np.round(values, d)):
+            return d
+    return max_decimals
+
+
+class StreamingStats:
+    """Spec statistics over chunks, as dataset.compute_spec_stats.
+
+    min, max, mean and std are exact; quantiles are estimated from a
+    uniform random sample of about sample_rows rows.
+    """
+
+    def __init__(self, n_rows, sample_rows=STATS_SAMPLE_ROWS, seed=0):
+        k = len(SPEC_COLS)
+        self.count = 0
+        self.sum = np.zeros(k)
+        self.sum_sq = np.zeros(k)
+        self.min = np.full(k, np.inf)
+        self.max = np.full(k, -np.inf)
+        self.fraction = min(1.0, sample_rows / max(n_rows, 1))
+        self.rng = np.random.default_rng(seed)
+        self.samples = []
+
+    def update(self, df):
+        values = df[SPEC_COLS].to_numpy(dtype=np.float64)
+        self.count += len(values)
+        self.sum += values.sum(axis=0)
+        self.sum_sq += (values**2).sum(axis=0)
+        self.min = np.minimum(self.min, values.min(axis=0))
+        self.max = np.maximum(self.max, values.max(axis=0))
+        self.samples.append(values[self.rng.random(len(values)) < self.fraction])
+
+    def result(self):
+        mean = self.sum / self.count
+        std = np.sqrt(np.maximum(self.sum_sq / self.count - mean**2, 0))
+        quantiles = np.quantile(np.concatenate(self.samples), STAT_QUANTILES, axis=0)
+        stats = {}
+        for j, c in enumerate(SPEC_COLS):
+            stats[c] = {
+                'min': float(self.min[j]),
+                'max': float(self.max[j]),
+                'mean': float(mean[j]),
+                'std': float(std[j]),
+                'quantiles': {str(q): float(v) for q, v in zip(STAT_QUANTILES, quantiles[:, j])}
+            }
+        return stats
+
+
+def generate(n_rows, columnar_path=None, csv_path=None, chunk_size=CHUNK_SIZE, seed=0, source_path=DATABASE_PATH):
+    """Write n_rows synthetic racquets as a columnar dataset and/or CSV.
+
+    Returns the columnar manifest, or None if only a CSV was written.
+    """
+    model = RacquetModel(read_racquets_csv(source_path))
+    rng = np.random.default_rng(seed)
+    writer = None
+    if columnar_path is not None:
+        writer = ColumnarWriter(columnar_path, n_rows, model.brands, model.patterns, model.model_width)
+    stats = StreamingStats(n_rows, seed=seed)
+    csv_file = open(csv_path, 'w', newline='') if csv_path is not None else None
+    try:
+        for start in range(0, n_rows, chunk_size):
+            chunk = model.sample(min(chunk_size, n_rows - start), rng, start)
+            if writer is not None:
+                writer.write(chunk)
+            if csv_file is not None:
+                chunk.to_csv(csv_file, header=(start == 0), index=False)
+            stats.update(chunk)
+    finally:
+        if csv_file is not None:
+            csv_file.close()
+    return writer.close(stats.result()) if writer is not None else None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic racquet dataset fitted to the real database.')
+    parser.add_argument('rows', type=int, help='number of racquets')
+    parser.add_argument('--out', default=None, help=f'columnar dataset directory (e.g. {COLUMNAR_PATH}_synthetic)')
+    parser.add_argument('--csv', default=None, help='also (or only) write a CSV')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='rows generated and written at a time')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--source', default=DATABASE_PATH, help='real database the model is fitted to')
+    args = parser.parse_args()
+    if args.out is None and args.csv is None:
+        parser.error('give --out and/or --csv')
+
+    start = time.perf_counter()
+    generate(args.rows, args.out, args.csv, args.chunk_size, args.seed, args.source)
+    elapsed = time.perf_counter() - start
+    print(f"{args.rows} racquets in {elapsed:.1f} s ({args.rows / elapsed:.0f} rows/s) -> {', '.join(p for p in [args.out, args.csv] if p)}")
@@ -0,0 +1,143 @@
+# Paginated results tables for the Discover and Match pages
+#
+# Sorting and slicing happen on the server: the row order for each sort key
+# is computed once per dataset and reused, a filter mask is applied to that
+# order in linear time, and only the rows of the visible page are sent to
+# the browser. Payload size stays the same however many racquets match.
+import threading
+
+import numpy as np
+import streamlit as st
+
+from dataset import derived
+from lazy import lazy_import
+
+go = lazy_import('plotly.graph_objects')
+
+PAGE_SIZES = [25, 50, 100]
+
+
+class SortIndex:
+
+    def __init__(self, df):
+        self.df = df
+        self.n = len(df)
+        self._keys = {}
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def key(self, col):
+        """Sortable array for col: category codes in sorted order, or values."""
+        if col not in self._keys:
+            series = self.df[col]
+            if hasattr(series, 'cat'):
+                series = series.astype(object)
+            values = series.to_numpy()
+            if values.dtype == object:
+                values = np.unique(values.astype(str), return_inverse=True)[1]
+            self._keys[col] = values
+        return self._keys[col]
+
+    def order(self, cols):
+        """Rows of the full dataset sorted by cols (first column most significant)."""
+        cols = tuple(cols)
+        with self._lock:
+            if cols not in self._orders:
+                self._orders[cols] = np.lexsort([self.key(c) for c in reversed(cols)])
+            return self._orders[cols]
+
+    def sort_rows(self, rows, cols, ascending=True):
+        """Positional rows sorted by cols.
+
+        rows is a boolean mask over the dataset, or an array of row positions.
+        A mask is applied to the cached full order in O(n); a short array of
+        positions is sorted directly.
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            order = self.order(cols)
+            result = order[rows[order]]
+        else:
+            result = rows[np.lexsort([self.key(c)[rows] for c in reversed(cols)])]
+        return result if ascending else result[::-1]
+
+
+def sort_index(df):
+    """SortIndex for df, built once per loaded dataset."""
+    return derived(df, 'sort_index', SortIndex)
+
+
+def page_bounds(n_rows, page, page_size):
+    """(start, stop) of a 1-based page, clamped to the rows available."""
+    n_pages = max(1, -(-n_rows // page_size))
+    page = min(max(1, page), n_pages)
+    start = (page - 1) * page_size
+    return start, min(start + page_size, n_rows)
+
+
+def paginated_table(df, rows, key, sort_options, extra_cols=None, highlight_cols=()):
+    """Render a sortable, paginated table of the given rows of df.
+
+    rows is a boolean mask or an array of row positions in df. sort_options
+    maps a label to a tuple of columns; the first label is the default and a
+    label mapped to None keeps rows in the order given. extra_cols maps a
+    column name to values aligned with rows (positions only), shown first
+    and sortable by name. Only the visible page is built and sent.
+    """
+    extra_cols = extra_cols or {}
+    sidx = sort_index(df)
+    sort_col, order_col, size_col, page_col = st.columns((3, 1, 1, 1))
+    sort_label = sort_col.selectbox('Sort By', list(sort_options) + [c for c in df.columns if c not in sort_options], key=f'{key}_sort')
+    descending = order_col.selectbox('Order', ['Ascending', 'Descending'], key=f'{key}_order') == 'Descending'
+    page_size = size_col.selectbox('Rows per Page', PAGE_SIZES, key=f'{key}_page_size')
+    rows = np.asarray(rows)
+    n_rows = int(np.count_nonzero(rows)) if rows.dtype == bool else len(rows)
+    n_pages = max(1, -(-n_rows // page_size))
+    page = page_col.number_input('Page', min_value=1, max_value=n_pages, value=1, key=f'{key}_page_{n_pages}')
+    # Sort
+    cols = sort_options.get(sort_label, (sort_label,))
+    positions = np.arange(n_rows)
+    if rows.dtype == bool and cols is not None and sort_label not in extra_cols:
+        # Filtered dataset: apply the mask to the cached full order
+        rows = sidx.sort_rows(rows, cols, ascending=not descending)
+    else:
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        # Sort positions within the given rows so extra columns follow
+        if sort_label in extra_cols:
+            positions = np.argsort(np.asarray(extra_cols[sort_label]), kind='stable')
+        elif cols is not None:
+            positions = np.lexsort([sidx.key(c)[rows] for c in reversed(cols)])
+        if descending:
+            positions = positions[::-1]
+        rows = rows[positions]
+    # Slice the visible page
+    start, stop = page_bounds(n_rows, page, page_size)
+    page_df = df.iloc[rows[start:stop]].copy()
+    for i, (c, values) in enumerate(extra_cols.items()):
+        page_df.insert(i, c, np.asarray(values)[positions[start:stop]])
+    table = go.Figure(data=[go.Table(
+        header=dict(
+            values = list(page_df.columns),
+            fill_color = ['#CDAFAF' if c in highlight_cols else 'lightgrey' for c in page_df.columns],
+            align = 'center'
+        ),
+        cells=dict(
+            values = [page_df[c] for c in page_df.columns],
+            align = 'center',
+            fill_color = ['#FFC7C7' if c in highlight_cols else '#FFFFFF' for c in page_df.columns]
+        )
+    )])
+    table.update_traces(
+        cells_font=dict(
+            family = 'Arial Narrow',
+            color = 'black'
+        ),
+        header_font=dict(
+            family = 'Arial Narrow',
+            color = 'black'
+        )
+    )
+    table.update_layout(height=120 + 30 * len(page_df), margin=dict(t=10, b=10))
+    st.caption(f'Racquets {start + 1 if n_rows else 0}-{stop} of {n_rows}')
+    st.plotly_chart(table, use_container_width=True)
@@ -1,8 +1,5 @@
 import numpy as np
 import pandas as pd
-from math import *
-import streamlit as st
-import base64
 
 def radar_rescale(df, spec_cols, scale_min, scale_max):
     
@@ -13,4 +10,17 @@ def radar_rescale(df, spec_cols, scale_min, scale_max):
         min_val = radar_df[c].min()
         radar_df[c] = ((np.array(df[c]) - min_val)/(max_val - min_val) * delta) + scale_min
         
-    return radar_df
\ No newline at end of file
+    return radar_df
+
+def radar_rescale_rows(rows_df, spec_cols, stats, scale_min, scale_max):
+    # Rescale only the given rows, using dataset-wide min/max from stats
+    # (dataset.spec_stats) instead of scanning the full DataFrame
+    mins = np.array([stats[c]['min'] for c in spec_cols])
+    maxs = np.array([stats[c]['max'] for c in spec_cols])
+    values = rows_df[spec_cols].to_numpy(dtype=np.float64)
+    span = maxs - mins
+    # A spec with one value in every row sits in the middle of the scale
+    constant = span == 0
+    scaled = (values - mins)/np.where(constant, 1, span) * (scale_max - scale_min) + scale_min
+    scaled[:, constant] = (scale_min + scale_max) / 2
+    return pd.DataFrame(scaled, index=rows_df.index, columns=spec_cols)
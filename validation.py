@@ -0,0 +1,198 @@
+# Ingest validation for scraped racquet specs
+#
+# Every check is a column-wise NumPy operation over the whole table:
+#
+#   fixes        known bad values on the TWU site (KNOWN_FIXES), then values
+#                out of range that land in range when shifted by one decimal
+#                place (e.g. a twistweight of 115 for 11.5) are corrected
+#   missing      rows with a missing spec, brand, model or string pattern
+#                are quarantined
+#   range        rows with a spec still outside SPEC_RANGES are quarantined
+#   consistency  Recoil Weight, Polarization Index and MgR/I that disagree
+#                with Swingweight, Weight, Balance and Length are recomputed
+#   outliers     robust z-scores (distance from the median in units of the
+#                scaled median absolute deviation) above Z_THRESHOLD are
+#                reported but kept
+#
+# validate() returns the clean rows, the quarantined rows with their
+# reasons, and a JSON-serializable report with per-check counts, sample row
+# labels, and the run time against TIME_BUDGET_PER_MILLION seconds per
+# million rows.
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset import DATABASE_PATH
+from physics import derived_specs
+
+# Plausible physical range of each measured spec
+SPEC_RANGES = {
+    'Headsize (sq in)': (80, 140),
+    'Length (in)': (19, 29),
+    'Beam Width (mm)': (14, 40),
+    'Weight (g)': (150, 420),
+    'Balance (cm)': (25, 45),
+    'Swingweight (kg cm^2)': (150, 420),
+    'Twistweight (kg cm^2)': (6, 25),
+    'Sweet Zone (sq in)': (4, 35),
+    'RA Stiffness': (30, 85),
+    'Vibration Frequency (Hz)': (80, 230)
+}
+# Values known to be mistyped on the TWU site, and their corrections
+KNOWN_FIXES = {
+    'Headsize (sq in)': {11.0: 115.0},
+    'Twistweight (kg cm^2)': {115.0: 11.5},
+    'Beam Width (mm)': {242.0: 23.0}
+}
+KEY_COLS = ['Brand', 'Model', 'String Pattern']
+DERIVED_COLS = ['Recoil Weight (kg cm^2)', 'Polarization Index', 'MgR/I']
+# Largest difference from the recomputed value before a derived spec is
+# corrected: recoil weight and polarization index are stored rounded
+DERIVED_TOLERANCE = {'Recoil Weight (kg cm^2)': 0.5, 'Polarization Index': 0.005, 'MgR/I': 0.01}
+Z_THRESHOLD = 6.0
+Z_SAMPLE_ROWS = 100_000
+TIME_BUDGET_PER_MILLION = 2.0
+MAX_LISTED = 10
+
+
+def _listed(index, mask):
+    return [_label(v) for v in index[mask][:MAX_LISTED]]
+
+
+def _label(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def robust_z(values, rows=None, sample_rows=Z_SAMPLE_ROWS, seed=0):
+    """|x - median| / (1.4826 MAD) per column of a 2-D array.
+
+    The median and MAD are estimated from rows (all rows if None), or from
+    a uniform sample of sample_rows of them when there are more. Columns
+    whose MAD is zero fall back to the mean absolute deviation (scaled by
+    1.2533); constant columns score zero.
+    """
+    if rows is None:
+        rows = np.arange(len(values))
+    if len(rows) > sample_rows:
+        rows = np.random.default_rng(seed).choice(rows, sample_rows, replace=False)
+    sample = values[rows]
+    median = np.median(sample, axis=0)
+    sample_deviation = np.abs(sample - median)
+    scale = 1.4826 * np.median(sample_deviation, axis=0)
+    fallback = 1.2533 * sample_deviation.mean(axis=0)
+    scale = np.where(scale > 0, scale, fallback)
+    return np.abs(values - median) / np.where(scale > 0, scale, np.inf)
+
+
+def validate(df, spec_ranges=SPEC_RANGES, known_fixes=KNOWN_FIXES, z_threshold=Z_THRESHOLD, correct=True):
+    """Check and correct the specs of df.
+
+    Returns (clean, quarantine, report): clean holds the rows that passed,
+    with corrections applied when correct is True; quarantine holds the
+    rejected rows with a 'Reasons' column.
+    """
+    start = time.perf_counter()
+    index = df.index
+    n = len(df)
+    spec_cols = list(spec_ranges) + DERIVED_COLS
+    # Checks work on float64 columns of one column-major matrix; corrected
+    # columns are written back to the output frames at the end
+    matrix = np.empty((n, len(spec_cols)), order='F')
+    columns = {}
+    for j, s in enumerate(spec_cols):
+        matrix[:, j] = df[s].to_numpy(dtype=np.float64)
+        columns[s] = matrix[:, j]
+    corrected = set()
+    report = {'rows': n, 'checks': {}}
+    reasons = np.zeros(n, dtype=object)
+    reasons[:] = ''
+    quarantine = np.zeros(n, dtype=bool)
+
+    def record(check, column, mask, **extra):
+        count = int(np.count_nonzero(mask))
+        if count:
+            report['checks'].setdefault(check, {})[column] = {'count': count, 'rows': _listed(index, mask), **extra}
+        return count
+
+    # Fixes
+    for s, (lo, hi) in spec_ranges.items():
+        values = columns[s]
+        fixed = values.copy()
+        for bad, good in known_fixes.get(s, {}).items():
+            fixed[values == bad] = good
+        out = ~((fixed >= lo) & (fixed <= hi)) & ~np.isnan(fixed)
+        for factor in [0.1, 10.0]:
+            shifted = fixed * factor
+            fits = out & (shifted >= lo) & (shifted <= hi)
+            fixed[fits] = shifted[fits]
+            out &= ~fits
+        changed = fixed != values
+        changed &= ~np.isnan(values)
+        if record('fixes', s, changed, fixed_to=[_label(v) for v in fixed[changed][:MAX_LISTED]]) and correct:
+            values[:] = fixed
+            corrected.add(s)
+
+    # Missing keys, missing and out-of-range specs
+    for c in KEY_COLS:
+        if c in df:
+            mask = df[c].isna().to_numpy()
+            if record('missing', c, mask):
+                quarantine |= mask
+                reasons[mask] += f'missing: {c}; '
+    for s, (lo, hi) in spec_ranges.items():
+        values = columns[s]
+        for check, mask in [('missing', np.isnan(values)), ('range', ~np.isnan(values) & ((values < lo) | (values > hi)))]:
+            if record(check, s, mask):
+                quarantine |= mask
+                reasons[mask] += f'{check}: {s}; '
+
+    # Derived spec consistency; a missing derived spec is recomputed too
+    expected = derived_specs(*(columns[c] for c in ['Swingweight (kg cm^2)', 'Weight (g)', 'Balance (cm)', 'Length (in)']))
+    for s, values in zip(DERIVED_COLS, expected):
+        stored = columns[s]
+        with np.errstate(invalid='ignore'):
+            mask = ~quarantine & ~(np.abs(stored - values) <= DERIVED_TOLERANCE[s])
+        if record('consistency', s, mask, expected=[_label(v) for v in values[mask][:MAX_LISTED]]) and correct:
+            stored[mask] = values[mask]
+            corrected.add(s)
+
+    # Robust outliers among the remaining rows
+    keep = ~quarantine
+    kept_rows = np.flatnonzero(keep)
+    if len(kept_rows):
+        z = robust_z(matrix, kept_rows)
+        for j, s in enumerate(spec_cols):
+            with np.errstate(invalid='ignore'):
+                mask = keep & (z[:, j] > z_threshold)
+            record('outliers', s, mask, z=[round(float(v), 1) for v in z[mask, j][:MAX_LISTED]])
+
+    clean, quarantined = df.take(kept_rows), df.take(np.flatnonzero(quarantine))
+    for s in corrected:
+        clean[s] = columns[s][keep].astype(df[s].dtype)
+        quarantined[s] = columns[s][quarantine].astype(df[s].dtype)
+    quarantined['Reasons'] = [r.rstrip('; ') for r in reasons[quarantine]]
+    elapsed = time.perf_counter() - start
+    # Tables under a million rows get the budget of a million
+    budget = TIME_BUDGET_PER_MILLION * max(n, 1_000_000) / 1e6
+    report.update({
+        'quarantined': int(np.count_nonzero(quarantine)),
+        'corrected': correct,
+        'seconds': round(elapsed, 4),
+        'budget_seconds': round(budget, 4),
+        'within_budget': elapsed <= budget
+    })
+    return clean, quarantined, report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Validate a racquet table and print the report as JSON.')
+    parser.add_argument('path', nargs='?', default=DATABASE_PATH, help='racquet CSV (database or records)')
+    parser.add_argument('--quarantine', default=None, help='write the quarantined rows to this CSV')
+    args = parser.parse_args()
+    _, quarantined, report = validate(pd.read_csv(args.path))
+    if args.quarantine:
+        quarantined.to_csv(args.quarantine, index=False)
+    print(json.dumps(report, indent=2))